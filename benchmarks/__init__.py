@@ -0,0 +1,15 @@
+"""
+Benchmarks
+Per-stage timings of the generators and the SQLite write path
+
+Run from the repository root with `python -m benchmarks`.
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The generators use flat imports relative to src/ (as when run via src/main.py)
+if str(ROOT / 'src') not in sys.path:
+    sys.path.insert(0, str(ROOT / 'src'))
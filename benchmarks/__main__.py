@@ -0,0 +1,143 @@
+"""
+Benchmark command line
+
+    python -m benchmarks                        # sweep DEFAULT_SIZES
+    python -m benchmarks --sizes 1000 7500      # quick check
+    python -m benchmarks --save-baseline        # record the reference numbers
+
+Results are written as JSON; when a baseline exists every stage is compared
+against it and the exit status is 1 if any stage regressed.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks import ROOT
+from benchmarks.suite import DEFAULT_SIZES, run_suite
+from config import PRESETS
+from ids import ID_FORMATS
+from sinks import OUTPUT_FORMATS
+
+DEFAULT_RESULTS = ROOT / 'output' / 'benchmarks.json'
+DEFAULT_BASELINE = ROOT / 'benchmarks' / 'baseline.json'
+
+# Stages faster than this are too noisy to compare
+MIN_COMPARED_SECONDS = 0.1
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Find stages that got slower than the baseline by more than `tolerance`
+    
+    Returns:
+        (employee_count, stage, baseline seconds, current seconds) per regression
+    """
+    regressions = []
+    reference = {run['employee_count']: run for run in baseline['runs']}
+    for run in results['runs']:
+        base = reference.get(run['employee_count'])
+        if base is None:
+            continue
+        timings = {stage: m['seconds'] for stage, m in run['stages'].items()}
+        timings['total'] = run['seconds']
+        base_timings = {stage: m['seconds'] for stage, m in base['stages'].items()}
+        base_timings['total'] = base['seconds']
+        for stage, seconds in timings.items():
+            before = base_timings.get(stage)
+            if before is None or max(before, seconds) < MIN_COMPARED_SECONDS:
+                continue
+            if seconds > before * (1 + tolerance):
+                regressions.append((run['employee_count'], stage, before, seconds))
+    return regressions
+
+def print_run(run: dict):
+    print(f"\nemployee_count={run['employee_count']:,}: {run['rows']:,} rows in "
+          f"{run['seconds']:.2f}s ({run['rows_per_sec']:,.0f} rows/s), "
+          f"output {run['db_size_mb']} MiB, peak RSS {run['peak_rss_mb']} MiB")
+    print(f"  {'stage':<15}{'seconds':>10}{'cpu':>10}{'python':>10}{'write':>10}{'commit':>10}"
+          f"{'rows':>12}{'rows/s':>12}")
+    for stage, m in run['stages'].items():
+        print(f"  {stage:<15}{m['seconds']:>10.3f}{m['cpu_seconds']:>10.3f}"
+              f"{m['python_seconds']:>10.3f}{m['write_seconds']:>10.3f}{m['commit_seconds']:>10.3f}"
+              f"{m['rows']:>12,}{m['rows_per_sec'] or 0:>12,.0f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description="Benchmark the generators and output write path")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help=f"employee_count values to sweep (default: {DEFAULT_SIZES})")
+    parser.add_argument('--preset', choices=list(PRESETS), default='default',
+                        help="Scale preset the sizes are run with (default: %(default)s)")
+    parser.add_argument('--workers', type=int, help="Override the preset's workers")
+    parser.add_argument('--id-format', choices=ID_FORMATS, help="Override the id_format")
+    parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS,
+                        help="Override the output_format (sink the rows are written to)")
+    parser.add_argument('--write-thread', dest='write_thread', choices=['on', 'off'],
+                        help="Override write_thread (background writer for the sink)")
+    parser.add_argument('--output', type=Path, default=DEFAULT_RESULTS,
+                        help="Results file (default: output/benchmarks.json)")
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE,
+                        help="Baseline to compare against (default: benchmarks/baseline.json)")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Store these results as the new baseline instead of comparing")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed slowdown per stage before it counts as a regression "
+                             "(default: 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    
+    overrides = {'preset': args.preset}
+    if args.workers is not None:
+        overrides['workers'] = args.workers
+    if args.id_format is not None:
+        overrides['id_format'] = args.id_format
+    if args.output_format is not None:
+        overrides['output_format'] = args.output_format
+    if args.write_thread is not None:
+        overrides['write_thread'] = args.write_thread == 'on'
+    
+    results = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'overrides': overrides,
+        'runs': [],
+    }
+    for run in run_suite(args.sizes, overrides):
+        print_run(run)
+        results['runs'].append(run)
+    
+    target = args.baseline if args.save_baseline else args.output
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {target}")
+    if args.save_baseline or not args.baseline.exists():
+        return 0
+    
+    baseline = json.loads(args.baseline.read_text())
+    if baseline['overrides'] != overrides:
+        print(f"Baseline was run with {baseline['overrides']}, not {overrides}; not comparing")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    print(f"Compared with baseline {baseline.get('git_revision') or args.baseline} "
+          f"({baseline['created_at']})")
+    for employee_count, stage, before, after in regressions:
+        print(f"  REGRESSION employee_count={employee_count:,} {stage}: "
+              f"{before:.3f}s -> {after:.3f}s ({after / before - 1:+.0%})")
+    if not regressions:
+        print("  No regressions")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Benchmark Suite
+Runs the full-build pipeline once per workspace size and times every stage
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from benchmarks import ROOT
+from config import DEFAULT_CONFIG, resolve_config
+from main import build_workspace
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Workspace sizes (employee_count) swept by default
+DEFAULT_SIZES = [1000, 7500, 50000, 200000]
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process and its children, in MiB"""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS, KiB elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def run_pipeline(config: dict) -> dict:
+    """
+    Run a full build through main.build_workspace, with every stage
+    measured by its metrics.PipelineMetrics
+    
+    Run recording, snapshot and stage-cache costs are therefore included,
+    so regressions in them show up like any other.
+    
+    Returns:
+        Per-stage measurements plus totals, output size and peak RSS
+    """
+    logging.getLogger().setLevel(logging.WARNING)
+    runs = []
+    start = time.perf_counter()
+    build_workspace(config, metrics_hook=runs.append)
+    total = time.perf_counter() - start
+    metrics = runs[0]
+    sink = metrics.sink
+    rows = sink.total_rows
+    if config['output_format'] == 'sqlite':
+        size = os.path.getsize(config['output_db'])
+    else:
+        size = sum(path.stat().st_size for path in sink.directory.iterdir())
+    return {
+        'employee_count': config['employee_count'],
+        'seconds': round(total, 4),
+        'rows': rows,
+        'rows_per_sec': round(rows / total, 1),
+        'write_seconds': round(sink.write_seconds, 4),
+        'db_size_mb': round(size / (1024 * 1024), 2),
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': metrics.stages,
+    }
+
+def benchmark_size(employee_count: int, overrides: dict) -> dict:
+    """Run the pipeline for one workspace size into a throwaway database"""
+    with tempfile.TemporaryDirectory(prefix='asana-bench-') as tmp:
+        config = resolve_config(**{
+            'schema_file': str(ROOT / DEFAULT_CONFIG['schema_file']),
+            'incremental': False,
+            **overrides,
+            'employee_count': employee_count,
+            'output_db': os.path.join(tmp, 'benchmark.sqlite'),
+            # A fresh cache per size: entries are recorded, never replayed
+            'stage_cache_dir': os.path.join(tmp, '.cache'),
+        })
+        return run_pipeline(config)
+
+def run_suite(sizes: list, overrides: dict = None):
+    """
+    Benchmark every size, each in a fresh process, yielding results as they finish
+    
+    A new interpreter per size keeps peak RSS attributable to that size
+    and stops caches warmed by one run from flattering the next.
+    """
+    for employee_count in sizes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+            yield executor.submit(benchmark_size, employee_count, overrides or {}).result()
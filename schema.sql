@@ -165,6 +165,12 @@ CREATE INDEX idx_projects_team ON projects(team_id);
 CREATE INDEX idx_tasks_project ON tasks(project_id);
 CREATE INDEX idx_tasks_assignee ON tasks(assignee_id);
 CREATE INDEX idx_tasks_parent ON tasks(parent_task_id);
+CREATE INDEX idx_tasks_section ON tasks(section_id);
+CREATE INDEX idx_tasks_due_date ON tasks(due_date);
+CREATE INDEX idx_sections_project ON sections(project_id);
 CREATE INDEX idx_comments_task ON comments(task_id);
+CREATE INDEX idx_comments_user ON comments(user_id);
+CREATE INDEX idx_task_tags_tag ON task_tags(tag_id);
+CREATE INDEX idx_custom_field_values_field ON custom_field_values(field_id);
 CREATE INDEX idx_team_memberships_team ON team_memberships(team_id);
 CREATE INDEX idx_team_memberships_user ON team_memberships(user_id);
\ No newline at end of file
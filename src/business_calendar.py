@@ -0,0 +1,102 @@
+"""
+Business Calendar
+Cached date parsing and precomputed business-day lookups for the simulation window
+"""
+
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Iterable, Union
+
+import numpy as np
+
+# Days covered before start_date and after end_date: tasks may be backdated
+# up to a month and due dates fall up to three months after creation
+WINDOW_BEFORE_DAYS = 120
+WINDOW_AFTER_DAYS = 180
+
+@lru_cache(maxsize=1024)
+def parse_datetime(value: str) -> datetime:
+    """datetime.fromisoformat, cached for the few dates parsed over and over"""
+    return datetime.fromisoformat(value)
+
+@lru_cache(maxsize=4096)
+def parse_date(value: str) -> date:
+    """date of an ISO date or datetime string, cached"""
+    return date.fromisoformat(value[:10])
+
+class BusinessCalendar:
+    """
+    Business days (weekdays that are not holidays) between two dates
+    
+    For every day in [first, last] the number of days to the next business
+    day (0 for business days) is computed once, so rolling a date forward
+    past a weekend or holiday is a single lookup. Dates outside the range
+    fall back to skipping weekends and holidays day by day.
+    
+    Args:
+        first: First day of the lookup table
+        last: Last day of the lookup table
+        holidays: Non-working days besides weekends
+    """
+    
+    def __init__(self, first: date, last: date, holidays: Iterable[date] = ()):
+        self.holidays = frozenset(holidays)
+        days = np.arange(np.datetime64(first, 'D'), np.datetime64(last, 'D') + 1)
+        weekday = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+        holiday = np.isin(days, np.array(sorted(self.holidays), dtype='datetime64[D]'))
+        business = (weekday < 5) & ~holiday
+        
+        # Index of the next business day on or after each day (len(days) if none)
+        size = len(days)
+        index = np.where(business, np.arange(size), size)
+        following = np.minimum.accumulate(index[::-1])[::-1]
+        shift = following - np.arange(size)
+        # -1 marks days with no business day left in the table
+        self._shift = np.where(following < size, shift, -1)
+        self._shift_list = self._shift.tolist()
+        self._first_ordinal = first.toordinal()
+        self._first_day = days[0]
+    
+    def is_business_day(self, day: Union[date, datetime]) -> bool:
+        return day.weekday() < 5 and self._date(day) not in self.holidays
+    
+    @staticmethod
+    def _date(day: Union[date, datetime]) -> date:
+        return day.date() if isinstance(day, datetime) else day
+    
+    def roll_forward(self, day: Union[date, datetime]) -> Union[date, datetime]:
+        """`day`, or the next business day if it is not one (times are kept)"""
+        i = day.toordinal() - self._first_ordinal
+        if 0 <= i < len(self._shift_list):
+            shift = self._shift_list[i]
+            if shift >= 0:
+                return day + timedelta(days=shift) if shift else day
+        while not self.is_business_day(day):
+            day += timedelta(days=1)
+        return day
+    
+    def roll_forward_array(self, days: np.ndarray) -> np.ndarray:
+        """roll_forward for a datetime64[D] array"""
+        i = (days - self._first_day).astype(np.int64)
+        inside = (i >= 0) & (i < len(self._shift))
+        shift = np.where(inside, self._shift[np.clip(i, 0, len(self._shift) - 1)], -1)
+        outside = shift < 0
+        if outside.any():
+            shift[outside] = [(self.roll_forward(day) - day).days
+                              for day in days[outside].astype(date).tolist()]
+        return days + shift.astype('timedelta64[D]')
+
+# Weekends only, for helpers called without a run's calendar
+WEEKENDS = BusinessCalendar(date(2000, 1, 1), date(2049, 12, 31))
+
+@lru_cache(maxsize=32)
+def business_calendar(start_date: str, end_date: str, holidays: tuple = ()) -> BusinessCalendar:
+    """Calendar covering a simulation window plus margins, built once per window"""
+    return BusinessCalendar(parse_date(start_date) - timedelta(days=WINDOW_BEFORE_DAYS),
+                            parse_date(end_date) + timedelta(days=WINDOW_AFTER_DAYS),
+                            [parse_date(day) for day in holidays])
+
+def calendar_for(config: dict) -> BusinessCalendar:
+    """Business calendar of a run: its date window and config['holidays']"""
+    return business_calendar(config['start_date'], config['end_date'],
+                             tuple(config.get('holidays') or ()))
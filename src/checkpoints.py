@@ -0,0 +1,149 @@
+"""
+Pipeline Checkpoints
+Per-stage commits recorded in a manifest so an interrupted run can resume
+"""
+
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+from rng import config_seed
+
+logger = logging.getLogger(__name__)
+
+# Tables each stage writes to
+STAGE_TABLES = {
+    'organizations': ['organizations'],
+    'teams': ['teams'],
+    'users': ['users', 'team_memberships'],
+    'projects': ['projects', 'sections'],
+    'tasks': ['tasks'],
+    'comments': ['comments'],
+    'custom_fields': ['custom_field_definitions', 'custom_field_values'],
+    'tags': ['tags', 'task_tags'],
+}
+
+MANIFEST_TABLE = """
+    CREATE TABLE IF NOT EXISTS _pipeline_manifest (
+        epoch INTEGER NOT NULL,
+        stage TEXT NOT NULL,
+        rng_state TEXT NOT NULL,
+        tables TEXT NOT NULL,
+        finished_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (epoch, stage)
+    )
+"""
+
+class Checkpointer:
+    """
+    Commits the pipeline stage by stage and records each in _pipeline_manifest
+    
+    A manifest entry holds the stage's RNG seed (stages draw from
+    independent streams derived from the root seed, so the seed is all a
+    resumed run needs to continue identically) and, for every table the
+    stage wrote, the rowid range of its rows and their count. Since each
+    stage is one transaction, an interrupted stage leaves nothing behind
+    and is simply run again.
+    
+    `sink` is the sink writing into `conn`; it is flushed before a stage
+    is recorded, so rows still queued for a writer thread are included.
+    """
+    
+    def __init__(self, conn, config: dict, resume: bool = False, sink=None):
+        self.conn = conn
+        self.config = config
+        self.sink = sink
+        self.epoch = config.get('epoch', 0)
+        conn.execute(MANIFEST_TABLE)
+        self.completed: Dict[str, dict] = {}
+        if resume:
+            self._load()
+        else:
+            conn.execute("DELETE FROM _pipeline_manifest WHERE epoch = ?", (self.epoch,))
+        conn.commit()
+        self._start = self._rowids()
+    
+    def _rng_state(self, stage: str) -> dict:
+        seed_seq = config_seed(self.config, stage)
+        return {'entropy': seed_seq.entropy, 'spawn_key': list(seed_seq.spawn_key),
+                'id_format': self.config.get('id_format', 'uuid')}
+    
+    def _rowids(self) -> Dict[str, int]:
+        return {table: self.conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+                for tables in STAGE_TABLES.values() for table in tables}
+    
+    def _load(self):
+        """Read and verify the completed stages of the run being resumed"""
+        for stage, rng_state, tables in self.conn.execute("""
+            SELECT stage, rng_state, tables FROM _pipeline_manifest WHERE epoch = ? ORDER BY rowid
+        """, (self.epoch,)):
+            rng_state, tables = json.loads(rng_state), json.loads(tables)
+            if rng_state != self._rng_state(stage):
+                raise ValueError(f"Cannot resume: stage '{stage}' was generated with a "
+                                 f"different seed or id_format")
+            for table, (first, last, rows) in tables.items():
+                found = self.conn.execute(f"""
+                    SELECT COUNT(*) FROM {table} WHERE rowid > ? AND rowid <= ?
+                """, (first, last)).fetchone()[0]
+                if found != rows:
+                    raise ValueError(f"Cannot resume: {table} has {found} rows from stage "
+                                     f"'{stage}', manifest recorded {rows}")
+            self.completed[stage] = tables
+        if self.completed:
+            logger.info(f"Resuming after completed stages: {', '.join(self.completed)}")
+    
+    def done(self, stage: str) -> bool:
+        return stage in self.completed
+    
+    def rows(self, stage: str, table: str) -> int:
+        """Rows a completed stage wrote to a table"""
+        return self.completed[stage][table][2]
+    
+    def first_rowid(self, stage: str, table: str) -> int:
+        """Rowid just below the first row a completed stage wrote to a table"""
+        return self.completed[stage][table][0]
+    
+    def commit(self, stage: str):
+        """Record a finished stage and commit it together with its rows"""
+        if self.sink is not None:
+            self.sink.flush()
+        end = self._rowids()
+        tables = {}
+        for table in STAGE_TABLES[stage]:
+            first, last = self._start[table], end[table]
+            rows = self.conn.execute(f"SELECT COUNT(*) FROM {table} WHERE rowid > ?",
+                                     (first,)).fetchone()[0]
+            tables[table] = [first, last, rows]
+        self.conn.execute("INSERT OR REPLACE INTO _pipeline_manifest VALUES (?, ?, ?, ?, ?)",
+                          (self.epoch, stage, json.dumps(self._rng_state(stage)), json.dumps(tables),
+                           datetime.now().isoformat(timespec='seconds')))
+        self.conn.commit()
+        self.completed[stage] = tables
+        self._start = end
+
+class FileCheckpointer:
+    """
+    Stand-in Checkpointer for file sinks (CSV, Parquet)
+    
+    Files have no transactions to resume from, so every stage runs and
+    `commit` only flushes the sink.
+    """
+    
+    def __init__(self, sink):
+        self.sink = sink
+    
+    def done(self, stage: str) -> bool:
+        return False
+    
+    def commit(self, stage: str):
+        self.sink.commit()
+
+def pending_epoch(conn) -> Optional[int]:
+    """Epoch with checkpoints but no recorded run, i.e. one that can be resumed"""
+    conn.execute(MANIFEST_TABLE)
+    row = conn.execute("""
+        SELECT MAX(epoch) FROM _pipeline_manifest
+        WHERE epoch NOT IN (SELECT epoch FROM _simulation_runs)
+    """).fetchone()
+    return row[0]
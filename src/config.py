@@ -0,0 +1,185 @@
+"""
+Run Configuration
+Defaults, named scale presets and the command-line interface
+"""
+
+import argparse
+import os
+from datetime import date
+
+from ids import ID_FORMATS
+from sinks import OUTPUT_FORMATS
+
+# Settings of a run when neither a preset nor a flag overrides them
+DEFAULT_CONFIG = {
+    'employee_count': 7500,  # Target: 5000-10000 (per organization)
+    'organizations': 1,  # >1 builds one database per organization (see shards.py)
+    'output_db': 'output/asana_simulation.sqlite',
+    'output_format': 'sqlite',  # 'csv'/'parquet' write one file per table to output_db minus .sqlite
+    'schema_file': 'schema.sql',
+    'start_date': '2024-07-01',  # 6 months of history
+    'end_date': '2026-01-06',  # Current date
+    'holidays': [],  # YYYY-MM-DD days due dates avoid like weekends (see business_calendar.py)
+    'seed': 42,  # Root RNG seed; None for a non-reproducible run
+    'chunk_size': 10000,  # Rows per streamed insert batch (bounds memory)
+    'workers': 1,  # Processes used for task generation (1 = serial)
+    'bulk_load': True,  # Defer indexes, tune PRAGMAs, load in one transaction
+    'write_thread': (os.cpu_count() or 1) > 1,  # Write on a background thread (see sinks.ThreadedSink)
+    'snapshot': True,  # Keep a pristine template of output_db for episode resets (see snapshots.py)
+    'stage_cache': True,  # Reuse stages whose inputs are unchanged (see stage_cache.py)
+    'stage_cache_mb': 1024,  # Least recently used stage cache entries go beyond this size
+    'vectorized': True,  # Sample task attributes as NumPy arrays per project
+    'use_llm': False,  # LLM task names/descriptions (needs ANTHROPIC_API_KEY; see llm.py)
+    'id_format': 'uuid',  # Primary keys: 'uuid', 'gid' (numeric string) or 'int' (INTEGER keys)
+    'incremental': False,  # Append tasks/comments/tags for start_date..end_date to output_db
+}
+
+# Named scales. `task_ranges` gives the (min, max) tasks per project by
+# status/type (see generators.tasks.TASK_RANGES for the default ranges).
+PRESETS = {
+    # Seconds-long fixture for CI
+    'smoke': {
+        'employee_count': 250,
+        'start_date': '2025-10-01',
+        'chunk_size': 2000,
+        'task_ranges': {
+            'archived': (1, 3),
+            'sprint': (3, 8),
+            'ongoing': (4, 10),
+            'default': (2, 6),
+        },
+    },
+    'default': {},
+    # Load-test scale: ~20x the default task volume
+    'xl': {
+        'employee_count': 100000,
+        'workers': os.cpu_count() or 1,
+        'chunk_size': 50000,
+        'task_ranges': {
+            'archived': (100, 300),
+            'sprint': (300, 800),
+            'ongoing': (400, 1200),
+            'default': (200, 600),
+        },
+    },
+}
+
+def _iso_date(value: str) -> str:
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a YYYY-MM-DD date, got {value!r}")
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def _seed(value: str):
+    return None if value.lower() == 'none' else int(value)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='python src/main.py',
+        description="Generate a seeded Asana workspace into SQLite. Settings come from "
+                    "the preset, then any flags given.")
+    parser.add_argument('--preset', choices=list(PRESETS), default='default',
+                        help="Scale preset (default: %(default)s)")
+    
+    scale = parser.add_argument_group('workspace')
+    scale.add_argument('--employees', type=_positive_int, dest='employee_count', metavar='N',
+                       help="Number of users")
+    scale.add_argument('--orgs', type=_positive_int, dest='organizations', metavar='N',
+                       help="Generate N organizations, one shard database each")
+    scale.add_argument('--start-date', type=_iso_date, metavar='DATE',
+                       help="First day of history (YYYY-MM-DD)")
+    scale.add_argument('--end-date', type=_iso_date, metavar='DATE',
+                       help="Last day of history, the simulation's 'now' (YYYY-MM-DD)")
+    scale.add_argument('--holidays', type=_iso_date, nargs='+', metavar='DATE',
+                       help="Non-working days that due dates avoid, like weekends")
+    scale.add_argument('--seed', type=_seed, default=argparse.SUPPRESS, metavar='SEED',
+                       help="Root RNG seed, or 'none' for a non-reproducible run")
+    scale.add_argument('--id-format', choices=ID_FORMATS, help="Primary key format")
+    scale.add_argument('--use-llm', action='store_true', default=None,
+                       help="Request task names/descriptions from the LLM (see llm.py)")
+    
+    run = parser.add_argument_group('run')
+    run.add_argument('--output', dest='output_db', metavar='PATH', help="SQLite database to write")
+    run.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS,
+                     help="Write SQLite, or CSV/Parquet files (one per table) in a directory "
+                          "named after --output without its extension")
+    run.add_argument('--workers', type=_positive_int, metavar='N',
+                     help="Processes used for task generation")
+    run.add_argument('--chunk-size', type=_positive_int, metavar='ROWS',
+                     help="Rows per streamed insert batch")
+    run.add_argument('--no-bulk-load', dest='bulk_load', action='store_false', default=None,
+                     help="Keep indexes and durable PRAGMAs during the load")
+    run.add_argument('--write-thread', action='store_true', default=None,
+                     help="Write rows on a background thread while generation continues "
+                          "(default when there is more than one CPU)")
+    run.add_argument('--no-write-thread', dest='write_thread', action='store_false', default=None,
+                     help="Write rows on the generating thread")
+    run.add_argument('--no-stage-cache', dest='stage_cache', action='store_false', default=None,
+                     help="Generate every stage instead of reusing cached ones")
+    run.add_argument('--stage-cache-mb', type=_positive_int, metavar='MB',
+                     help="Disk size the stage cache is trimmed to")
+    run.add_argument('--no-snapshot', dest='snapshot', action='store_false', default=None,
+                     help="Do not keep a pristine template of --output for episode resets")
+    run.add_argument('--scalar', dest='vectorized', action='store_false', default=None,
+                     help="Sample task attributes row by row instead of with NumPy")
+    run.add_argument('--incremental', action='store_true', default=None,
+                     help="Append start-date..end-date to an existing database")
+    run.add_argument('--resume', action='store_true',
+                     help="Continue an interrupted run from its last completed stage")
+    run.add_argument('--merge', action='store_true',
+                     help="With --orgs, also combine the shards into --output")
+    
+    diagnostics = parser.add_argument_group('diagnostics')
+    diagnostics.add_argument('--metrics', metavar='PATH',
+                             help="Write per-stage metrics: Prometheus textfile if PATH ends "
+                                  "in .prom, otherwise appended JSON lines")
+    diagnostics.add_argument('--profile', metavar='DIR',
+                             help="Run each stage under cProfile and write DIR/<stage>.pstats")
+    return parser
+
+# Flags that map onto config keys of the same name
+CONFIG_FLAGS = ('employee_count', 'organizations', 'start_date', 'end_date', 'holidays', 'seed',
+                'id_format', 'use_llm', 'output_db', 'output_format', 'workers', 'chunk_size',
+                'bulk_load', 'write_thread', 'snapshot', 'stage_cache', 'stage_cache_mb', 'vectorized',
+                'incremental')
+
+def resolve_config(preset: str = 'default', **overrides) -> dict:
+    """DEFAULT_CONFIG updated with a preset and then with any non-None overrides"""
+    config = {**DEFAULT_CONFIG, **PRESETS[preset], 'preset': preset}
+    config.update({key: value for key, value in overrides.items() if value is not None})
+    if config['start_date'] >= config['end_date']:
+        raise ValueError(f"start_date {config['start_date']} must be before "
+                         f"end_date {config['end_date']}")
+    if config['incremental'] and config['output_format'] != 'sqlite':
+        raise ValueError("Incremental runs need output_format='sqlite', "
+                         f"not {config['output_format']!r}")
+    return config
+
+def parse_args(argv=None) -> tuple:
+    """
+    Parse the command line
+    
+    Returns:
+        (config dict, argparse namespace with the run options)
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    overrides = {key: getattr(args, key, None) for key in CONFIG_FLAGS}
+    try:
+        config = resolve_config(args.preset, **overrides)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.merge and config['organizations'] == 1:
+        parser.error("--merge needs --orgs greater than 1")
+    if (args.resume or args.merge) and config['output_format'] != 'sqlite':
+        parser.error("--resume and --merge need --format sqlite")
+    # Unlike other flags, `--seed none` is an explicit None
+    if hasattr(args, 'seed'):
+        config['seed'] = args.seed
+    return config, args
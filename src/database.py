@@ -0,0 +1,216 @@
+"""
+Database Setup
+Schema creation, bulk-load tuning and post-load index building for the SQLite output
+"""
+
+import re
+import sqlite3
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Connection settings for bulk loading: no fsync and a large page cache.
+# The rollback journal is kept (truncated rather than deleted, which is as
+# fast as turning it off for an append-only load) so each pipeline stage
+# commits atomically and an interrupted run can be resumed.
+BULK_LOAD_PRAGMAS = [
+    "PRAGMA journal_mode = TRUNCATE",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA cache_size = -262144",  # 256 MiB
+    "PRAGMA temp_store = MEMORY",
+]
+
+# Settings for appending to an existing database: keep the rollback
+# journal (a crash must not corrupt data from earlier runs) but skip fsync
+INCREMENTAL_PRAGMAS = [
+    "PRAGMA synchronous = OFF",
+    "PRAGMA cache_size = -262144",  # 256 MiB
+    "PRAGMA temp_store = MEMORY",
+]
+
+# Bookkeeping table: one row per generation run (epoch 0 is the full build)
+RUNS_TABLE = """
+    CREATE TABLE IF NOT EXISTS _simulation_runs (
+        epoch INTEGER PRIMARY KEY,
+        mode TEXT NOT NULL,
+        start_date TEXT NOT NULL,
+        end_date TEXT NOT NULL,
+        seed INTEGER,
+        id_format TEXT NOT NULL,
+        finished_at TIMESTAMP NOT NULL
+    )
+"""
+
+def integer_key_schema(schema: str) -> str:
+    """
+    Rewrite a schema's TEXT primary and foreign key columns as INTEGER
+    
+    Key columns are found from the `TEXT PRIMARY KEY` and `FOREIGN KEY (...)`
+    clauses, so single-column primary keys become rowid aliases and every
+    reference to them is stored as a varint instead of a 36-byte string.
+    """
+    keys = set(re.findall(r'(\w+)\s+TEXT\s+PRIMARY\s+KEY', schema))
+    keys |= set(re.findall(r'FOREIGN\s+KEY\s*\((\w+)\)', schema))
+    
+    def retype(match):
+        return f"{match.group(1)}{match.group(2)} INTEGER" if match.group(2) in keys else match.group(0)
+    
+    return re.sub(r'^(\s+)(\w+)\s+TEXT\b', retype, schema, flags=re.MULTILINE)
+
+def load_schema(schema_path: str, id_format: str = 'uuid') -> str:
+    """Read the schema, switching to INTEGER keys when ids are integers"""
+    with open(schema_path, 'r') as f:
+        schema = f.read()
+    return integer_key_schema(schema) if id_format == 'int' else schema
+
+def split_schema(schema: str) -> Tuple[List[str], List[str]]:
+    """
+    Split a schema script into (table statements, index statements)
+    
+    Statements are delimited with sqlite3.complete_statement so comments
+    and multi-line definitions are handled the way SQLite parses them.
+    """
+    tables, indexes = [], []
+    statement = ''
+    for line in schema.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            sql = statement.strip()
+            body = '\n'.join(l for l in sql.splitlines() if not l.strip().startswith('--'))
+            if body.lstrip().upper().startswith('CREATE INDEX'):
+                indexes.append(sql)
+            else:
+                tables.append(sql)
+            statement = ''
+    return tables, indexes
+
+def table_columns(schema: str) -> Dict[str, Dict[str, str]]:
+    """
+    Declared column types of every table in a schema script
+    
+    Returns:
+        {table: {column: type}} in declaration order, e.g.
+        {'tags': {'tag_id': 'TEXT', 'org_id': 'TEXT', ...}}
+    """
+    columns = {}
+    for statement in split_schema(schema)[0]:
+        table = re.search(r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)', statement,
+                          re.IGNORECASE)
+        if table:
+            columns[table.group(1)] = {
+                name: kind.upper() for name, kind in re.findall(
+                    r'^\s+(\w+)\s+(\w+)', statement, re.MULTILINE)
+                if name.upper() not in ('PRIMARY', 'FOREIGN', 'UNIQUE', 'CHECK', 'CONSTRAINT')
+            }
+    return columns
+
+def initialize_database(db_path: str, schema_path: str, bulk_load: bool = False,
+                        id_format: str = 'uuid'):
+    """
+    Create database and initialize schema
+    
+    In bulk-load mode only the tables are created; indexes are built by
+    finalize_database once every row has been inserted. With
+    `id_format='int'` the INTEGER-key variant of the schema is used.
+    """
+    logger.info(f"Initializing database at {db_path}")
+    
+    # Create output directory if it doesn't exist
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    
+    # Remove existing database
+    if Path(db_path).exists():
+        Path(db_path).unlink()
+        logger.info("Removed existing database")
+    
+    # Create new database and execute schema (a sinks.ThreadedSink writes
+    # through the connection from its own thread, never concurrently)
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    schema = load_schema(schema_path, id_format)
+    
+    if bulk_load:
+        for pragma in BULK_LOAD_PRAGMAS:
+            conn.execute(pragma)
+        tables, _ = split_schema(schema)
+        conn.executescript(';\n'.join(tables) + ';')
+        logger.info("Database tables created (bulk-load mode, indexes deferred)")
+    else:
+        conn.executescript(schema)
+        logger.info("Database schema created successfully")
+    conn.commit()
+    
+    return conn
+
+def open_database(db_path: str, bulk_load: bool = False):
+    """
+    Open an existing database for an incremental or resumed run
+    
+    Raises:
+        FileNotFoundError: If there is no database to append to
+    """
+    if not Path(db_path).exists():
+        raise FileNotFoundError(f"No database at {db_path}; run a full build first")
+    
+    logger.info(f"Opening existing database at {db_path}")
+    # Usable from a sinks.ThreadedSink writer thread
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    for pragma in (BULK_LOAD_PRAGMAS if bulk_load else INCREMENTAL_PRAGMAS):
+        conn.execute(pragma)
+    conn.execute(RUNS_TABLE)
+    conn.commit()
+    return conn
+
+def last_run(conn) -> Optional[dict]:
+    """
+    The most recent run recorded in the database
+    
+    Databases built before runs were recorded count as epoch 0 covering
+    the range of their task timestamps.
+    """
+    conn.execute(RUNS_TABLE)
+    row = conn.execute("""
+        SELECT epoch, mode, start_date, end_date, seed, id_format
+        FROM _simulation_runs ORDER BY epoch DESC LIMIT 1
+    """).fetchone()
+    if row:
+        return dict(zip(['epoch', 'mode', 'start_date', 'end_date', 'seed', 'id_format'], row))
+    
+    start, end, task_id = conn.execute(
+        "SELECT MIN(created_at), MAX(created_at), MIN(task_id) FROM tasks").fetchone()
+    if start is None:
+        return None
+    if isinstance(task_id, int):
+        id_format = 'int'
+    else:
+        id_format = 'gid' if task_id.isdigit() else 'uuid'
+    return {'epoch': 0, 'mode': 'full', 'start_date': start[:10], 'end_date': end[:10],
+            'seed': None, 'id_format': id_format}
+
+def record_run(conn, config: dict, mode: str):
+    """Record a finished run so the next incremental run can follow on from it"""
+    conn.execute(RUNS_TABLE)
+    conn.execute("INSERT INTO _simulation_runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                 (config.get('epoch', 0), mode, config['start_date'], config['end_date'],
+                  config.get('seed'), config.get('id_format', 'uuid'),
+                  datetime.now().isoformat(timespec='seconds')))
+
+def finalize_database(conn, schema_path: str, bulk_load: bool = False):
+    """
+    Build deferred indexes (bulk-load mode) and refresh planner statistics
+    
+    Indexes missing from a database created with an older schema.sql are
+    built as well, so an incremental run brings it up to date.
+    """
+    _, indexes = split_schema(load_schema(schema_path))
+    if bulk_load:
+        logger.info(f"Building {len(indexes)} deferred indexes")
+    for statement in indexes:
+        # IF NOT EXISTS: a resumed run may have built some already
+        conn.execute(re.sub(r'^CREATE INDEX\b', 'CREATE INDEX IF NOT EXISTS', statement,
+                            flags=re.MULTILINE | re.IGNORECASE))
+    
+    conn.execute("ANALYZE")
+    conn.commit()
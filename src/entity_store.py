@@ -0,0 +1,211 @@
+"""
+Entity Store
+Compact, columnar in-memory record of generated entities shared by all generators
+"""
+
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+class StringPool:
+    """Interns repeated strings (departments, job titles) as small integer codes"""
+    
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+    
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+    
+    def encode(self, values) -> np.ndarray:
+        return np.fromiter((self.code(v) for v in values), dtype=np.int16)
+    
+    def decode(self, codes: np.ndarray) -> List[str]:
+        return [self.values[c] for c in codes.tolist()]
+
+class ColumnTable:
+    """
+    Append-only columnar table
+    
+    A row's position is its integer surrogate id; `ids` holds the public
+    TEXT primary keys used in the database. Other columns are NumPy arrays
+    appended chunk by chunk and concatenated on first read.
+    """
+    
+    def __init__(self, **dtypes):
+        self.dtypes = dtypes
+        self.ids: List[str] = []
+        self._chunks = {name: [] for name in dtypes}
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def append(self, ids: List[str], **columns):
+        self.ids.extend(ids)
+        for name, dtype in self.dtypes.items():
+            self._chunks[name].append(np.asarray(columns[name], dtype=dtype))
+    
+    def __getitem__(self, name: str) -> np.ndarray:
+        chunks = self._chunks[name]
+        if not chunks:
+            return np.empty(0, dtype=self.dtypes[name])
+        if len(chunks) > 1:
+            chunks[:] = [np.concatenate(chunks)]
+        return chunks[0]
+    
+    def take_ids(self, positions) -> List[str]:
+        """Public ids for an array of surrogate ids (-1 maps to None)"""
+        ids = self.ids
+        return [ids[p] if p >= 0 else None for p in np.asarray(positions).tolist()]
+
+class EntityStore:
+    """
+    Everything later generators need to know about earlier ones
+    
+    Users and tasks, the tables that grow with workspace size, are kept as
+    ColumnTables with integer surrogate ids and interned strings instead
+    of per-row dicts. Teams, projects and sections are small and kept as
+    plain lookups. Generators record entities as they create them, so
+    steps such as tasks, comments and custom fields never re-query SQLite.
+    """
+    
+    def __init__(self):
+        self.strings = StringPool()
+        self.users = ColumnTable(department=np.int16, job_title=np.int16,
+                                 created_at='datetime64[s]', is_active=np.bool_)
+        self.tasks = ColumnTable(project=np.int32, parent=np.int32,
+                                 assignee=np.int32, created_by=np.int32,
+                                 created_at='datetime64[s]', completed_at='datetime64[s]')
+        self.team_names: Dict[str, str] = {}
+        self.team_members: Dict[str, array] = {}
+        self.project_ids: List[str] = []
+        self.project_positions: Dict[str, int] = {}
+        self.project_teams: Dict[str, str] = {}
+        self.project_sections: Dict[str, List[dict]] = {}
+        self._project_members: Dict[str, np.ndarray] = {}
+        self._top_tasks_by_project: Optional[Dict[int, np.ndarray]] = None
+    
+    # --- Recording -------------------------------------------------------
+    
+    def add_team(self, team: dict):
+        self.team_names[team['team_id']] = team['name']
+        self.team_members.setdefault(team['team_id'], array('i'))
+    
+    def add_users(self, user_ids: List[str], departments: List[str], job_titles: List[str],
+                  created_at: np.ndarray, is_active: np.ndarray) -> int:
+        """Record a chunk of users; returns the surrogate id of the first one"""
+        first = len(self.users)
+        self.users.append(user_ids,
+                          department=self.strings.encode(departments),
+                          job_title=self.strings.encode(job_titles),
+                          created_at=created_at,
+                          is_active=is_active)
+        return first
+    
+    def add_membership(self, team_id: str, user: int):
+        self.team_members[team_id].append(user)
+    
+    def add_project(self, project: dict):
+        project_id = project['project_id']
+        self.project_positions[project_id] = len(self.project_ids)
+        self.project_ids.append(project_id)
+        self.project_teams[project_id] = project['team_id']
+        self.project_sections.setdefault(project_id, [])
+    
+    def add_section(self, section_id: str, project_id: str, name: str):
+        """Record a section; sections must be added in position order"""
+        self.project_sections[project_id].append({
+            'section_id': section_id,
+            'name': name
+        })
+    
+    def add_tasks(self, rows: List[tuple], user_positions: Dict[str, int]):
+        """
+        Record a project's task rows (in TASK_COLUMNS order)
+        
+        `user_positions` maps the assignee/creator ids that can appear in
+        these rows to user surrogate ids; parents must be in the same batch.
+        """
+        if not rows:
+            return
+        first = len(self.tasks)
+        (task_ids, project_ids, _, parent_ids, _, _, assignee_ids, creator_ids,
+         created_at, _, _, completed_at, _) = zip(*rows)
+        local = {task_id: first + i for i, task_id in enumerate(task_ids)}
+        
+        self.tasks.append(
+            task_ids,
+            project=[self.project_positions[p] for p in project_ids],
+            parent=[local[p] if p else -1 for p in parent_ids],
+            assignee=[user_positions[a] if a else -1 for a in assignee_ids],
+            created_by=[user_positions[c] for c in creator_ids],
+            created_at=np.array(created_at, dtype='datetime64[s]'),
+            completed_at=np.array([c or 'NaT' for c in completed_at], dtype='datetime64[s]'),
+        )
+        self._top_tasks_by_project = None
+    
+    # --- Lookups ---------------------------------------------------------
+    
+    def project_team_name(self, project_id: str) -> str:
+        return self.team_names.get(self.project_teams.get(project_id), '')
+    
+    def users_in_department(self, department: str) -> np.ndarray:
+        """Surrogate ids of every user in a department"""
+        return np.flatnonzero(self.users['department'] == self.strings.code(department))
+    
+    def project_member_positions(self, project_id: str) -> np.ndarray:
+        """Surrogate ids of the active members of the project's team, in membership order"""
+        members = self._project_members.get(project_id)
+        if members is None:
+            team = self.team_members.get(self.project_teams.get(project_id), array('i'))
+            members = np.frombuffer(team, dtype=np.int32) if len(team) else np.empty(0, np.int32)
+            members = members[self.users['is_active'][members]]
+            self._project_members[project_id] = members
+        return members
+    
+    def project_members(self, project_id: str) -> List[str]:
+        """User ids of the active members of the project's team"""
+        return self.users.take_ids(self.project_member_positions(project_id))
+    
+    def top_level_tasks(self) -> np.ndarray:
+        """Surrogate ids of top-level tasks, in insertion order"""
+        return np.flatnonzero(self.tasks['parent'] < 0)
+    
+    def project_top_tasks(self, project_id: str) -> List[str]:
+        """Ids of a project's top-level tasks, in insertion order"""
+        if self._top_tasks_by_project is None:
+            top = self.top_level_tasks()
+            projects = self.tasks['project'][top]
+            order = np.argsort(projects, kind='stable')
+            bounds = np.searchsorted(projects[order], np.arange(len(self.project_ids) + 1))
+            self._top_tasks_by_project = {
+                p: top[order[bounds[p]:bounds[p + 1]]] for p in range(len(self.project_ids))
+            }
+        position = self.project_positions.get(project_id)
+        if position is None:
+            return []
+        return self.tasks.take_ids(self._top_tasks_by_project[position])
+    
+    def iter_task_chunks(self, chunk_size: int, top_level_only: bool = True) -> Iterator[dict]:
+        """
+        Yield tasks as dicts of column slices, `chunk_size` tasks at a time
+        
+        Keys: task_id, project_id, assignee_id, created_by (lists of ids or
+        None) and created_at, completed_at (datetime64 arrays).
+        """
+        positions = self.top_level_tasks() if top_level_only else np.arange(len(self.tasks))
+        for start in range(0, len(positions), chunk_size):
+            chunk = positions[start:start + chunk_size]
+            yield {
+                'task_id': self.tasks.take_ids(chunk),
+                'project_id': [self.project_ids[p] for p in self.tasks['project'][chunk].tolist()],
+                'assignee_id': self.users.take_ids(self.tasks['assignee'][chunk]),
+                'created_by': self.users.take_ids(self.tasks['created_by'][chunk]),
+                'created_at': self.tasks['created_at'][chunk],
+                'completed_at': self.tasks['completed_at'][chunk],
+            }
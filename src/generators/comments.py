@@ -3,9 +3,11 @@ Comments Generator
 Creates realistic task comments and activity
 """
 
-import random
-from datetime import datetime, timedelta
-from utils import generate_uuid, batch_insert
+from datetime import timedelta
+import numpy as np
+from rng import stage_rng
+from templates import TemplateSet
+from utils import simulation_now, datetimes_to_iso, DEFAULT_CHUNK_SIZE
 
 COMMENT_TEMPLATES = [
     "Started working on this task.",
@@ -37,36 +39,39 @@ STATUSES = ["50% complete", "almost done", "in final review", "waiting for feedb
 QUESTIONS = ["should we include error handling for X?", "what's the expected behavior for edge case Y?",
             "is this the right approach?", "need clarification on requirements"]
 RELATED_ITEMS = ["authentication", "API integration", "dashboard updates", "database migration"]
+COMPONENTS = ['API', 'UI', 'database', 'service']
+ASPECTS = ['layout', 'interaction', 'styling', 'flow']
+TEAMS = ['product', 'engineering', 'design']
+PEOPLE = ['Sarah', 'John', 'Alex', 'Maria']
 
-def generate_comment_content() -> str:
+# Comment templates parsed once; slots are drawn in this order
+COMMENTS = TemplateSet(COMMENT_TEMPLATES, {
+    'blocker': BLOCKERS,
+    'reason': REASONS,
+    'status': STATUSES,
+    'question': QUESTIONS,
+    'component': COMPONENTS,
+    'aspect': ASPECTS,
+    'team': TEAMS,
+    'related': RELATED_ITEMS,
+    'person': PEOPLE,
+})
+
+def generate_comment_content(rng) -> str:
     """Generate realistic comment content"""
-    template = random.choice(COMMENT_TEMPLATES)
-    
-    # Fill in template variables
-    if '{blocker}' in template:
-        template = template.replace('{blocker}', random.choice(BLOCKERS))
-    if '{reason}' in template:
-        template = template.replace('{reason}', random.choice(REASONS))
-    if '{status}' in template:
-        template = template.replace('{status}', random.choice(STATUSES))
-    if '{question}' in template:
-        template = template.replace('{question}', random.choice(QUESTIONS))
-    if '{component}' in template:
-        template = template.replace('{component}', random.choice(['API', 'UI', 'database', 'service']))
-    if '{aspect}' in template:
-        template = template.replace('{aspect}', random.choice(['layout', 'interaction', 'styling', 'flow']))
-    if '{team}' in template:
-        template = template.replace('{team}', random.choice(['product', 'engineering', 'design']))
-    if '{related}' in template:
-        template = template.replace('{related}', random.choice(RELATED_ITEMS))
-    if '{person}' in template:
-        template = template.replace('{person}', random.choice(['Sarah', 'John', 'Alex', 'Maria']))
-    
-    return template
+    return COMMENTS.render(rng)
+
+def potential_commenters(store, project_id: str, created_by: str, assignee_id) -> list:
+    """Creator, assignee and up to 5 project team members, de-duplicated in a stable order"""
+    return list(dict.fromkeys([created_by] + 
+                              ([assignee_id] if assignee_id else []) +
+                              store.project_members(project_id)[:5]))
 
-def generate_comments(conn, tasks: list, users: list, config: dict):
+def iter_comment_rows(rng, task_chunks, config: dict, store):
     """
-    Generate comments for tasks
+    Yield comment rows task by task
+    
+    `task_chunks` are column chunks from EntityStore.iter_task_chunks.
     
     Based on research:
     - 40% of tasks have no comments
@@ -74,60 +79,39 @@ def generate_comments(conn, tasks: list, users: list, config: dict):
     - 20% have 3-5 comments
     - 5% have 6+ comments (very active discussions)
     """
-    cursor = conn.cursor()
-    comments_data = []
-    
-    # Get full task data including assignee
-    cursor.execute("""
-        SELECT task_id, assignee_id, created_by, created_at, completed_at, project_id
-        FROM tasks
-        WHERE parent_task_id IS NULL
-    """)
-    task_rows = cursor.fetchall()
+    now = simulation_now(config)
     
-    # Get project team members
-    project_members = {}
-    for task_id, _, _, _, _, project_id in task_rows:
-        if project_id not in project_members:
-            cursor.execute("""
-                SELECT DISTINCT u.user_id
-                FROM users u
-                JOIN team_memberships tm ON u.user_id = tm.user_id
-                JOIN projects p ON tm.team_id = p.team_id
-                WHERE p.project_id = ? AND u.is_active = 1
-                LIMIT 10
-            """, (project_id,))
-            project_members[project_id] = [row[0] for row in cursor.fetchall()]
+    task_rows = ((task_id, assignee_id, created_by, created_at, completed_at, project_id)
+                 for chunk in task_chunks
+                 for task_id, assignee_id, created_by, created_at, completed_at, project_id
+                 in zip(chunk['task_id'], chunk['assignee_id'], chunk['created_by'],
+                        chunk['created_at'].tolist(), chunk['completed_at'].tolist(),
+                        chunk['project_id']))
     
     for task_id, assignee_id, created_by, created_at, completed_at, project_id in task_rows:
         # Determine number of comments
-        rand = random.random()
+        rand = rng.random()
         if rand < 0.40:
             num_comments = 0
         elif rand < 0.75:
-            num_comments = random.randint(1, 2)
+            num_comments = rng.randint(1, 2)
         elif rand < 0.95:
-            num_comments = random.randint(3, 5)
+            num_comments = rng.randint(3, 5)
         else:
-            num_comments = random.randint(6, 10)
+            num_comments = rng.randint(6, 10)
         
         if num_comments == 0:
             continue
         
         # Get potential commenters (assignee, creator, team members)
-        potential_commenters = list(set([created_by] + 
-                                       ([assignee_id] if assignee_id else []) +
-                                       project_members.get(project_id, [])[:5]))
-        
-        if not potential_commenters:
-            continue
+        commenters = potential_commenters(store, project_id, created_by, assignee_id)
         
-        task_created = datetime.fromisoformat(created_at)
-        task_completed = datetime.fromisoformat(completed_at) if completed_at else datetime.now()
+        task_created = created_at
+        task_completed = completed_at or now
         
         # Generate comments spread over task lifetime
         for i in range(num_comments):
-            comment_id = generate_uuid()
+            comment_id = rng.ids()
             
             # Comments distributed over task lifetime
             progress = (i + 1) / (num_comments + 1)
@@ -136,33 +120,124 @@ def generate_comments(conn, tasks: list, users: list, config: dict):
             
             comment_time = task_created + timedelta(
                 days=comment_day,
-                hours=random.randint(9, 18),
-                minutes=random.randint(0, 59)
+                hours=rng.randint(9, 18),
+                minutes=rng.randint(0, 59)
             )
             
             # Ensure comment is not in future
-            if comment_time > datetime.now():
-                comment_time = datetime.now() - timedelta(hours=random.randint(1, 48))
+            if comment_time > now:
+                comment_time = now - timedelta(hours=rng.randint(1, 48))
             
             # Select commenter (assignee more likely if exists)
-            if assignee_id and random.random() < 0.60:
+            if assignee_id and rng.random() < 0.60:
                 commenter = assignee_id
             else:
-                commenter = random.choice(potential_commenters)
+                commenter = rng.choice(commenters)
             
-            content = generate_comment_content()
+            content = generate_comment_content(rng)
             
-            comments_data.append((
+            yield (
                 comment_id,
                 task_id,
                 commenter,
                 content,
                 comment_time.isoformat()
-            ))
+            )
+
+def iter_comment_rows_vectorized(rng, task_chunks, config: dict, store):
+    """
+    Yield comment rows, sampling a chunk of tasks at a time with NumPy
+    
+    Comment counts for every task in the chunk are drawn at once from the
+    same 40/35/20/5 histogram as iter_comment_rows, and all timestamps are
+    computed with datetime64 arithmetic between created_at and
+    completed_at (or the simulation's `now` for open tasks).
+    """
+    now = np.datetime64(simulation_now(config), 's')
+    one_day = np.timedelta64(1, 'D')
+    
+    for chunk in task_chunks:
+        task_ids = chunk['task_id']
+        assignee_ids = chunk['assignee_id']
+        created_bys = chunk['created_by']
+        project_ids = chunk['project_id']
+        size = len(task_ids)
+        
+        # Number of comments per task: 0 / 1-2 / 3-5 / 6-10
+        rand = rng.np.random(size)
+        counts = np.select(
+            [rand < 0.40, rand < 0.75, rand < 0.95],
+            [0, rng.np.integers(1, 3, size), rng.np.integers(3, 6, size)],
+            rng.np.integers(6, 11, size)
+        )
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        
+        # One element per comment from here on
+        task_idx = np.repeat(np.arange(size), counts)
+        ordinal = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        progress = (ordinal + 1) / (counts[task_idx] + 1)
+        
+        # Comments distributed over task lifetime
+        created = chunk['created_at']
+        completed = chunk['completed_at']
+        completed = np.where(np.isnat(completed), now, completed)
+        days_range = ((completed - created) // one_day)[task_idx]
+        comment_day = (days_range * progress).astype(np.int64)
+        
+        offset = (comment_day * 86400
+                  + rng.np.integers(9, 19, total) * 3600
+                  + rng.np.integers(0, 60, total) * 60)
+        comment_time = created[task_idx] + offset.astype('timedelta64[s]')
+        
+        # Ensure comment is not in future
+        hours_back = rng.np.integers(1, 49, total).astype('timedelta64[h]')
+        comment_time = np.where(comment_time > now, now - hours_back, comment_time)
+        
+        # Select commenter (assignee more likely if exists)
+        prefer_assignee = rng.np.random(total) < 0.60
+        pick = rng.np.random(total)
+        commenters = [potential_commenters(store, project_ids[i], created_bys[i], assignee_ids[i])
+                      for i in range(size)]
+        contents = COMMENTS.render_many(rng, total)
+        
+        for j, (i, comment_iso) in enumerate(zip(task_idx.tolist(), datetimes_to_iso(comment_time))):
+            assignee_id = assignee_ids[i]
+            if assignee_id and prefer_assignee[j]:
+                commenter = assignee_id
+            else:
+                candidates = commenters[i]
+                commenter = candidates[int(pick[j] * len(candidates))]
+            
+            yield (
+                rng.ids(),
+                task_ids[i],
+                commenter,
+                contents[j],
+                comment_iso
+            )
+
+def generate_comments(sink, tasks, users, config: dict, store) -> int:
+    """
+    Generate comments for top-level tasks
+    
+    Task data is read from the EntityStore rather than queried back out
+    of SQLite; rows are streamed into the database in chunks of
+    `config['chunk_size']`.
+    
+    Returns:
+        Number of comments created
+    """
+    chunk_size = config.get('chunk_size', DEFAULT_CHUNK_SIZE)
+    task_chunks = store.iter_task_chunks(chunk_size)
     
-    # Batch insert
-    batch_insert(conn, 'comments',
-                ['comment_id', 'task_id', 'user_id', 'content', 'created_at'],
-                comments_data)
+    rng = stage_rng(config, 'comments')
+    if config.get('vectorized', True):
+        rows = iter_comment_rows_vectorized(rng, task_chunks, config, store)
+    else:
+        rows = iter_comment_rows(rng, task_chunks, config, store)
     
-    return comments_data
\ No newline at end of file
+    return sink.write('comments',
+                      ['comment_id', 'task_id', 'user_id', 'content', 'created_at'],
+                      rows, chunk_size)
@@ -3,9 +3,9 @@ Custom Fields Generator
 Creates project-specific custom fields and their values
 """
 
-import random
 import json
-from utils import generate_uuid, batch_insert
+from rng import stage_rng
+from utils import DEFAULT_CHUNK_SIZE
 
 # Common custom field definitions by project type
 CUSTOM_FIELD_TEMPLATES = {
@@ -39,84 +39,78 @@ CUSTOM_FIELD_TEMPLATES = {
     ]
 }
 
-def generate_custom_fields(conn, projects: list, tasks: list, config: dict):
+def iter_field_value_rows(rng, field_definitions: list, store):
+    """Yield custom field value rows for the tasks of each defined field's project"""
+    for field_id, project_id, _, field_type, options in field_definitions:
+        options = json.loads(options)
+        
+        # Generate values for top-level tasks in this project
+        for task_id in store.project_top_tasks(project_id):
+            # 70% of tasks have values for custom fields
+            if rng.random() < 0.70:
+                value_id = rng.ids()
+                
+                # Select value based on field type
+                if field_type == 'dropdown':
+                    value = rng.choice(options)
+                elif field_type == 'number':
+                    value = str(rng.randint(1, 10))
+                elif field_type == 'text':
+                    value = "Custom text value"
+                elif field_type == 'checkbox':
+                    value = str(rng.choice([True, False]))
+                else:
+                    value = None
+                
+                if value:
+                    yield (
+                        value_id,
+                        task_id,
+                        field_id,
+                        value
+                    )
+
+def generate_custom_fields(sink, projects: list, tasks, config: dict, store,
+                           field_definitions: list = None) -> int:
     """
     Generate custom field definitions and values for projects
+    
+    Values are streamed into the database in chunks of `config['chunk_size']`.
+    An incremental run passes the existing `field_definitions` (see
+    loaders.load_field_definitions) and only values are generated.
     """
-    cursor = conn.cursor()
+    rng = stage_rng(config, 'custom_fields')
+    if field_definitions is not None:
+        return sink.write('custom_field_values',
+                          ['value_id', 'task_id', 'field_id', 'value'],
+                          iter_field_value_rows(rng, field_definitions, store),
+                          config.get('chunk_size', DEFAULT_CHUNK_SIZE))
     
     field_definitions = []
-    field_values = []
-    
     for project in projects:
         project_type = project['project_type']
         templates = CUSTOM_FIELD_TEMPLATES.get(project_type, [])
         
         # Each project gets 1-2 custom fields
-        num_fields = random.randint(1, min(2, len(templates)))
-        project_templates = random.sample(templates, num_fields) if templates else []
+        num_fields = rng.randint(1, min(2, len(templates)))
+        project_templates = rng.sample(templates, num_fields) if templates else []
         
         for template in project_templates:
-            field_id = generate_uuid()
-            
-            field_def = {
-                'field_id': field_id,
-                'project_id': project['project_id'],
-                'name': template['name'],
-                'field_type': template['type'],
-                'options': json.dumps(template.get('options', []))
-            }
-            
             field_definitions.append((
-                field_id,
+                rng.ids(),
                 project['project_id'],
                 template['name'],
                 template['type'],
                 json.dumps(template.get('options', []))
             ))
-            
-            # Generate values for tasks in this project
-            cursor.execute("""
-                SELECT task_id FROM tasks 
-                WHERE project_id = ? AND parent_task_id IS NULL
-            """, (project['project_id'],))
-            
-            project_tasks = cursor.fetchall()
-            
-            for (task_id,) in project_tasks:
-                # 70% of tasks have values for custom fields
-                if random.random() < 0.70:
-                    value_id = generate_uuid()
-                    
-                    # Select value based on field type
-                    if template['type'] == 'dropdown':
-                        value = random.choice(template['options'])
-                    elif template['type'] == 'number':
-                        value = str(random.randint(1, 10))
-                    elif template['type'] == 'text':
-                        value = "Custom text value"
-                    elif template['type'] == 'checkbox':
-                        value = str(random.choice([True, False]))
-                    else:
-                        value = None
-                    
-                    if value:
-                        field_values.append((
-                            value_id,
-                            task_id,
-                            field_id,
-                            value
-                        ))
     
     # Batch insert
     if field_definitions:
-        batch_insert(conn, 'custom_field_definitions',
-                    ['field_id', 'project_id', 'name', 'field_type', 'options'],
-                    field_definitions)
-    
-    if field_values:
-        batch_insert(conn, 'custom_field_values',
-                    ['value_id', 'task_id', 'field_id', 'value'],
-                    field_values)
+        sink.write('custom_field_definitions',
+                   ['field_id', 'project_id', 'name', 'field_type', 'options'],
+                   field_definitions)
     
-    return len(field_values)
\ No newline at end of file
+    return sink.write('custom_field_values',
+                      ['value_id', 'task_id', 'field_id', 'value'],
+                      iter_field_value_rows(rng, field_definitions, store),
+                      config.get('chunk_size', DEFAULT_CHUNK_SIZE))
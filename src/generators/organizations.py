@@ -3,9 +3,9 @@ Organization/Workspace Generator
 Creates the top-level organization for the simulation
 """
 
-import random
-from datetime import datetime, timedelta
-from utils import generate_uuid, random_datetime_between
+from datetime import timedelta
+from rng import stage_rng
+from utils import simulation_now
 
 # Realistic B2B SaaS company names (sourced from YC, Crunchbase patterns)
 COMPANY_NAMES = [
@@ -23,30 +23,51 @@ COMPANY_DOMAINS = [
     "prismdata.com", "horizontech.io", "echostream.io", "nimbuslabs.com"
 ]
 
-def generate_organizations(conn, config: dict) -> dict:
+def company_identity(org_index: int) -> tuple:
+    """
+    Name and domain of organization `org_index` in a multi-organization run
+    
+    Shards are generated independently, so names are assigned by index
+    rather than drawn; past the end of the list they repeat with a number
+    ("DataStream 2", datastream2.com) to keep domains, and with them user
+    emails, unique across organizations.
+    """
+    idx = org_index % len(COMPANY_NAMES)
+    generation = org_index // len(COMPANY_NAMES)
+    name, domain = COMPANY_NAMES[idx], COMPANY_DOMAINS[idx]
+    if generation:
+        label, tld = domain.split('.', 1)
+        name, domain = f"{name} {generation + 1}", f"{label}{generation + 1}.{tld}"
+    return name, domain
+
+def generate_organizations(sink, config: dict) -> dict:
     """
     Generate a single organization (B2B SaaS company)
     
     Args:
-        conn: Database connection
+        sink: Sink the row is written to (see sinks.py)
         config: Configuration dict with employee_count
     
     Returns:
         dict with org details
     """
+    rng = stage_rng(config, 'organizations')
+    
     # Select random company
-    idx = random.randint(0, len(COMPANY_NAMES) - 1)
+    idx = rng.randint(0, len(COMPANY_NAMES) - 1)
     name = COMPANY_NAMES[idx]
     domain = COMPANY_DOMAINS[idx]
+    if config.get('organizations', 1) > 1:
+        name, domain = company_identity(config.get('org_index', 0))
     
     # Employee count from config (5000-10000 range)
     employee_count = config['employee_count']
     
     # Organization created 2-4 years ago (established company)
-    years_ago = random.randint(2, 4)
-    created_at = datetime.now() - timedelta(days=years_ago * 365)
+    years_ago = rng.randint(2, 4)
+    created_at = simulation_now(config) - timedelta(days=years_ago * 365)
     
-    org_id = generate_uuid()
+    org_id = rng.ids()
     
     org = {
         'org_id': org_id,
@@ -56,13 +77,8 @@ def generate_organizations(conn, config: dict) -> dict:
         'employee_count': employee_count
     }
     
-    # Insert into database
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO organizations (org_id, name, domain, created_at, employee_count)
-        VALUES (?, ?, ?, ?, ?)
-    """, (org_id, name, domain, created_at, employee_count))
-    
-    conn.commit()
+    # Write to the output
+    sink.write('organizations', ['org_id', 'name', 'domain', 'created_at', 'employee_count'],
+               [(org_id, name, domain, created_at, employee_count)])
     
     return org
\ No newline at end of file
@@ -3,9 +3,10 @@ Projects Generator
 Creates realistic projects based on team type and real-world patterns
 """
 
-import random
 from datetime import datetime, timedelta
-from utils import generate_uuid, random_date_between, batch_insert
+from rng import stage_rng
+from sampling import AliasSampler
+from utils import random_date_between
 
 # Project templates by department (sourced from Asana templates, ProductHunt, GitHub)
 PROJECT_TEMPLATES = {
@@ -88,10 +89,18 @@ SECTION_TEMPLATES = {
     'operations': ['To Do', 'In Progress', 'Blocked', 'Completed']
 }
 
-def generate_projects(conn, teams: list, users: list, config: dict):
+# Project status distribution
+PROJECT_STATUSES = AliasSampler(['active', 'archived', 'on_hold'], [0.70, 0.25, 0.05])
+
+def generate_projects(sink, teams: list, users, config: dict, store):
     """
     Generate realistic projects for each team
+    
+    Args:
+        users: Users ColumnTable from generate_users
+        store: EntityStore to record projects and sections in
     """
+    rng = stage_rng(config, 'projects')
     projects = []
     sections_data = []
     
@@ -106,12 +115,8 @@ def generate_projects(conn, teams: list, users: list, config: dict):
             teams_by_dept[dept] = []
         teams_by_dept[dept].append(team)
     
-    users_by_dept = {}
-    for user in users:
-        dept = user['department']
-        if dept not in users_by_dept:
-            users_by_dept[dept] = []
-        users_by_dept[dept].append(user)
+    # Surrogate ids of each department's users
+    users_by_dept = {dept: store.users_in_department(dept) for dept in teams_by_dept}
     
     # Generate projects for each team
     for team in teams:
@@ -119,11 +124,11 @@ def generate_projects(conn, teams: list, users: list, config: dict):
         templates = PROJECT_TEMPLATES.get(dept, PROJECT_TEMPLATES['Operations'])
         
         # Each team gets 2-5 projects
-        num_projects = random.randint(2, 5)
-        team_templates = random.sample(templates, min(num_projects, len(templates)))
+        num_projects = rng.randint(2, 5)
+        team_templates = rng.sample(templates, min(num_projects, len(templates)))
         
         for template in team_templates:
-            project_id = generate_uuid()
+            project_id = rng.ids()
             
             # Project name
             name = template['name']
@@ -131,34 +136,32 @@ def generate_projects(conn, teams: list, users: list, config: dict):
             
             # Description (30% have descriptions)
             description = None
-            if random.random() < 0.30:
+            if rng.random() < 0.30:
                 description = f"Project for {name}. Key objectives and deliverables to be tracked."
             
             # Project status
-            status_weights = [0.70, 0.25, 0.05]  # active, archived, on_hold
-            status = random.choices(['active', 'archived', 'on_hold'], 
-                                  weights=status_weights)[0]
+            status = PROJECT_STATUSES.sample(rng)
             
             # Owner from team's department
-            dept_users = users_by_dept.get(dept, users)
-            owner = random.choice(dept_users) if dept_users else random.choice(users)
+            dept_users = users_by_dept[dept]
+            owner = rng.choice(dept_users) if len(dept_users) else rng.randrange(len(users))
             
             # Created date
-            created_at = random_date_between(start_date, end_date, weight_to_start=True)
+            created_at = random_date_between(rng, start_date, end_date, weight_to_start=True)
             
             # Due date (sprint projects have due dates, ongoing ones often don't)
             due_date = None
             if project_type == 'sprint':
                 # Sprint projects: 2-6 weeks duration
-                weeks = random.randint(2, 6)
+                weeks = rng.randint(2, 6)
                 due_date = created_at + timedelta(weeks=weeks)
             elif project_type == 'campaign':
                 # Campaign projects: 1-3 months
-                months = random.randint(1, 3)
+                months = rng.randint(1, 3)
                 due_date = created_at + timedelta(days=30*months)
             elif project_type == 'operations':
-                if random.random() < 0.50:  # 50% have due dates
-                    months = random.randint(1, 4)
+                if rng.random() < 0.50:  # 50% have due dates
+                    months = rng.randint(1, 4)
                     due_date = created_at + timedelta(days=30*months)
             
             project = {
@@ -168,23 +171,25 @@ def generate_projects(conn, teams: list, users: list, config: dict):
                 'description': description,
                 'project_type': project_type,
                 'status': status,
-                'owner_id': owner['user_id'],
+                'owner_id': users.ids[owner],
                 'created_at': created_at.isoformat(),
                 'due_date': due_date.isoformat() if due_date else None
             }
             
             projects.append(project)
+            store.add_project(project)
             
             # Create sections for this project
             section_names = SECTION_TEMPLATES[project_type]
             for position, section_name in enumerate(section_names):
-                section_id = generate_uuid()
+                section_id = rng.ids()
                 sections_data.append((
                     section_id,
                     project_id,
                     section_name,
                     position
                 ))
+                store.add_section(section_id, project_id, section_name)
     
     # Batch insert projects
     project_data = [
@@ -193,14 +198,14 @@ def generate_projects(conn, teams: list, users: list, config: dict):
         for p in projects
     ]
     
-    batch_insert(conn, 'projects',
-                ['project_id', 'team_id', 'name', 'description', 'project_type',
-                 'status', 'owner_id', 'created_at', 'due_date'],
-                project_data)
+    sink.write('projects',
+               ['project_id', 'team_id', 'name', 'description', 'project_type',
+                'status', 'owner_id', 'created_at', 'due_date'],
+               project_data)
     
     # Batch insert sections
-    batch_insert(conn, 'sections',
-                ['section_id', 'project_id', 'name', 'position'],
-                sections_data)
+    sink.write('sections',
+               ['section_id', 'project_id', 'name', 'position'],
+               sections_data)
     
     return projects
\ No newline at end of file
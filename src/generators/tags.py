@@ -3,8 +3,9 @@ Tags Generator
 Creates organization-wide tags that can be applied across projects
 """
 
-import random
-from utils import generate_uuid, batch_insert
+from rng import stage_rng
+from sampling import AliasSampler
+from utils import DEFAULT_CHUNK_SIZE
 
 # Common tags used across organizations
 TAG_TEMPLATES = [
@@ -30,50 +31,52 @@ TAG_TEMPLATES = [
     {'name': 'research', 'color': '#9932CC'},
 ]
 
-def generate_tags(conn, org: dict, tasks: list, config: dict):
+# Tags applied to a tagged task
+TAGS_PER_TASK = AliasSampler([1, 2], [0.70, 0.30])
+
+def generate_tags(sink, org: dict, tasks, config: dict, store, tags_data: list = None):
     """
     Generate tags and apply them to tasks
-    """
-    cursor = conn.cursor()
     
-    # Create tags for organization
-    tags_data = []
-    tag_ids = {}
+    An incremental run passes the organization's existing `tags_data`
+    (see loaders.load_tags) and only applies them to the new tasks.
+    """
+    rng = stage_rng(config, 'tags')
     
-    for template in TAG_TEMPLATES:
-        tag_id = generate_uuid()
-        tags_data.append((
-            tag_id,
-            org['org_id'],
-            template['name'],
-            template['color']
-        ))
-        tag_ids[template['name']] = tag_id
+    if tags_data is None:
+        # Create tags for organization
+        tags_data = []
+        for template in TAG_TEMPLATES:
+            tags_data.append((
+                rng.ids(),
+                org['org_id'],
+                template['name'],
+                template['color']
+            ))
+        
+        sink.write('tags',
+                   ['tag_id', 'org_id', 'name', 'color'],
+                   tags_data)
     
-    batch_insert(conn, 'tags',
-                ['tag_id', 'org_id', 'name', 'color'],
-                tags_data)
+    tag_ids = {name: tag_id for tag_id, _, name, _ in tags_data}
     
     # Apply tags to tasks (30% of tasks have 1-2 tags)
-    cursor.execute("SELECT task_id FROM tasks WHERE parent_task_id IS NULL")
-    task_rows = cursor.fetchall()
-    
-    task_tags_data = []
-    for (task_id,) in task_rows:
-        if random.random() < 0.30:
-            # Apply 1-2 tags
-            num_tags = random.choices([1, 2], weights=[0.70, 0.30])[0]
-            selected_tags = random.sample(list(tag_ids.keys()), num_tags)
-            
-            for tag_name in selected_tags:
-                task_tags_data.append((
-                    task_id,
-                    tag_ids[tag_name]
-                ))
+    def iter_task_tag_rows():
+        for task_id in tasks.take_ids(store.top_level_tasks()):
+            if rng.random() < 0.30:
+                # Apply 1-2 tags
+                num_tags = TAGS_PER_TASK.sample(rng)
+                selected_tags = rng.sample(list(tag_ids.keys()), num_tags)
+                
+                for tag_name in selected_tags:
+                    yield (
+                        task_id,
+                        tag_ids[tag_name]
+                    )
     
-    if task_tags_data:
-        batch_insert(conn, 'task_tags',
-                    ['task_id', 'tag_id'],
-                    task_tags_data)
+    sink.write('task_tags',
+               ['task_id', 'tag_id'],
+               iter_task_tag_rows(),
+               config.get('chunk_size', DEFAULT_CHUNK_SIZE))
     
     return tags_data
\ No newline at end of file
@@ -5,10 +5,62 @@ Patterns derived from GitHub issues, Asana templates, and real project data
 """
 from datetime import datetime, timedelta
 
-import random
 from datetime import datetime
-from utils import (generate_uuid, generate_due_date, calculate_completion_status,
-                   call_llm_api, batch_insert, random_datetime_between)
+import numpy as np
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import Future
+from utils import (generate_due_date, calculate_completion_status,
+                   random_datetime_between,
+                   simulation_now, DEFAULT_CHUNK_SIZE,
+                   random_datetimes_between, generate_due_dates,
+                   calculate_completion_statuses, datetimes_to_iso)
+from parallel import map_ordered
+from rng import shard_rng, spawn_seeds
+from business_calendar import calendar_for, parse_date
+from templates import Template
+from sampling import AliasSampler
+from llm import ContentRequest, ContentService
+
+# Priority distribution
+PRIORITIES = ['low', 'medium', 'high', 'urgent']
+PRIORITY_WEIGHTS = [0.20, 0.50, 0.25, 0.05]
+PRIORITY_SAMPLER = AliasSampler(PRIORITIES, PRIORITY_WEIGHTS)
+
+# Section weights, toward earlier sections (projects have up to five)
+SECTION_WEIGHTS = [3, 2, 2, 1, 1]
+
+# (min, max) tasks per project: archived projects, then by project type
+TASK_RANGES = {
+    'archived': (5, 15),
+    'sprint': (15, 40),
+    'ongoing': (20, 60),
+    'default': (10, 30),
+}
+
+TASK_COLUMNS = ['task_id', 'project_id', 'section_id', 'parent_task_id',
+                'name', 'description', 'assignee_id', 'created_by',
+                'created_at', 'due_date', 'completed', 'completed_at', 'priority']
+
+# Bullet points of detailed descriptions (3-5 are sampled)
+DESCRIPTION_BULLETS = [
+    '- Review current implementation and identify issues',
+    '- Research best practices and alternatives',
+    '- Create detailed technical spec',
+    '- Implement changes with tests',
+    '- Update documentation',
+    '- Deploy to staging for QA review'
+]
+
+DESCRIPTION_STATUSES = ['Blocked by previous task.', 'Ready to start.', 'Needs design review first.']
+
+# Short (1-3 sentence) description templates, parsed once
+SHORT_DESCRIPTIONS = [Template(text, ['task', 'task_lower', 'status', 'hours']) for text in [
+    "Need to complete {task_lower} by EOW. See project requirements for details.",
+    "Working on {task_lower}. Coordinate with team lead before starting implementation.",
+    "Priority task for current sprint. {status}",
+    "Task details: {task}. Estimated effort: {hours} hours.",
+]]
 
 # Realistic task name patterns by project type
 # Based on analysis of 200+ GitHub issues and Asana community templates
@@ -130,14 +182,17 @@ TASK_PATTERNS = {
     }
 }
 
-def generate_task_name(department: str, project_name: str, use_llm: bool = False) -> str:
-    """Generate realistic task name based on department and project"""
+def generate_task_name(rng, department: str, project_name: str, use_llm: bool = False):
+    """
+    Generate realistic task name based on department and project
     
-    dept_patterns = TASK_PATTERNS.get(department, TASK_PATTERNS['Operations'])
+    With `use_llm`, 30% of names are returned as a ContentRequest carrying
+    the template name as its fallback; iter_task_rows resolves them.
+    """
     
-    if use_llm and random.random() < 0.30:  # Use LLM for 30% of tasks
+    if use_llm and rng.random() < 0.30:  # Use LLM for 30% of tasks
         prompt = f"""Generate a realistic task name for a {department} project called "{project_name}".
-        
+
 The task name should:
 - Be specific and actionable (e.g., "Implement OAuth authentication" not "Work on auth")
 - Follow patterns typical of {department} tasks
@@ -145,39 +200,49 @@ The task name should:
 - NOT include generic phrases like "Task 1" or placeholder text
 
 Generate ONLY the task name, no explanation:"""
-        
-        return call_llm_api(prompt, temperature=0.9)
+
+        return ContentRequest(prompt, 0.9, rng.getrandbits(32),
+                              template_task_name(rng, department))
     else:
-        # Use template-based generation
-        examples = dept_patterns['examples']
-        base_task = random.choice(examples)
-        
-        # Add some variation
-        if random.random() < 0.20:
-            # Modify slightly for variety
-            if department == 'Engineering':
-                prefixes = TASK_PATTERNS['Engineering']['prefixes']
-                components = TASK_PATTERNS['Engineering']['components']
-                actions = TASK_PATTERNS['Engineering']['actions']
-                return f"{random.choice(prefixes)} {random.choice(components)} {random.choice(actions)}"
-        
-        return base_task
+        return template_task_name(rng, department)
+
+def template_task_name(rng, department: str) -> str:
+    """Template-based task name"""
+    dept_patterns = TASK_PATTERNS.get(department, TASK_PATTERNS['Operations'])
+    examples = dept_patterns['examples']
+    base_task = rng.choice(examples)
+    
+    # Add some variation
+    if rng.random() < 0.20:
+        # Modify slightly for variety
+        if department == 'Engineering':
+            prefixes = TASK_PATTERNS['Engineering']['prefixes']
+            components = TASK_PATTERNS['Engineering']['components']
+            actions = TASK_PATTERNS['Engineering']['actions']
+            return f"{rng.choice(prefixes)} {rng.choice(components)} {rng.choice(actions)}"
+    
+    return base_task
 
-def generate_task_description(task_name: str, project_type: str, 
-                             use_llm: bool = False) -> str:
-    """Generate task description based on research-backed patterns"""
+def generate_task_description(rng, task_name, project_type: str,
+                             use_llm: bool = False):
+    """
+    Generate task description based on research-backed patterns
+    
+    `task_name` may be a ContentRequest; LLM descriptions then refer to
+    the generated name through a `{task_name}` placeholder.
+    """
     
     # 20% have no description
-    if random.random() < 0.20:
+    if rng.random() < 0.20:
         return None
     
     # 50% have short descriptions (1-3 sentences)
     # 30% have detailed descriptions with bullet points
-    is_detailed = random.random() < 0.30
+    is_detailed = rng.random() < 0.30
     
-    if use_llm and random.random() < 0.20:  # Use LLM for 20% of descriptions
+    if use_llm and rng.random() < 0.20:  # Use LLM for 20% of descriptions
         detail_level = "detailed with bullet points" if is_detailed else "brief (1-3 sentences)"
-        prompt = f"""Generate a realistic task description for: "{task_name}"
+        prompt = f"""Generate a realistic task description for: "{{task_name}}"
 
 Requirements:
 - {detail_level}
@@ -186,78 +251,46 @@ Requirements:
 - Sound like it was written by a real person planning work
 
 Generate ONLY the description:"""
-        
-        return call_llm_api(prompt, temperature=0.8)
+
+        return ContentRequest(prompt, 0.8, rng.getrandbits(32),
+                              template_task_description(rng, task_name, is_detailed))
     else:
-        # Template-based generation
-        if is_detailed:
-            bullets = [
-                '- Review current implementation and identify issues',
-                '- Research best practices and alternatives',
-                '- Create detailed technical spec',
-                '- Implement changes with tests',
-                '- Update documentation',
-                '- Deploy to staging for QA review'
-            ]
-            num_bullets = random.randint(3, 5)
-            selected = random.sample(bullets, num_bullets)
-            return '\n'.join(selected)
-        else:
-            templates = [
-                f"Need to complete {task_name.lower()} by EOW. See project requirements for details.",
-                f"Working on {task_name.lower()}. Coordinate with team lead before starting implementation.",
-                f"Priority task for current sprint. {random.choice(['Blocked by previous task.', 'Ready to start.', 'Needs design review first.'])}",
-                f"Task details: {task_name}. Estimated effort: {random.randint(2, 8)} hours.",
-            ]
-            return random.choice(templates)
+        return template_task_description(rng, task_name, is_detailed)
 
-def generate_tasks(conn, projects: list, users: list, config: dict):
-    """
-    Generate realistic tasks for all projects
-    """
-    cursor = conn.cursor()
-    
-    # Get sections for projects
-    cursor.execute("SELECT section_id, project_id, name FROM sections ORDER BY position")
-    sections = cursor.fetchall()
-    sections_by_project = {}
-    for section_id, project_id, section_name in sections:
-        if project_id not in sections_by_project:
-            sections_by_project[project_id] = []
-        sections_by_project[project_id].append({
-            'section_id': section_id,
-            'name': section_name
-        })
+def template_task_description(rng, task_name, is_detailed: bool) -> str:
+    """Template-based description (uses the fallback text of a pending name)"""
+    if isinstance(task_name, ContentRequest):
+        task_name = task_name.fallback
     
-    # Group users by department
-    users_by_dept = {}
-    for user in users:
-        dept = user['department']
-        if dept not in users_by_dept:
-            users_by_dept[dept] = []
-        users_by_dept[dept].append(user)
-    
-    # Get team departments
-    cursor.execute("""
-        SELECT p.project_id, p.team_id, t.name as team_name
-        FROM projects p
-        JOIN teams t ON p.team_id = t.team_id
-    """)
-    team_info = {row[0]: {'team_id': row[1], 'team_name': row[2]} 
-                 for row in cursor.fetchall()}
-    
-    all_tasks = []
-    now = datetime.now()
+    if is_detailed:
+        num_bullets = rng.randint(3, 5)
+        return '\n'.join(rng.sample(DESCRIPTION_BULLETS, num_bullets))
     
+    # Every short template's draws are made, in the original order, so a
+    # seeded run keeps its output; only the chosen template is formatted
+    status = rng.choice(DESCRIPTION_STATUSES)
+    hours = rng.randint(2, 8)
+    template = rng.choice(SHORT_DESCRIPTIONS)
+    return template.fill({'task': task_name, 'task_lower': task_name.lower(),
+                          'status': status, 'hours': hours})
+
+def prepare_project_contexts(projects: list, users, store, config: dict) -> list:
+    """
+    Collect everything needed to generate one project's tasks
+    
+    Contexts are plain picklable dicts so they can be shipped to worker
+    processes; sections and team members come from the shared EntityStore.
+    """
+    contexts = []
     for project in projects:
         project_id = project['project_id']
-        project_sections = sections_by_project.get(project_id, [])
+        project_sections = store.project_sections.get(project_id, [])
         
         if not project_sections:
             continue
         
         # Determine department from team name
-        team_name = team_info.get(project_id, {}).get('team_name', '')
+        team_name = store.project_team_name(project_id)
         department = 'Operations'
         for dept_key in ['Engineering', 'Product', 'Marketing', 'Sales', 'Customer Success', 'Operations']:
             if dept_key.lower() in team_name.lower():
@@ -265,128 +298,314 @@ def generate_tasks(conn, projects: list, users: list, config: dict):
                 break
         
         # Get users from project's team
-        cursor.execute("""
-            SELECT DISTINCT u.user_id, u.name, u.department
-            FROM users u
-            JOIN team_memberships tm ON u.user_id = tm.user_id
-            JOIN projects p ON tm.team_id = p.team_id
-            WHERE p.project_id = ? AND u.is_active = 1
-        """, (project_id,))
+        team_user_positions = store.project_member_positions(project_id).tolist() or list(range(min(20, len(users))))
+        team_user_ids = [users.ids[u] for u in team_user_positions]
         
-        team_users = cursor.fetchall()
-        team_user_ids = [row[0] for row in team_users] if team_users else [u['user_id'] for u in users[:20]]
+        window_start, task_share = task_window(project, config)
         
-        # Number of tasks per project (varies by type and status)
-        if project['status'] == 'archived':
-            num_tasks = random.randint(5, 15)
-        elif project['project_type'] == 'sprint':
-            num_tasks = random.randint(15, 40)
-        elif project['project_type'] == 'ongoing':
-            num_tasks = random.randint(20, 60)
-        else:
-            num_tasks = random.randint(10, 30)
+        contexts.append({
+            'project': project,
+            'window_start': window_start,
+            'task_share': task_share,
+            'department': department,
+            'sections': project_sections,
+            'team_user_ids': team_user_ids,
+            'team_user_positions': team_user_positions,
+        })
+    
+    return contexts
+
+def generate_project_tasks(rng, context: dict, config: dict, now: datetime) -> list:
+    """Generate task and subtask rows for a single project"""
+    project = context['project']
+    project_id = project['project_id']
+    department = context['department']
+    project_sections = context['sections']
+    team_user_ids = context['team_user_ids']
+    use_llm = config.get('use_llm', False)
+    calendar = calendar_for(config)
+    
+    project_tasks = []
+    num_tasks = choose_task_count(rng, project, context['task_share'],
+                                  config.get('task_ranges', TASK_RANGES))
+    
+    for _ in range(num_tasks):
+        task_id = rng.ids()
         
-        project_created = datetime.fromisoformat(project['created_at'])
+        # Generate task name and description
+        task_name = generate_task_name(rng, department, project['name'], use_llm=use_llm)
+        description = generate_task_description(rng, task_name, project['project_type'], use_llm=use_llm)
         
-        for _ in range(num_tasks):
-            task_id = generate_uuid()
-            
-            # Generate task name and description
-            task_name = generate_task_name(department, project['name'], use_llm=False)
-            description = generate_task_description(task_name, project['project_type'], use_llm=False)
-            
-            # Select section (weight toward earlier sections for incomplete tasks)
-            section_weights = [3, 2, 2, 1, 1][:len(project_sections)]
-            section = random.choices(project_sections, weights=section_weights)[0]
-            
-            # Assignee (15% unassigned per Asana benchmarks)
-            assignee_id = None
-            if random.random() > 0.15:
-                assignee_id = random.choice(team_user_ids)
-            
-            # Creator is from the team
-            created_by = random.choice(team_user_ids)
-            
-            # Created date within project timeline
-            created_at = random_datetime_between(
-                project_created.date().isoformat(),
-                config['end_date'],
-                business_hours=True
-            )
-            
-            # Ensure created_at is not in the future
-            if created_at > now:
-                created_at = now - timedelta(days=random.randint(1, 30))
-            
-            # Due date
-            due_date = generate_due_date(created_at, project['project_type'])
-            
-            # Priority
-            priority_dist = {'low': 0.20, 'medium': 0.50, 'high': 0.25, 'urgent': 0.05}
-            priority = random.choices(
-                list(priority_dist.keys()),
-                weights=list(priority_dist.values())
-            )[0]
-            
-            # Completion status
-            completed, completed_at = calculate_completion_status(
-                created_at, project['project_type'], now
-            )
+        # Select section (weight toward earlier sections for incomplete tasks)
+        section = project_sections[section_sampler(len(project_sections)).index(rng)]
+        
+        # Assignee (15% unassigned per Asana benchmarks)
+        assignee_id = None
+        if rng.random() > 0.15:
+            assignee_id = rng.choice(team_user_ids)
+        
+        # Creator is from the team
+        created_by = rng.choice(team_user_ids)
+        
+        # Created date within project timeline
+        created_at = random_datetime_between(
+            rng,
+            context['window_start'],
+            config['end_date'],
+            business_hours=True
+        )
+        
+        # Ensure created_at is not in the future
+        if created_at > now:
+            created_at = now - timedelta(days=rng.randint(1, 30))
+        
+        # Due date
+        due_date = generate_due_date(rng, created_at, project['project_type'], calendar)
+        
+        # Priority
+        priority = PRIORITY_SAMPLER.sample(rng)
+        
+        # Completion status
+        completed, completed_at = calculate_completion_status(
+            rng, created_at, project['project_type'], now
+        )
+        
+        # Completed tasks should be in 'Done' or 'Completed' sections
+        if completed:
+            done_sections = [s for s in project_sections 
+                           if s['name'] in ['Done', 'Completed', 'Launched']]
+            if done_sections:
+                section = rng.choice(done_sections)
+        
+        task_data = (
+            task_id, project_id, section['section_id'], None,  # parent_task_id
+            task_name, description, assignee_id, created_by,
+            created_at.isoformat(), 
+            due_date.date().isoformat() if due_date else None,
+            completed, 
+            completed_at.isoformat() if completed_at else None,
+            priority
+        )
+        
+        project_tasks.append(task_data)
+    
+    add_subtasks(rng, project_tasks, team_user_ids)
+    return project_tasks
+
+def generate_project_tasks_vectorized(rng, context: dict, config: dict, now: datetime) -> list:
+    """
+    Generate task and subtask rows for a single project using NumPy
+    
+    Timestamps, due dates, priorities, sections, assignees and completion
+    are sampled for the whole project as arrays with the same
+    distributions as generate_project_tasks; rows are only assembled at
+    the end. Names and descriptions are still drawn per task.
+    """
+    project = context['project']
+    project_id = project['project_id']
+    project_type = project['project_type']
+    department = context['department']
+    project_sections = context['sections']
+    team_user_ids = context['team_user_ids']
+    use_llm = config.get('use_llm', False)
+    
+    num_tasks = choose_task_count(rng, project, context['task_share'],
+                                  config.get('task_ranges', TASK_RANGES))
+    now64 = np.datetime64(now, 's')
+    
+    # Created date within project timeline, never in the future
+    created_at = random_datetimes_between(
+        rng,
+        context['window_start'],
+        config['end_date'],
+        num_tasks,
+        business_hours=True
+    )
+    days_back = rng.np.integers(1, 31, num_tasks).astype('timedelta64[D]')
+    created_at = np.where(created_at > now64, now64 - days_back, created_at)
+    
+    due_dates = generate_due_dates(rng, created_at, calendar_for(config))
+    priorities = PRIORITY_SAMPLER.sample_many(rng, num_tasks)
+    completed, completed_at = calculate_completion_statuses(rng, created_at, project_type, now)
+    
+    # Sections weighted toward earlier ones; completed tasks go to a done section
+    section_idx = section_sampler(len(project_sections)).indices(rng, num_tasks)
+    done_idx = [i for i, s in enumerate(project_sections)
+                if s['name'] in ['Done', 'Completed', 'Launched']]
+    if done_idx:
+        section_idx = np.where(completed, rng.np.choice(done_idx, size=num_tasks), section_idx)
+    
+    # Assignee (15% unassigned per Asana benchmarks); creator from the team
+    assigned = rng.np.random(num_tasks) > 0.15
+    assignee_idx = rng.np.integers(0, len(team_user_ids), num_tasks)
+    creator_idx = rng.np.integers(0, len(team_user_ids), num_tasks)
+    
+    project_tasks = []
+    for i, task_id, created_iso, due_iso, done, done_iso, priority in zip(
+            range(num_tasks), rng.ids.take(num_tasks), datetimes_to_iso(created_at),
+            datetimes_to_iso(due_dates), completed.tolist(), datetimes_to_iso(completed_at),
+            priorities):
+        task_name = generate_task_name(rng, department, project['name'], use_llm=use_llm)
+        description = generate_task_description(rng, task_name, project_type, use_llm=use_llm)
+        project_tasks.append((
+            task_id, project_id, project_sections[section_idx[i]]['section_id'], None,
+            task_name, description,
+            team_user_ids[assignee_idx[i]] if assigned[i] else None,
+            team_user_ids[creator_idx[i]],
+            created_iso, due_iso, done, done_iso, priority
+        ))
+    
+    add_subtasks(rng, project_tasks, team_user_ids)
+    return project_tasks
+
+@lru_cache(maxsize=None)
+def section_sampler(num_sections: int) -> AliasSampler:
+    """Sampler of section positions for a project with `num_sections` sections"""
+    return AliasSampler(range(num_sections), SECTION_WEIGHTS[:num_sections])
+
+def choose_task_count(rng, project: dict, share: float = 1.0,
+                      ranges: dict = TASK_RANGES) -> int:
+    """
+    Number of tasks per project (varies by type and status)
+    
+    `share` scales the lifetime count down to the part of the project's
+    life covered by this run (see task_window). `ranges` is
+    config['task_ranges'] when a preset sets one.
+    """
+    if project['status'] == 'archived':
+        count = rng.randint(*ranges['archived'])
+    else:
+        count = rng.randint(*ranges.get(project['project_type'], ranges['default']))
+    return count if share >= 1.0 else round(count * share)
+
+def task_window(project: dict, config: dict) -> tuple:
+    """
+    Date range new tasks of a project are created in
+    
+    Tasks are created between the later of the project's creation and
+    `start_date`, and `end_date`. For an incremental run, whose window
+    starts after the project was created, the returned share is the
+    fraction of the project's life (creation to `end_date`) that the
+    window covers.
+    
+    Returns: (window_start: ISO date, share: float)
+    """
+    created = parse_date(project['created_at'])
+    start = max(created, parse_date(config['start_date']))
+    end = parse_date(config['end_date'])
+    if start <= created:
+        return created.isoformat(), 1.0
+    return start.isoformat(), max(0, (end - start).days) / max(1, (end - created).days)
+
+def add_subtasks(rng, project_tasks: list, team_user_ids: list):
+    """Append subtask rows to a project's task rows"""
+    # Generate subtasks (10% of projects have 1-3 subtasks)
+    if rng.random() < 0.10 and len(project_tasks) > 0:
+        num_subtasks = rng.randint(1, 3)
+        for _ in range(num_subtasks):
+            parent_task = rng.choice(project_tasks)
+            parent_id = parent_task[0]
             
-            # Completed tasks should be in 'Done' or 'Completed' sections
-            if completed:
-                done_sections = [s for s in project_sections 
-                               if s['name'] in ['Done', 'Completed', 'Launched']]
-                if done_sections:
-                    section = random.choice(done_sections)
+            subtask_id = rng.ids()
+            subtask_name = f"Subtask: {rng.choice(['Complete', 'Review', 'Test', 'Document'])} {rng.choice(['component', 'feature', 'integration', 'changes'])}"
             
-            task_data = (
-                task_id, project_id, section['section_id'], None,  # parent_task_id
-                task_name, description, assignee_id, created_by,
-                created_at.isoformat(), 
-                due_date.date().isoformat() if due_date else None,
-                completed, 
-                completed_at.isoformat() if completed_at else None,
-                priority
+            # Subtask inherits project, section from parent
+            subtask_data = (
+                subtask_id, parent_task[1], parent_task[2], parent_id,
+                subtask_name, None, rng.choice(team_user_ids), 
+                parent_task[7], parent_task[8], parent_task[9],
+                False, None, 'medium'
             )
-            
-            all_tasks.append(task_data)
-        
-        # Generate subtasks (10% of tasks have 1-3 subtasks)
-        if random.random() < 0.10 and len(all_tasks) > 0:
-            num_subtasks = random.randint(1, 3)
-            for _ in range(num_subtasks):
-                parent_task = random.choice(all_tasks)
-                parent_id = parent_task[0]
-                
-                subtask_id = generate_uuid()
-                subtask_name = f"Subtask: {random.choice(['Complete', 'Review', 'Test', 'Document'])} {random.choice(['component', 'feature', 'integration', 'changes'])}"
-                
-                # Subtask inherits project, section from parent
-                subtask_data = (
-                    subtask_id, parent_task[1], parent_task[2], parent_id,
-                    subtask_name, None, random.choice(team_user_ids), 
-                    parent_task[7], parent_task[8], parent_task[9],
-                    False, None, 'medium'
-                )
-                all_tasks.append(subtask_data)
-    
-    # Batch insert all tasks
-    batch_insert(conn, 'tasks',
-                ['task_id', 'project_id', 'section_id', 'parent_task_id',
-                 'name', 'description', 'assignee_id', 'created_by',
-                 'created_at', 'due_date', 'completed', 'completed_at', 'priority'],
-                all_tasks)
-    
-    # Return task dicts for use by other generators
-    task_dicts = []
-    for task in all_tasks:
-        task_dicts.append({
-            'task_id': task[0],
-            'project_id': task[1],
-            'name': task[4],
-            'created_by': task[7],
-            'created_at': task[8]
-        })
+            project_tasks.append(subtask_data)
+
+def _generate_project_shard(shard: tuple) -> list:
+    """Worker entry point: generate one project's rows on its own RNG substream"""
+    context, seed_seq, config, now = shard
+    rng = shard_rng(config, 'tasks', seed_seq)
+    if config.get('vectorized', True):
+        return generate_project_tasks_vectorized(rng, context, config, now)
+    return generate_project_tasks(rng, context, config, now)
+
+def resolve_llm_content(project_batches, service: ContentService, lookahead: int):
+    """
+    Replace the ContentRequests in each project's rows with generated text
+    
+    Every project's requests are submitted as soon as its rows arrive and
+    up to `lookahead` projects are kept in flight, so the API calls of
+    later projects overlap with writing earlier ones. A description
+    waits on its task's name only inside the service.
+    """
+    pending = deque()
+    
+    def submit(project_tasks):
+        submitted = []
+        for row in project_tasks:
+            name, description = row[4], row[5]
+            if isinstance(name, ContentRequest):
+                name = service.submit(name)
+            if isinstance(description, ContentRequest):
+                description = service.submit(description, task_name=name)
+            submitted.append((row, name, description))
+        return submitted
+    
+    def resolve(submitted):
+        return [row[:4] + tuple(v.result() if isinstance(v, Future) else v
+                                for v in (name, description)) + row[6:]
+                for row, name, description in submitted]
+    
+    for project_tasks in project_batches:
+        pending.append(submit(project_tasks))
+        if len(pending) > lookahead:
+            yield resolve(pending.popleft())
+    while pending:
+        yield resolve(pending.popleft())
+
+def iter_task_rows(projects: list, users, config: dict, store, service=None):
+    """
+    Yield task rows project by project
+    
+    Each project is a shard with its own RNG substream spawned from
+    `config['seed']`, so rows are identical whether shards run serially or
+    across `config['workers']` processes. Results are yielded in project
+    order to the single writer and recorded in the EntityStore. With a
+    ContentService, LLM text is filled in before rows are yielded.
+    """
+    contexts = prepare_project_contexts(projects, users, store, config)
+    seeds = spawn_seeds(config, 'tasks', len(contexts))
+    now = simulation_now(config)
+    
+    shards = ((context, seed_seq, config, now)
+              for context, seed_seq in zip(contexts, seeds))
+    
+    results = map_ordered(_generate_project_shard, shards, config.get('workers', 1))
+    if service is not None:
+        results = resolve_llm_content(results, service, config.get('llm_lookahead', 32))
+    
+    for context, project_tasks in zip(contexts, results):
+        store.add_tasks(project_tasks, dict(zip(context['team_user_ids'],
+                                                context['team_user_positions'])))
+        yield from project_tasks
+
+def generate_tasks(sink, projects: list, users, config: dict, store):
+    """
+    Generate realistic tasks for all projects
+    
+    Rows are streamed into the database in chunks of `config['chunk_size']`.
+    With `config['use_llm']` some names and descriptions come from the
+    LLM ContentService.
+    
+    Returns:
+        The store's task ColumnTable for use by other generators
+    """
+    if not config.get('use_llm', False):
+        sink.write('tasks', TASK_COLUMNS,
+                   iter_task_rows(projects, users, config, store),
+                   config.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        return store.tasks
+    
+    with ContentService(config) as service:
+        sink.write('tasks', TASK_COLUMNS,
+                   iter_task_rows(projects, users, config, store, service),
+                   config.get('chunk_size', DEFAULT_CHUNK_SIZE))
     
-    return task_dicts
\ No newline at end of file
+    return store.tasks
\ No newline at end of file
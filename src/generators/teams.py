@@ -3,9 +3,8 @@ Teams Generator
 Creates realistic teams for product development, marketing, and operations
 """
 
-import random
 from datetime import timedelta
-from utils import generate_uuid
+from rng import stage_rng
 
 # Team definitions based on typical B2B SaaS org structure
 TEAM_TEMPLATES = [
@@ -72,28 +71,30 @@ TEAM_TEMPLATES = [
      'description': 'Legal affairs and regulatory compliance'},
 ]
 
-def generate_teams(conn, org: dict, config: dict):
+def generate_teams(sink, org: dict, config: dict, store):
     """
     Generate teams for the organization
     
     Args:
-        conn: Database connection
+        sink: Sink the rows are written to (see sinks.py)
         org: Organization dict
         config: Configuration
+        store: EntityStore to record teams in
     
     Returns:
         List of team dicts
     """
-    cursor = conn.cursor()
+    rng = stage_rng(config, 'teams')
     teams = []
+    team_rows = []
     
     org_created = org['created_at']
     
     for template in TEAM_TEMPLATES:
-        team_id = generate_uuid()
+        team_id = rng.ids()
         
         # Teams created 0-6 months after org (staggered formation)
-        days_after_org = random.randint(0, 180)
+        days_after_org = rng.randint(0, 180)
         from datetime import datetime
         created_at = datetime.fromisoformat(org_created) + timedelta(days=days_after_org)
         
@@ -106,13 +107,12 @@ def generate_teams(conn, org: dict, config: dict):
             'created_at': created_at.isoformat()
         }
         
-        cursor.execute("""
-            INSERT INTO teams (team_id, org_id, name, description, created_at)
-            VALUES (?, ?, ?, ?, ?)
-        """, (team_id, org['org_id'], template['name'], 
-              template['description'], created_at))
+        team_rows.append((team_id, org['org_id'], template['name'],
+                          template['description'], created_at))
         
         teams.append(team)
+        store.add_team(team)
+    
+    sink.write('teams', ['team_id', 'org_id', 'name', 'description', 'created_at'], team_rows)
     
-    conn.commit()
     return teams
\ No newline at end of file
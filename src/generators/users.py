@@ -3,29 +3,40 @@ Users Generator
 Creates realistic user profiles with names from census data distributions
 """
 
-import random
-from datetime import datetime, timedelta
-from utils import generate_uuid, batch_insert
+from datetime import datetime
+from itertools import repeat
+import numpy as np
+from rng import stage_rng
+from business_calendar import parse_datetime
+from sampling import AliasSampler
+from utils import datetimes_to_iso, load_json_data, DEFAULT_CHUNK_SIZE
+
+USER_COLUMNS = ['user_id', 'org_id', 'email', 'name', 'job_title',
+                'department', 'created_at', 'is_active']
 
 # First names sourced from US Census data (top names representing demographic diversity)
-FIRST_NAMES = [
-    # Top male names
+MALE_FIRST_NAMES = [
     'James', 'John', 'Robert', 'Michael', 'William', 'David', 'Richard', 'Joseph',
     'Thomas', 'Christopher', 'Daniel', 'Matthew', 'Anthony', 'Mark', 'Donald',
     'Steven', 'Andrew', 'Paul', 'Joshua', 'Kenneth', 'Kevin', 'Brian', 'George',
     'Timothy', 'Ronald', 'Edward', 'Jason', 'Jeffrey', 'Ryan', 'Jacob', 'Gary',
     'Nicholas', 'Eric', 'Jonathan', 'Stephen', 'Larry', 'Justin', 'Scott', 'Brandon',
-    # Top female names  
+]
+FEMALE_FIRST_NAMES = [
     'Mary', 'Patricia', 'Jennifer', 'Linda', 'Barbara', 'Elizabeth', 'Susan',
     'Jessica', 'Sarah', 'Karen', 'Lisa', 'Nancy', 'Betty', 'Margaret', 'Sandra',
     'Ashley', 'Kimberly', 'Emily', 'Donna', 'Michelle', 'Carol', 'Amanda', 'Melissa',
     'Deborah', 'Stephanie', 'Dorothy', 'Rebecca', 'Sharon', 'Laura', 'Cynthia',
     'Amy', 'Angela', 'Helen', 'Anna', 'Brenda', 'Pamela', 'Emma', 'Nicole',
     'Samantha', 'Katherine', 'Christine', 'Debra', 'Rachel', 'Carolyn', 'Janet',
-    # Additional diverse names
+]
+# Additional diverse names
+DIVERSE_FIRST_NAMES = [
     'Wei', 'Mohammed', 'Priya', 'Chen', 'Sofia', 'Diego', 'Fatima', 'Raj',
     'Maria', 'Carlos', 'Aisha', 'Luis', 'Mei', 'Hassan', 'Yuki', 'Sandeep'
 ]
+FIRST_NAME_GROUPS = [MALE_FIRST_NAMES, FEMALE_FIRST_NAMES, DIVERSE_FIRST_NAMES]
+FIRST_NAMES = [name for group in FIRST_NAME_GROUPS for name in group]
 
 LAST_NAMES = [
     'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
@@ -50,6 +61,39 @@ LAST_NAMES = [
     'Chen', 'Freeman', 'Webb', 'Tucker', 'Guzman', 'Burns', 'Crawford', 'Olson'
 ]
 
+# The name lists are in census rank order. Without frequency tables in
+# data/, names are weighted by a Zipf approximation of census
+# rank-frequency within each group; each group keeps a share of the
+# draws proportional to its size.
+NAME_RANK_EXPONENT = 0.8
+
+# Optional {name: frequency} tables (e.g. from the SSA/Census name files)
+# that replace the built-in pools for larger, frequency-weighted sampling
+FIRST_NAMES_FILE = 'census_first_names.json'
+LAST_NAMES_FILE = 'census_last_names.json'
+
+# Email local-part patterns, chosen uniformly
+EMAIL_PATTERNS = [
+    lambda first, last: f"{first}.{last}",
+    lambda first, last: f"{first}{last}",
+    lambda first, last: f"{first[0]}{last}",
+    lambda first, last: f"{first}{last[0]}",
+]
+
+# Department distribution (percentages based on typical SaaS companies)
+DEPARTMENT_DISTRIBUTION = {
+    'Engineering': 0.35,
+    'Sales': 0.20,
+    'Customer Success': 0.15,
+    'Marketing': 0.12,
+    'Product': 0.10,
+    'Operations': 0.08
+}
+DEPARTMENTS = AliasSampler(DEPARTMENT_DISTRIBUTION.keys(), list(DEPARTMENT_DISTRIBUTION.values()))
+
+# Teams per user: some users are cross-functional
+TEAMS_PER_USER = AliasSampler([1, 2], [0.75, 0.25])
+
 # Job titles by department (based on LinkedIn data patterns)
 JOB_TITLES = {
     'Engineering': [
@@ -95,36 +139,65 @@ JOB_TITLES = {
     ]
 }
 
-def generate_name() -> tuple:
-    """Generate realistic full name"""
-    first_name = random.choice(FIRST_NAMES)
-    last_name = random.choice(LAST_NAMES)
-    return first_name, last_name
+class NamePool:
+    """Names with sampling weights, drawn through an alias table"""
+    
+    def __init__(self, names: list, weights):
+        self.sampler = AliasSampler(names, weights)
+    
+    @classmethod
+    def load(cls, filename: str, default_groups: list) -> 'NamePool':
+        """Frequency table from data/ if present, else the built-in rank-ordered lists"""
+        table = load_json_data(filename)
+        if table:
+            return cls(table.keys(), list(table.values()))
+        names, weights = [], []
+        for group in default_groups:
+            zipf = np.arange(1, len(group) + 1) ** -NAME_RANK_EXPONENT
+            names.extend(group)
+            weights.extend(zipf / zipf.sum() * len(group))
+        return cls(names, weights)
+    
+    def sample(self, rng, size: int) -> list:
+        return self.sampler.sample_many(rng, size)
 
-def generate_email(first_name: str, last_name: str, domain: str, existing_emails: set) -> str:
-    """Generate unique email address"""
-    # Common email patterns
-    patterns = [
-        f"{first_name.lower()}.{last_name.lower()}",
-        f"{first_name.lower()}{last_name.lower()}",
-        f"{first_name[0].lower()}{last_name.lower()}",
-        f"{first_name.lower()}{last_name[0].lower()}",
-    ]
+class EmailAllocator:
+    """
+    Hands out unique email addresses in O(1)
+    
+    Keeps the next free numeric suffix for every local-part base, so the
+    n-th "james.smith" becomes james.smith{n-1} without probing. Bases are
+    built from names only, so a suffixed address never collides with
+    another base.
+    """
     
-    email = f"{random.choice(patterns)}@{domain}"
+    def __init__(self, domain: str, existing=()):
+        self.domain = domain
+        self._next_suffix = {}
+        for email in existing:
+            self.reserve(email)
     
-    # Ensure uniqueness
-    counter = 1
-    original_email = email
-    while email in existing_emails:
-        email = f"{original_email.split('@')[0]}{counter}@{domain}"
-        counter += 1
+    def reserve(self, email: str):
+        """Mark an address (e.g. one already in the database) as taken"""
+        local = email.split('@')[0]
+        base = local.rstrip('0123456789')
+        suffix = int(local[len(base):] or 0)
+        self._next_suffix[base] = max(self._next_suffix.get(base, 0), suffix + 1)
     
-    return email
+    def allocate(self, base: str) -> str:
+        suffix = self._next_suffix.get(base, 0)
+        self._next_suffix[base] = suffix + 1
+        return f"{base}{suffix or ''}@{self.domain}"
 
-def assign_users_to_teams(conn, users, teams):
-    """Create team membership associations"""
-    cursor = conn.cursor()
+def assign_users_to_teams(sink, users: dict, first_user: int, teams, rng, store,
+                          chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Create team membership associations
+    
+    Args:
+        users: Column dict for a chunk of users (see generate_user_columns)
+        first_user: Surrogate id of the chunk's first user in the EntityStore
+    """
     memberships = []
     
     # Group teams by department
@@ -135,108 +208,119 @@ def assign_users_to_teams(conn, users, teams):
             teams_by_dept[dept] = []
         teams_by_dept[dept].append(team)
     
-    for user in users:
-        dept = user['department']
+    for i, (user_id, dept, job_title, created_at) in enumerate(zip(
+            users['user_id'], users['department'], users['job_title'],
+            datetimes_to_iso(users['created_at']))):
         dept_teams = teams_by_dept.get(dept, teams_by_dept.get('Operations', []))
         
         # Assign to 1-2 teams (some users are cross-functional)
-        num_teams = random.choices([1, 2], weights=[0.75, 0.25])[0]
-        user_teams = random.sample(dept_teams, min(num_teams, len(dept_teams)))
+        num_teams = TEAMS_PER_USER.sample(rng)
+        user_teams = rng.sample(dept_teams, min(num_teams, len(dept_teams)))
         
         for team in user_teams:
             # Determine role
-            if 'Director' in user['job_title'] or 'VP' in user['job_title']:
+            if 'Director' in job_title or 'VP' in job_title:
                 role = 'lead'
-            elif random.random() < 0.10:
+            elif rng.random() < 0.10:
                 role = 'admin'
             else:
                 role = 'member'
             
-            membership_id = generate_uuid()
-            joined_at = max(
-                datetime.fromisoformat(user['created_at']),
-                datetime.fromisoformat(team['created_at'])
-            )
+            membership_id = rng.ids()
+            # Compared as datetimes: team timestamps may come from a loader
+            joined_at = max(datetime.fromisoformat(created_at),
+                            parse_datetime(team['created_at'])).isoformat()
             
             memberships.append((
                 membership_id,
                 team['team_id'],
-                user['user_id'],
+                user_id,
                 role,
-                joined_at.isoformat()
+                joined_at
             ))
+            store.add_membership(team['team_id'], first_user + i)
     
-    batch_insert(conn, 'team_memberships', 
-                ['membership_id', 'team_id', 'user_id', 'role', 'joined_at'],
-                memberships)
+    sink.write('team_memberships',
+               ['membership_id', 'team_id', 'user_id', 'role', 'joined_at'],
+               memberships, chunk_size)
 
-def generate_users(conn, org: dict, teams: list, config: dict):
-    """
-    Generate realistic users based on census data distributions
+def generate_user_columns(rng, org: dict, size: int, emails: EmailAllocator,
+                          first_names: NamePool, last_names: NamePool) -> dict:
     """
-    cursor = conn.cursor()
-    users = []
-    existing_emails = set()
+    Generate a chunk of realistic users based on census data distributions
     
-    employee_count = config['employee_count']
-    org_created = datetime.fromisoformat(org['created_at'])
-    
-    # Department distribution (percentages based on typical SaaS companies)
-    dept_distribution = {
-        'Engineering': 0.35,
-        'Sales': 0.20,
-        'Customer Success': 0.15,
-        'Marketing': 0.12,
-        'Product': 0.10,
-        'Operations': 0.08
-    }
+    Names are drawn for the whole chunk from the frequency-weighted pools
+    and email addresses come from the allocator, so the cost per user is
+    constant however large the organization gets.
     
-    for _ in range(employee_count):
-        user_id = generate_uuid()
-        first_name, last_name = generate_name()
-        email = generate_email(first_name, last_name, org['domain'], existing_emails)
-        existing_emails.add(email)
-        
-        # Assign department
-        department = random.choices(
-            list(dept_distribution.keys()),
-            weights=list(dept_distribution.values())
-        )[0]
+    Returns:
+        dict of parallel columns (lists of strings plus NumPy created_at
+        and is_active arrays) rather than one dict per user
+    """
+    org_created = np.datetime64(org['created_at'], 's')
+    
+    user_ids = rng.ids.take(size)
+    patterns = rng.np.integers(0, len(EMAIL_PATTERNS), size).tolist()
+    departments = DEPARTMENTS.sample_many(rng, size)
+    addresses, names, job_titles = [], [], []
+    for first_name, last_name, pattern, department in zip(first_names.sample(rng, size),
+                                                          last_names.sample(rng, size),
+                                                          patterns, departments):
+        addresses.append(emails.allocate(EMAIL_PATTERNS[pattern](first_name.lower(),
+                                                                 last_name.lower())))
+        names.append(f"{first_name} {last_name}")
         
         # Assign job title based on department
-        job_title = random.choice(JOB_TITLES[department])
-        
-        # User joined 0-2 years after org creation
-        days_after_org = random.randint(0, 730)
-        created_at = org_created + timedelta(days=days_after_org)
-        
-        # 2% inactive (left company)
-        is_active = random.random() > 0.02
-        
-        user = {
-            'user_id': user_id,
-            'org_id': org['org_id'],
-            'email': email,
-            'name': f"{first_name} {last_name}",
-            'job_title': job_title,
-            'department': department,
-            'created_at': created_at.isoformat(),
-            'is_active': is_active
-        }
-        
-        users.append(user)
+        job_titles.append(rng.choice(JOB_TITLES[department]))
     
-    # Batch insert users
-    user_data = [(u['user_id'], u['org_id'], u['email'], u['name'], 
-                  u['job_title'], u['department'], u['created_at'], u['is_active'])
-                 for u in users]
+    # User joined 0-2 years after org creation
+    created_at = org_created + rng.np.integers(0, 731, size).astype('timedelta64[D]')
     
-    batch_insert(conn, 'users',
-                ['user_id', 'org_id', 'email', 'name', 'job_title', 
-                 'department', 'created_at', 'is_active'],
-                user_data)
+    # 2% inactive (left company)
+    is_active = rng.np.random(size) > 0.02
     
-    # Assign users to teams
-    assign_users_to_teams(conn, users, teams)
+    return {
+        'user_id': user_ids,
+        'email': addresses,
+        'name': names,
+        'job_title': job_titles,
+        'department': departments,
+        'created_at': created_at,
+        'is_active': is_active,
+    }
+
+def generate_users(sink, org: dict, teams: list, config: dict, store):
+    """
+    Generate realistic users based on census data distributions
+    
+    Users are produced and written in chunks of `config['chunk_size']`
+    together with their team memberships; only the compact columns later
+    generators need are kept, in the EntityStore.
+    
+    Returns:
+        The EntityStore's users ColumnTable
+    """
+    rng = stage_rng(config, 'users')
+    emails = EmailAllocator(org['domain'])
+    first_names = NamePool.load(FIRST_NAMES_FILE, FIRST_NAME_GROUPS)
+    last_names = NamePool.load(LAST_NAMES_FILE, [LAST_NAMES])
+    chunk_size = config.get('chunk_size', DEFAULT_CHUNK_SIZE)
+    employee_count = config['employee_count']
+    
+    for start in range(0, employee_count, chunk_size):
+        users = generate_user_columns(rng, org, min(chunk_size, employee_count - start),
+                                      emails, first_names, last_names)
+        
+        # Batch insert users
+        user_data = zip(users['user_id'], repeat(org['org_id']), users['email'],
+                        users['name'], users['job_title'], users['department'],
+                        datetimes_to_iso(users['created_at']), users['is_active'].tolist())
+        sink.write('users', USER_COLUMNS, user_data, chunk_size)
+        
+        first_user = store.add_users(users['user_id'], users['department'], users['job_title'],
+                                     users['created_at'], users['is_active'])
+        
+        # Assign users to teams
+        assign_users_to_teams(sink, users, first_user, teams, rng, store, chunk_size)
     
-    return users
\ No newline at end of file
+    return store.users
\ No newline at end of file
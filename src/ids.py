@@ -0,0 +1,80 @@
+"""
+Identifier Generation
+Seeded, bulk-drawn primary keys rendered as UUIDs, Asana-style GIDs or integers
+"""
+
+from typing import List, Union
+
+import numpy as np
+
+# Supported config['id_format'] values
+ID_FORMATS = ('uuid', 'gid', 'int')
+
+# Ids drawn per refill of an IdGenerator's buffer
+ID_BLOCK_SIZE = 4096
+
+# Numeric ids: every RNG stream numbers its ids inside its own block of
+# 2**32, offset into the 16-digit range Asana uses for its GIDs
+NAMESPACE_BITS = 32
+GID_BASE = 1_200_000_000_000_000
+
+# Each incremental run (epoch) gets its own range above all earlier ones
+EPOCH_SHIFT = 56
+
+def format_uuids(raw: np.ndarray) -> List[str]:
+    """Render an (n, 16) uint8 array of random bytes as UUIDv4 strings"""
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    digits = raw.tobytes().hex()
+    return [f'{digits[i:i + 8]}-{digits[i + 8:i + 12]}-{digits[i + 12:i + 16]}-'
+            f'{digits[i + 16:i + 20]}-{digits[i + 20:i + 32]}'
+            for i in range(0, len(digits), 32)]
+
+class IdGenerator:
+    """
+    Produces primary keys for one RNG stream
+    
+    UUIDs are drawn in blocks from a dedicated PCG64 stream, so a seeded
+    run gets the same ids whatever other sampling the generator does.
+    GIDs and integer ids count upwards inside the stream's namespace,
+    which keeps them unique across streams and processes and makes
+    inserts into INTEGER PRIMARY KEY tables append-only.
+    
+    Args:
+        seed_seq: SeedSequence for the UUID bit stream
+        id_format: 'uuid', 'gid' (numeric string) or 'int'
+        namespace: Stream number for numeric ids (see rng.STAGE_NAMESPACES)
+        epoch: Run number for numeric ids (0 for a full build)
+    """
+    
+    def __init__(self, seed_seq: np.random.SeedSequence, id_format: str = 'uuid',
+                 namespace: int = 0, block_size: int = ID_BLOCK_SIZE, epoch: int = 0):
+        if id_format not in ID_FORMATS:
+            raise ValueError(f"Unknown id_format {id_format!r}; expected one of {ID_FORMATS}")
+        self.id_format = id_format
+        self.block_size = block_size
+        self._bits = np.random.Generator(np.random.PCG64(seed_seq))
+        self._counter = (epoch << EPOCH_SHIFT) + (namespace << NAMESPACE_BITS) + 1
+        self._buffer: list = []
+        self._position = 0
+    
+    def __call__(self) -> Union[str, int]:
+        """Next id from the buffered block"""
+        if self._position == len(self._buffer):
+            self._buffer = self.take(self.block_size)
+            self._position = 0
+        value = self._buffer[self._position]
+        self._position += 1
+        return value
+    
+    def take(self, count: int) -> list:
+        """Draw `count` ids at once, bypassing the buffer"""
+        if self.id_format == 'uuid':
+            raw = np.frombuffer(self._bits.bytes(16 * count), dtype=np.uint8)
+            return format_uuids(raw.reshape(count, 16).copy())
+        
+        first = self._counter
+        self._counter += count
+        if self.id_format == 'gid':
+            return [str(GID_BASE + i) for i in range(first, first + count)]
+        return list(range(first, first + count))
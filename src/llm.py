@@ -0,0 +1,244 @@
+"""
+LLM Content Service
+Concurrent, cached text generation for task names and descriptions
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = 'https://api.anthropic.com'
+DEFAULT_MODEL = 'claude-sonnet-4-20250514'
+DEFAULT_CACHE_PATH = 'output/llm_cache.sqlite'
+
+# Status codes worth retrying (rate limits, overload, transient server errors)
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504, 529}
+
+class ContentRequest(NamedTuple):
+    """
+    A piece of text to generate, embedded in a row in place of the text
+    
+    `sample` distinguishes requests that share a prompt so they get their
+    own cached responses; `fallback` is the template text used when the
+    API is unavailable. The prompt may contain `{task_name}`, filled in
+    when the request is submitted.
+    """
+    prompt: str
+    temperature: float
+    sample: int
+    fallback: Optional[str]
+    max_tokens: int = 500
+
+class PromptCache:
+    """Persistent prompt -> response store backed by a small SQLite file"""
+    
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL
+            )
+        """)
+        self._pending = 0
+    
+    @staticmethod
+    def key(model: str, prompt: str, temperature: float, sample: int) -> str:
+        return hashlib.sha256(f"{model}\0{temperature}\0{sample}\0{prompt}".encode()).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def put(self, key: str, response: str):
+        self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?)", (key, response))
+        self._pending += 1
+        if self._pending >= 100:
+            self.flush()
+    
+    def flush(self):
+        self.conn.commit()
+        self._pending = 0
+    
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+class ContentService:
+    """
+    Generates text for ContentRequests on a background asyncio loop
+    
+    Requests are submitted from the generating thread and run on an event
+    loop in a daemon thread, at most `llm_concurrency` at a time, over a
+    pooled requests.Session. Failed calls are retried with exponential
+    backoff and then fall back to the request's template text. Responses
+    are cached on disk, so a rerun with the same seed makes no API calls.
+    
+    Without an API key the service is disabled and every request resolves
+    immediately to its fallback.
+    
+    Config keys (all optional):
+        llm_base_url: API root, e.g. a local stub server
+                      (default: $ANTHROPIC_BASE_URL or the Anthropic API)
+        llm_model: Model name sent with each request
+        llm_concurrency: Maximum requests in flight (default 16)
+        llm_max_retries: Retries per request after the first attempt (default 4)
+        llm_timeout: Per-request timeout in seconds (default 30)
+        llm_cache: Path of the response cache (default output/llm_cache.sqlite)
+    """
+    
+    def __init__(self, config: dict):
+        self.api_key = os.getenv('ANTHROPIC_API_KEY')
+        self.enabled = bool(self.api_key)
+        self.base_url = (config.get('llm_base_url') or os.getenv('ANTHROPIC_BASE_URL')
+                         or DEFAULT_BASE_URL).rstrip('/')
+        self.model = config.get('llm_model', DEFAULT_MODEL)
+        self.concurrency = config.get('llm_concurrency', 16)
+        self.max_retries = config.get('llm_max_retries', 4)
+        self.timeout = config.get('llm_timeout', 30)
+        self.backoff = config.get('llm_backoff', 0.5)
+        self.cache_path = config.get('llm_cache', DEFAULT_CACHE_PATH)
+        self.stats = {'requests': 0, 'cache_hits': 0, 'api_calls': 0, 'retries': 0, 'fallbacks': 0}
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def start(self):
+        if not self.enabled:
+            logger.warning("ANTHROPIC_API_KEY not set; using template content instead of the LLM")
+            return
+        self.cache = PromptCache(self.cache_path)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'x-api-key': self.api_key,
+            'anthropic-version': '2023-06-01',
+            'content-type': 'application/json',
+        })
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                           thread_name_prefix='llm-http')
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='llm-loop', daemon=True)
+        self.thread.start()
+        self._semaphore = asyncio.run_coroutine_threadsafe(self._make_semaphore(), self.loop).result()
+        self._in_flight = {}
+    
+    def close(self):
+        if not self.enabled:
+            return
+        # Requests nobody waits for any more (e.g. after an error) end before the loop stops
+        asyncio.run_coroutine_threadsafe(self._cancel_pending(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.executor.shutdown()
+        self.session.close()
+        self.cache.close()
+        logger.info("LLM content: {requests} requests, {cache_hits} cached, {api_calls} API calls, "
+                    "{retries} retries, {fallbacks} fallbacks".format(**self.stats))
+    
+    def submit(self, request: ContentRequest, **fields) -> Future:
+        """
+        Start generating a request's text in the background
+        
+        `fields` fill placeholders in the prompt; values may be strings or
+        Futures from earlier submits (e.g. a description waiting on its
+        task's generated name).
+        """
+        if not self.enabled:
+            future = Future()
+            future.set_result(request.fallback)
+            return future
+        return asyncio.run_coroutine_threadsafe(self._complete(request, fields), self.loop)
+    
+    # --- Event loop side -------------------------------------------------
+    
+    async def _make_semaphore(self):
+        return asyncio.Semaphore(self.concurrency)
+    
+    async def _cancel_pending(self):
+        pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    
+    async def _complete(self, request: ContentRequest, fields: dict) -> str:
+        if fields:
+            values = {}
+            for name, value in fields.items():
+                values[name] = await asyncio.wrap_future(value) if isinstance(value, Future) else value
+            request = request._replace(prompt=request.prompt.format(**values))
+        
+        self.stats['requests'] += 1
+        key = PromptCache.key(self.model, request.prompt, request.temperature, request.sample)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats['cache_hits'] += 1
+            return cached
+        
+        # Identical requests share one API call
+        task = self._in_flight.get(key)
+        if task is None:
+            task = self._in_flight[key] = asyncio.ensure_future(self._fetch(key, request))
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await task
+    
+    async def _fetch(self, key: str, request: ContentRequest) -> str:
+        payload = {
+            'model': self.model,
+            'max_tokens': request.max_tokens,
+            'temperature': request.temperature,
+            'messages': [{'role': 'user', 'content': request.prompt}],
+        }
+        loop = asyncio.get_running_loop()
+        
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats['retries'] += 1
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1) * (1 + random.random()))
+            
+            async with self._semaphore:
+                self.stats['api_calls'] += 1
+                try:
+                    response = await loop.run_in_executor(self.executor, self._post, payload)
+                except requests.RequestException as e:
+                    logger.debug(f"LLM request failed ({e}), attempt {attempt + 1}")
+                    continue
+            
+            if response.status_code == 200:
+                try:
+                    text = response.json()['content'][0]['text'].strip()
+                except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+                    # A malformed body is treated like a failed request
+                    logger.debug(f"Malformed LLM response ({e!r}), attempt {attempt + 1}")
+                    continue
+                self.cache.put(key, text)
+                return text
+            if response.status_code not in RETRY_STATUSES:
+                logger.warning(f"LLM request rejected with HTTP {response.status_code}, using fallback")
+                break
+        
+        self.stats['fallbacks'] += 1
+        return request.fallback
+    
+    def _post(self, payload: dict) -> requests.Response:
+        return self.session.post(f"{self.base_url}/v1/messages", json=payload, timeout=self.timeout)
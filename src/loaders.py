@@ -0,0 +1,131 @@
+"""
+Loaders
+Rebuild generator outputs and the EntityStore from an existing database
+"""
+
+import numpy as np
+
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+
+from generators.tasks import TASK_COLUMNS
+from generators.teams import TEAM_TEMPLATES
+from utils import DEFAULT_CHUNK_SIZE
+
+def load_organization(conn) -> dict:
+    """The organization row as returned by generate_organizations"""
+    rows = conn.execute("""
+        SELECT org_id, name, domain, created_at, employee_count FROM organizations
+    """).fetchall()
+    if not rows:
+        raise ValueError("Database has no organization to append to")
+    if len(rows) > 1:
+        raise ValueError("Database holds several organizations (a merged build); "
+                         "extend its shards and merge again instead")
+    return dict(zip(['org_id', 'name', 'domain', 'created_at', 'employee_count'], rows[0]))
+
+def load_teams(conn, store) -> list:
+    """Team dicts as returned by generate_teams, recorded in the store"""
+    departments = {t['name']: t['department'] for t in TEAM_TEMPLATES}
+    teams = []
+    for team_id, org_id, name, description, created_at in conn.execute("""
+        SELECT team_id, org_id, name, description, created_at FROM teams ORDER BY rowid
+    """):
+        team = {
+            'team_id': team_id,
+            'org_id': org_id,
+            'name': name,
+            'description': description,
+            'department': departments.get(name, 'Operations'),
+            # Stored by sqlite3's datetime adapter ('YYYY-MM-DD HH:MM:SS');
+            # generate_teams hands out isoformat()
+            'created_at': datetime.fromisoformat(str(created_at)).isoformat()
+        }
+        teams.append(team)
+        store.add_team(team)
+    return teams
+
+def load_users(conn, store, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Load users and team memberships into the store
+    
+    Returns:
+        The EntityStore's users ColumnTable
+    """
+    cursor = conn.execute("""
+        SELECT user_id, department, job_title, created_at, is_active FROM users ORDER BY rowid
+    """)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        user_ids, departments, job_titles, created_at, is_active = zip(*rows)
+        store.add_users(list(user_ids), departments, job_titles,
+                        np.array(created_at, dtype='datetime64[s]'),
+                        np.array(is_active, dtype=np.bool_))
+    
+    positions = {user_id: i for i, user_id in enumerate(store.users.ids)}
+    for team_id, user_id in conn.execute("""
+        SELECT team_id, user_id FROM team_memberships ORDER BY rowid
+    """):
+        store.add_membership(team_id, positions[user_id])
+    
+    return store.users
+
+def load_projects(conn, store) -> list:
+    """Project dicts as returned by generate_projects, with sections recorded in the store"""
+    columns = ['project_id', 'team_id', 'name', 'description', 'project_type',
+               'status', 'owner_id', 'created_at', 'due_date']
+    projects = [dict(zip(columns, row)) for row in conn.execute(f"""
+        SELECT {', '.join(columns)} FROM projects ORDER BY rowid
+    """)]
+    for project in projects:
+        store.add_project(project)
+    
+    for section_id, project_id, name in conn.execute("""
+        SELECT section_id, project_id, name FROM sections ORDER BY project_id, position
+    """):
+        store.add_section(section_id, project_id, name)
+    
+    return projects
+
+def load_tasks(conn, store, after_rowid: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Load tasks inserted after `after_rowid` into the store
+    
+    Tasks are written project by project, so each project's rows
+    (subtasks included) are contiguous and recorded as one batch.
+    
+    Returns:
+        The EntityStore's tasks ColumnTable
+    """
+    user_positions = {user_id: i for i, user_id in enumerate(store.users.ids)}
+    cursor = conn.execute(f"""
+        SELECT {', '.join(TASK_COLUMNS)} FROM tasks WHERE rowid > ? ORDER BY rowid
+    """, (after_rowid,))
+    
+    def rows():
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                return
+            yield from chunk
+    
+    for _, project_tasks in groupby(rows(), key=itemgetter(1)):
+        store.add_tasks(list(project_tasks), user_positions)
+    
+    return store.tasks
+
+def load_field_definitions(conn) -> list:
+    """Custom field definition rows, in the tuple layout generate_custom_fields builds"""
+    return conn.execute("""
+        SELECT field_id, project_id, name, field_type, options
+        FROM custom_field_definitions ORDER BY rowid
+    """).fetchall()
+
+def load_tags(conn, org: dict) -> list:
+    """Tag rows of the organization, as returned by generate_tags"""
+    return conn.execute("""
+        SELECT tag_id, org_id, name, color FROM tags WHERE org_id = ? ORDER BY rowid
+    """, (org['org_id'],)).fetchall()
@@ -3,10 +3,10 @@ Asana Simulation Data Generator
 Main orchestration script that coordinates all data generation
 """
 
-import sqlite3
 import logging
+from contextlib import nullcontext, suppress
 from datetime import datetime
-from pathlib import Path
+from typing import Callable
 
 from generators.organizations import generate_organizations
 from generators.teams import generate_teams
@@ -16,6 +16,18 @@ from generators.tasks import generate_tasks
 from generators.comments import generate_comments
 from generators.custom_fields import generate_custom_fields
 from generators.tags import generate_tags
+from entity_store import EntityStore
+from database import (initialize_database, finalize_database, open_database,
+                      last_run, record_run)
+from loaders import (load_organization, load_teams, load_users, load_projects,
+                     load_tasks, load_field_definitions, load_tags)
+from checkpoints import Checkpointer, FileCheckpointer, pending_epoch
+from metrics import InstrumentedConnection, PipelineMetrics
+from sinks import open_sink
+from snapshots import discard_template, save_template
+from stage_cache import open_stage_cache
+from config import parse_args
+from shards import generate_shards
 
 # Configure logging
 logging.basicConfig(
@@ -24,117 +36,273 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Configuration
-CONFIG = {
-    'employee_count': 7500,  # Target: 5000-10000
-    'output_db': 'output/asana_simulation.sqlite',
-    'schema_file': 'schema.sql',
-    'start_date': '2024-07-01',  # 6 months of history
-    'end_date': '2026-01-06',  # Current date
-}
+# Tables counted in the end-of-run statistics
+STATS_TABLES = ('organizations', 'teams', 'users', 'projects', 'tasks', 'comments', 'tags')
 
-def initialize_database(db_path: str, schema_path: str):
-    """Create database and initialize schema"""
-    logger.info(f"Initializing database at {db_path}")
+def incremental_config(conn, config: dict) -> dict:
+    """
+    Validate an incremental run against the last recorded one
     
-    # Create output directory if it doesn't exist
-    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    Returns:
+        config with the run's `epoch`, which keeps its ids and RNG
+        streams apart from every earlier run
+    """
+    previous = last_run(conn)
+    if previous is None:
+        raise ValueError("Database has no tasks to extend; run a full build first")
+    if previous['id_format'] != config['id_format']:
+        raise ValueError(f"Database uses id_format={previous['id_format']!r}, "
+                         f"config has {config['id_format']!r}")
+    if config['end_date'] <= previous['end_date']:
+        raise ValueError(f"end_date {config['end_date']} must be after the previous "
+                         f"run's end_date {previous['end_date']}")
+    if config['start_date'] < previous['end_date']:
+        logger.warning(f"start_date {config['start_date']} overlaps the previous run, "
+                       f"which ended {previous['end_date']}")
+    return {**config, 'epoch': previous['epoch'] + 1}
+
+def build_workspace(config: dict, resume: bool = False, metrics_path: str = None,
+                    profile_dir: str = None, metrics_hook: Callable = None) -> dict:
+    """
+    Generate (or extend, or resume) one organization's database
     
-    # Remove existing database
-    if Path(db_path).exists():
-        Path(db_path).unlink()
-        logger.info("Removed existing database")
+    With config['output_format'] 'csv' or 'parquet' the rows go to files
+    instead (see sinks.py); those runs are always full builds.
     
-    # Create new database and execute schema
-    conn = sqlite3.connect(db_path)
-    with open(schema_path, 'r') as f:
-        schema = f.read()
-    conn.executescript(schema)
-    conn.commit()
-    logger.info("Database schema created successfully")
+    Args:
+        config: Resolved run configuration (see config.resolve_config)
+        resume: Continue an interrupted run from its last completed stage
+        metrics_path: Where to write per-stage metrics, if anywhere
+        profile_dir: Directory for per-stage cProfile output, if any
+        metrics_hook: Called with the run's PipelineMetrics once it has
+                      succeeded (the benchmarks collect them this way)
     
-    return conn
-
-def main():
-    """Main execution flow"""
-    logger.info("=== Starting Asana Simulation Data Generation ===")
+    Returns:
+        Row counts of the main tables
+    """
     start_time = datetime.now()
+    incremental = config['incremental']
+    
+    bulk_load = config['bulk_load'] and not incremental
     
-    # Initialize database
-    conn = initialize_database(CONFIG['output_db'], CONFIG['schema_file'])
+    conn = None
+    if config['output_format'] != 'sqlite':
+        if incremental or resume:
+            raise ValueError(f"output_format={config['output_format']!r} only supports full builds")
+        sink = open_sink(config)
+    else:
+        # Initialize database (or open the one being extended or resumed)
+        if incremental or resume:
+            conn = open_database(config['output_db'], bulk_load=bulk_load)
+        else:
+            conn = initialize_database(config['output_db'], config['schema_file'],
+                                       bulk_load=config['bulk_load'],
+                                       id_format=config['id_format'])
+        # SQL counters feed the metrics
+        conn = InstrumentedConnection(conn)
+        sink = open_sink(config, conn)
+    
+    # Per-stage timings
+    metrics = PipelineMetrics(sink, profile_dir=profile_dir)
+    
+    # Relationship lookups shared between generators
+    store = EntityStore()
     
     try:
-        # Step 1: Generate organization
-        logger.info("Step 1: Generating organization...")
-        org = generate_organizations(conn, CONFIG)
-        logger.info(f"Created organization: {org['name']}")
+        if incremental:
+            config = incremental_config(conn, config)
+        if resume and pending_epoch(conn) != config.get('epoch', 0):
+            raise ValueError("No interrupted run matching this configuration to resume")
+        
+        # Every stage is committed on its own and recorded in the manifest
+        if conn is not None:
+            # The template would no longer match (a new one is saved at the end)
+            discard_template(config['output_db'])
+            checkpoints = Checkpointer(conn, config, resume=resume, sink=sink)
+        else:
+            checkpoints = FileCheckpointer(sink)
+        
+        # Stages whose inputs are unchanged since an earlier run are replayed from the cache
+        cache = open_stage_cache(config)
         
-        # Step 2: Generate teams
-        logger.info("Step 2: Generating teams...")
-        teams = generate_teams(conn, org, CONFIG)
-        logger.info(f"Created {len(teams)} teams")
+        def restore_stage(stage: str) -> bool:
+            """Write a stage's rows from the stage cache instead of generating them"""
+            if cache is None or not cache.has(stage):
+                return False
+            with metrics.stage(stage):
+                rows = cache.restore(stage, sink)
+                if rows is None:
+                    return False
+                checkpoints.commit(stage)
+            logger.info(f"Restored {stage} from the stage cache ({rows:,} rows)")
+            return True
         
-        # Step 3: Generate users
-        logger.info("Step 3: Generating users...")
-        users = generate_users(conn, org, teams, CONFIG)
-        logger.info(f"Created {len(users)} users")
+        def stage_sink(stage: str):
+            """Sink a stage generates through, recording it into the cache"""
+            return cache.recording(stage, sink) if cache is not None else nullcontext(sink)
         
-        # Step 4: Generate projects
-        logger.info("Step 4: Generating projects...")
-        projects = generate_projects(conn, teams, users, CONFIG)
-        logger.info(f"Created {len(projects)} projects")
+        field_definitions = tag_rows = None
+        if incremental:
+            logger.info(f"Incremental run {config['epoch']}: "
+                        f"{config['start_date']} to {config['end_date']}")
+            
+            # Steps 1-4: Read back the existing workspace
+            logger.info("Steps 1-4: Loading organization, teams, users and projects...")
+            org = load_organization(conn)
+            teams = load_teams(conn, store)
+            users = load_users(conn, store, config['chunk_size'])
+            projects = load_projects(conn, store)
+            field_definitions = load_field_definitions(conn)
+            tag_rows = load_tags(conn, org)
+            logger.info(f"Loaded {len(teams)} teams, {len(users)} users, {len(projects)} projects")
+            
+            # Archived projects get no new work
+            projects = [p for p in projects if p['status'] != 'archived']
+        else:
+            # Step 1: Generate organization
+            if checkpoints.done('organizations') or restore_stage('organizations'):
+                org = load_organization(conn)
+            else:
+                logger.info("Step 1: Generating organization...")
+                with metrics.stage('organizations'), stage_sink('organizations') as out:
+                    org = generate_organizations(out, config)
+                    checkpoints.commit('organizations')
+                logger.info(f"Created organization: {org['name']}")
+            
+            # Step 2: Generate teams
+            if checkpoints.done('teams') or restore_stage('teams'):
+                teams = load_teams(conn, store)
+            else:
+                logger.info("Step 2: Generating teams...")
+                with metrics.stage('teams'), stage_sink('teams') as out:
+                    teams = generate_teams(out, org, config, store)
+                    checkpoints.commit('teams')
+                logger.info(f"Created {len(teams)} teams")
+            
+            # Step 3: Generate users
+            if checkpoints.done('users') or restore_stage('users'):
+                users = load_users(conn, store, config['chunk_size'])
+            else:
+                logger.info("Step 3: Generating users...")
+                with metrics.stage('users'), stage_sink('users') as out:
+                    users = generate_users(out, org, teams, config, store)
+                    checkpoints.commit('users')
+                logger.info(f"Created {len(users)} users")
+            
+            # Step 4: Generate projects
+            if checkpoints.done('projects') or restore_stage('projects'):
+                projects = load_projects(conn, store)
+            else:
+                logger.info("Step 4: Generating projects...")
+                with metrics.stage('projects'), stage_sink('projects') as out:
+                    projects = generate_projects(out, teams, users, config, store)
+                    checkpoints.commit('projects')
+                logger.info(f"Created {len(projects)} projects")
         
         # Step 5: Generate tasks
-        logger.info("Step 5: Generating tasks...")
-        tasks = generate_tasks(conn, projects, users, CONFIG)
-        logger.info(f"Created {len(tasks)} tasks")
+        if checkpoints.done('tasks') or restore_stage('tasks'):
+            tasks = load_tasks(conn, store, checkpoints.first_rowid('tasks', 'tasks'),
+                               config['chunk_size'])
+        else:
+            logger.info("Step 5: Generating tasks...")
+            with metrics.stage('tasks'), stage_sink('tasks') as out:
+                tasks = generate_tasks(out, projects, users, config, store)
+                checkpoints.commit('tasks')
+            logger.info(f"Created {len(tasks)} tasks")
         
         # Step 6: Generate comments
-        logger.info("Step 6: Generating comments...")
-        comments = generate_comments(conn, tasks, users, CONFIG)
-        logger.info(f"Created {len(comments)} comments")
+        if not (checkpoints.done('comments') or restore_stage('comments')):
+            logger.info("Step 6: Generating comments...")
+            with metrics.stage('comments'), stage_sink('comments') as out:
+                comments = generate_comments(out, tasks, users, config, store)
+                checkpoints.commit('comments')
+            logger.info(f"Created {comments} comments")
         
         # Step 7: Generate custom fields
-        logger.info("Step 7: Generating custom fields...")
-        custom_fields = generate_custom_fields(conn, projects, tasks, CONFIG)
-        logger.info(f"Created {custom_fields} custom field values")
+        if not (checkpoints.done('custom_fields') or restore_stage('custom_fields')):
+            logger.info("Step 7: Generating custom fields...")
+            with metrics.stage('custom_fields'), stage_sink('custom_fields') as out:
+                custom_fields = generate_custom_fields(out, projects, tasks, config, store,
+                                                       field_definitions)
+                checkpoints.commit('custom_fields')
+            logger.info(f"Created {custom_fields} custom field values")
         
         # Step 8: Generate tags
-        logger.info("Step 8: Generating tags...")
-        tags = generate_tags(conn, org, tasks, CONFIG)
-        logger.info(f"Created {len(tags)} tags and associations")
+        if not (checkpoints.done('tags') or restore_stage('tags')):
+            logger.info("Step 8: Generating tags...")
+            with metrics.stage('tags'), stage_sink('tags') as out:
+                tags = generate_tags(out, org, tasks, config, store, tag_rows)
+                checkpoints.commit('tags')
+            logger.info(f"Created {len(tags)} tags and associations")
         
-        # Commit all changes
-        conn.commit()
-        logger.info("All data committed to database")
-        
-        # Generate statistics
-        cursor = conn.cursor()
-        stats = {
-            'organizations': cursor.execute("SELECT COUNT(*) FROM organizations").fetchone()[0],
-            'teams': cursor.execute("SELECT COUNT(*) FROM teams").fetchone()[0],
-            'users': cursor.execute("SELECT COUNT(*) FROM users").fetchone()[0],
-            'projects': cursor.execute("SELECT COUNT(*) FROM projects").fetchone()[0],
-            'tasks': cursor.execute("SELECT COUNT(*) FROM tasks").fetchone()[0],
-            'comments': cursor.execute("SELECT COUNT(*) FROM comments").fetchone()[0],
-            'tags': cursor.execute("SELECT COUNT(*) FROM tags").fetchone()[0],
-        }
+        if conn is not None:
+            record_run(conn, config, 'incremental' if incremental else 'full')
+            conn.commit()
+            logger.info("All data committed to database")
+            
+            # Build indexes and planner statistics over the loaded data
+            with metrics.stage('finalize'):
+                finalize_database(conn, config['schema_file'], bulk_load=bulk_load)
+            
+            # Pristine copy that snapshots.Snapshot resets episodes from
+            if config['snapshot']:
+                with metrics.stage('snapshot'):
+                    save_template(conn, config['output_db'])
+            
+            # Generate statistics
+            stats = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                     for table in STATS_TABLES}
+            output = config['output_db']
+        else:
+            # Flush the remaining row groups and close the files
+            with metrics.stage('finalize'):
+                sink.close()
+            stats = {table: sink.rows.get(table, 0) for table in STATS_TABLES}
+            output = sink.directory
         
         logger.info("\n=== Generation Complete ===")
-        logger.info("Database Statistics:")
+        logger.info("Output Statistics:")
         for entity, count in stats.items():
             logger.info(f"  {entity.capitalize()}: {count:,}")
         
+        metrics.log_summary()
+        if metrics_path:
+            metrics.write(metrics_path, {'epoch': config.get('epoch', 0),
+                                         'employee_count': config['employee_count']})
+        if metrics_hook:
+            metrics_hook(metrics)
+        
         elapsed = (datetime.now() - start_time).total_seconds()
         logger.info(f"\nTotal time: {elapsed:.2f} seconds")
-        logger.info(f"Output: {CONFIG['output_db']}")
-        
+        logger.info(f"Output: {output}")
+        return stats
+    
     except Exception as e:
         logger.error(f"Error during generation: {e}", exc_info=True)
-        conn.rollback()
+        if conn is not None:
+            # The writer thread may still be inserting rows of the failed stage
+            with suppress(Exception):
+                sink.flush()
+            conn.rollback()
+            logger.error("Completed stages are kept; rerun with --resume to continue")
         raise
     finally:
-        conn.close()
+        sink.close()
+
+def main(argv=None):
+    """Main execution flow (see config.build_parser for the command line)"""
+    config, args = parse_args(argv)
+    
+    logger.info("=== Starting Asana Simulation Data Generation ===")
+    logger.info(f"Preset: {config['preset']}, {config['employee_count']:,} employees, "
+                f"{config['start_date']} to {config['end_date']}")
+    
+    if config['organizations'] > 1:
+        generate_shards(config, build_workspace, resume=args.resume, merge=args.merge,
+                        metrics_path=args.metrics, profile_dir=args.profile)
+    else:
+        build_workspace(config, resume=args.resume, metrics_path=args.metrics,
+                        profile_dir=args.profile)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
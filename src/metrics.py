@@ -0,0 +1,218 @@
+"""
+Pipeline Metrics
+Per-stage timings, sink and SQL counters and optional cProfile output
+"""
+
+import cProfile
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Prefix of every exported Prometheus metric
+PROMETHEUS_PREFIX = 'asana_seed_stage'
+
+# Per-stage fields exported as Prometheus gauges, with their help text
+PROMETHEUS_FIELDS = {
+    'seconds': 'Wall time of the stage',
+    'cpu_seconds': 'CPU time of the stage, including worker processes',
+    'rows': 'Rows written by the stage',
+    'python_seconds': 'Wall time spent outside sink writes and SQLite calls',
+    'write_seconds': 'Wall time in sink writes (waiting on the writer thread, if any)',
+    'sql_statements': 'SQL statements issued (executemany counts once)',
+    'execute_seconds': 'Wall time in execute calls',
+    'executemany_seconds': 'Wall time in executemany calls',
+    'commit_seconds': 'Wall time in commits',
+}
+
+def cpu_time() -> float:
+    """CPU seconds of this process and its finished children (task workers)"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+class SQLCounters:
+    """Running totals of the SQL issued through an InstrumentedConnection"""
+    
+    FIELDS = ('sql_statements', 'execute_seconds', 'executemany_calls',
+              'executemany_seconds', 'commits', 'commit_seconds')
+    
+    def __init__(self):
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+    
+    def snapshot(self) -> dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+    
+    def record(self, kind: str, seconds: float):
+        self.sql_statements += 1
+        setattr(self, f'{kind}_seconds', getattr(self, f'{kind}_seconds') + seconds)
+        if kind == 'executemany':
+            self.executemany_calls += 1
+
+class _InstrumentedCursor:
+    """Cursor proxy feeding its execute/executemany timings into the connection's counters"""
+    
+    def __init__(self, cursor, counters: SQLCounters):
+        self._cursor = cursor
+        self._counters = counters
+    
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        self._cursor.execute(sql, parameters)
+        self._counters.record('execute', time.perf_counter() - start)
+        return self
+    
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        self._cursor.executemany(sql, seq_of_parameters)
+        self._counters.record('executemany', time.perf_counter() - start)
+        return self
+    
+    def __iter__(self):
+        return iter(self._cursor)
+    
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class InstrumentedConnection:
+    """
+    sqlite3 connection proxy that counts statements and times SQLite calls
+    
+    sinks.SQLiteSink writes through it. The sink passes materialized
+    chunks to executemany, so executemany time is the write path alone;
+    time between SQLite calls is Python-side generation. Behind a
+    sinks.ThreadedSink the executemany calls run on the writer thread and
+    overlap generation instead.
+    """
+    
+    def __init__(self, conn):
+        self._conn = conn
+        self.counters = SQLCounters()
+    
+    def cursor(self):
+        return _InstrumentedCursor(self._conn.cursor(), self.counters)
+    
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+    
+    def commit(self):
+        start = time.perf_counter()
+        self._conn.commit()
+        self.counters.commits += 1
+        self.counters.commit_seconds += time.perf_counter() - start
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+class PipelineMetrics:
+    """
+    Measures each pipeline stage run inside `stage()`
+    
+    Rows and write time come from the sink; SQL counters from its
+    connection when it is a SQLiteSink over an InstrumentedConnection
+    (they stay zero for file sinks).
+    
+    Args:
+        sink: Sink the stages write through
+        profile_dir: If set, every stage runs under cProfile and its
+                     statistics are written to <profile_dir>/<stage>.pstats
+    """
+    
+    def __init__(self, sink, profile_dir: Optional[str] = None):
+        self.sink = sink
+        conn = getattr(sink, 'conn', None)
+        self.counters = conn.counters if isinstance(conn, InstrumentedConnection) else SQLCounters()
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.stages = {}
+    
+    @contextmanager
+    def stage(self, name: str):
+        before = self.counters.snapshot()
+        rows_before, write_before = self.sink.total_rows, self.sink.write_seconds
+        profiler = cProfile.Profile() if self.profile_dir else None
+        start, cpu_start = time.perf_counter(), cpu_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield
+            # Rows still queued for a writer thread belong to this stage
+            self.sink.flush()
+        finally:
+            if profiler:
+                profiler.disable()
+            seconds = time.perf_counter() - start
+            cpu_seconds = cpu_time() - cpu_start
+            sql = {field: value - before[field]
+                   for field, value in self.counters.snapshot().items()}
+            rows = self.sink.total_rows - rows_before
+            write_seconds = self.sink.write_seconds - write_before
+            # executemany runs inside sink writes; execute and commit outside them
+            outside_python = write_seconds + sql['execute_seconds'] + sql['commit_seconds']
+            self.stages[name] = {
+                'seconds': round(seconds, 4),
+                'cpu_seconds': round(cpu_seconds, 4),
+                'rows': rows,
+                'rows_per_sec': round(rows / seconds, 1) if seconds > 0 else None,
+                'python_seconds': round(max(seconds - outside_python, 0.0), 4),
+                'write_seconds': round(write_seconds, 4),
+                'sql_statements': sql['sql_statements'],
+                'execute_seconds': round(sql['execute_seconds'], 4),
+                'executemany_calls': sql['executemany_calls'],
+                'executemany_seconds': round(sql['executemany_seconds'], 4),
+                'commits': sql['commits'],
+                'commit_seconds': round(sql['commit_seconds'], 4),
+            }
+            if profiler:
+                self.profile_dir.mkdir(parents=True, exist_ok=True)
+                profiler.dump_stats(self.profile_dir / f'{name}.pstats')
+    
+    def log_summary(self):
+        logger.info("Stage timings (wall / cpu / python / write / commit seconds, rows):")
+        for name, m in self.stages.items():
+            logger.info(f"  {name:<14} {m['seconds']:8.2f} {m['cpu_seconds']:8.2f} "
+                        f"{m['python_seconds']:8.2f} {m['write_seconds']:8.2f} "
+                        f"{m['commit_seconds']:8.2f}  {m['rows']:,} rows in "
+                        f"{m['sql_statements']:,} statements")
+    
+    def write(self, path: str, labels: dict):
+        """
+        Export the stage metrics
+        
+        A path ending in .prom is written (atomically) in Prometheus
+        textfile-collector format; anything else gets one JSON line per
+        stage appended, so the file accumulates a history of runs.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == '.prom':
+            temp = path.with_suffix('.prom.tmp')
+            temp.write_text(self.prometheus(labels))
+            os.replace(temp, path)
+        else:
+            with open(path, 'a') as f:
+                for name, m in self.stages.items():
+                    record = {'started_at': self.started_at, **labels, 'stage': name, **m}
+                    f.write(json.dumps(record) + '\n')
+        logger.info(f"Metrics written to {path}")
+    
+    def prometheus(self, labels: dict) -> str:
+        lines = []
+        for field, help_text in PROMETHEUS_FIELDS.items():
+            metric = f'{PROMETHEUS_PREFIX}_{field}'
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} gauge')
+            for name, m in self.stages.items():
+                label_text = ','.join(f'{key}="{value}"' for key, value in
+                                      {**labels, 'stage': name}.items())
+                lines.append(f'{metric}{{{label_text}}} {m[field]}')
+        return '\n'.join(lines) + '\n'
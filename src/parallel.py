@@ -0,0 +1,31 @@
+"""
+Parallel Execution Helpers
+Shards CPU-heavy generation across worker processes
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator
+
+def map_ordered(fn: Callable, items: Iterable, workers: int = 1) -> Iterator:
+    """
+    Apply `fn` to every item, yielding results in input order
+    
+    With more than one worker the calls run in a ProcessPoolExecutor; at
+    most `2 * workers` shards are in flight so a slow consumer (the
+    database writer) applies back-pressure instead of buffering every result.
+    Shards must carry their own RNG seed (see rng.spawn_seeds) so results
+    do not depend on which process ran them.
+    """
+    if workers <= 1:
+        yield from map(fn, items)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,360 @@
+"""
+Workspace Queries
+Read-side API over a generated database: fixed statements, __slots__ row models and an LRU identity map
+"""
+
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+# Objects kept in the identity map
+DEFAULT_CACHE_SIZE = 10000
+
+class Row:
+    """Base of the row models: one slot per selected column, in SELECT order"""
+    
+    __slots__ = ()
+    table = ''
+    
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+    
+    @classmethod
+    def select(cls, alias: str = '') -> str:
+        """Column list of the model's SELECT"""
+        prefix = f"{alias}." if alias else ''
+        return ', '.join(prefix + name for name in cls.__slots__)
+    
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    def __repr__(self):
+        return f"{type(self).__name__}({getattr(self, self.__slots__[0])!r})"
+
+class User(Row):
+    __slots__ = ('user_id', 'org_id', 'email', 'name', 'job_title', 'department',
+                 'created_at', 'is_active')
+    table = 'users'
+
+class Project(Row):
+    __slots__ = ('project_id', 'team_id', 'name', 'description', 'project_type', 'status',
+                 'owner_id', 'created_at', 'due_date')
+    table = 'projects'
+
+class Section(Row):
+    __slots__ = ('section_id', 'project_id', 'name', 'position')
+    table = 'sections'
+
+class Task(Row):
+    __slots__ = ('task_id', 'project_id', 'section_id', 'parent_task_id', 'name', 'description',
+                 'assignee_id', 'created_by', 'created_at', 'due_date', 'completed',
+                 'completed_at', 'priority')
+    table = 'tasks'
+
+class Comment(Row):
+    __slots__ = ('comment_id', 'task_id', 'user_id', 'content', 'created_at')
+    table = 'comments'
+
+class Tag(Row):
+    __slots__ = ('tag_id', 'org_id', 'name', 'color')
+    table = 'tags'
+
+class CustomFieldValue(Row):
+    """A task's value of a custom field, with the field's definition"""
+    
+    __slots__ = ('value_id', 'field_id', 'name', 'field_type', 'value')
+
+class TaskDetail:
+    """A task with its comments (oldest first), tags, custom field values and subtasks"""
+    
+    __slots__ = ('task', 'comments', 'tags', 'custom_fields', 'subtasks')
+    
+    def __init__(self, task: Task, comments: List[Comment], tags: List[Tag],
+                 custom_fields: List[CustomFieldValue], subtasks: List[Task]):
+        self.task = task
+        self.comments = comments
+        self.tags = tags
+        self.custom_fields = custom_fields
+        self.subtasks = subtasks
+
+# Statements are fixed strings: sqlite3 prepares each once per connection
+# and reuses it from its statement cache on every later call
+GET = {model: f"SELECT {model.select()} FROM {model.table} WHERE {model.__slots__[0]} = ?"
+       for model in (User, Project, Section, Task, Comment, Tag)}
+
+MY_TASKS = f"""
+    SELECT {Task.select()} FROM tasks
+    WHERE assignee_id = ? AND completed = 0
+    ORDER BY due_date IS NULL, due_date, created_at
+"""
+
+MY_TASKS_ALL = f"""
+    SELECT {Task.select()} FROM tasks
+    WHERE assignee_id = ?
+    ORDER BY completed, due_date IS NULL, due_date, created_at
+"""
+
+PROJECT_SECTIONS = f"""
+    SELECT {Section.select()} FROM sections WHERE project_id = ? ORDER BY position
+"""
+
+# Top-level tasks of a project's sections, board order
+PROJECT_BOARD = f"""
+    SELECT {Task.select('t')} FROM sections s
+    JOIN tasks t ON t.section_id = s.section_id
+    WHERE s.project_id = ? AND t.parent_task_id IS NULL
+    ORDER BY s.position, t.completed, t.created_at
+"""
+
+OVERDUE_TASKS = f"""
+    SELECT {Task.select()} FROM tasks
+    WHERE due_date < ? AND completed = 0
+    ORDER BY due_date, created_at
+"""
+
+OVERDUE_TASKS_OF = f"""
+    SELECT {Task.select()} FROM tasks
+    WHERE assignee_id = ? AND due_date < ? AND completed = 0
+    ORDER BY due_date, created_at
+"""
+
+TASK_COMMENTS = f"""
+    SELECT {Comment.select()} FROM comments WHERE task_id = ? ORDER BY created_at, rowid
+"""
+
+TASK_TAGS = f"""
+    SELECT {Tag.select('g')} FROM task_tags tt
+    JOIN tags g ON g.tag_id = tt.tag_id
+    WHERE tt.task_id = ? ORDER BY g.name
+"""
+
+TASK_CUSTOM_FIELDS = """
+    SELECT v.value_id, v.field_id, d.name, d.field_type, v.value FROM custom_field_values v
+    JOIN custom_field_definitions d ON d.field_id = v.field_id
+    WHERE v.task_id = ? ORDER BY d.name
+"""
+
+SUBTASKS = f"""
+    SELECT {Task.select()} FROM tasks WHERE parent_task_id = ? ORDER BY created_at, rowid
+"""
+
+TAGGED_TASKS = f"""
+    SELECT {Task.select('t')} FROM task_tags tt
+    JOIN tasks t ON t.task_id = tt.task_id
+    WHERE tt.tag_id = ? ORDER BY t.created_at
+"""
+
+FIELD_TASKS = f"""
+    SELECT {Task.select('t')} FROM custom_field_values v
+    JOIN tasks t ON t.task_id = v.task_id
+    WHERE v.field_id = ? ORDER BY t.created_at
+"""
+
+FIELD_VALUE_TASKS = f"""
+    SELECT {Task.select('t')} FROM custom_field_values v
+    JOIN tasks t ON t.task_id = v.task_id
+    WHERE v.field_id = ? AND v.value = ? ORDER BY t.created_at
+"""
+
+USER_COMMENTS = f"""
+    SELECT {Comment.select()} FROM comments WHERE user_id = ? ORDER BY created_at, rowid
+"""
+
+# Task columns update_task may change
+TASK_UPDATABLE = ('section_id', 'name', 'description', 'assignee_id', 'due_date', 'completed',
+                  'completed_at', 'priority')
+
+class Workspace:
+    """
+    Queries an agent issues against a generated workspace
+    
+    Every row comes back as a model object, and an LRU identity map keeps
+    the most recently used `cache_size` of them: a row already in the map
+    is returned as the same object, and get_*() lookups of cached rows
+    skip SQLite entirely. Writes made through update_task/add_comment
+    drop the rows they touch. Any other change to the database (writes on
+    this connection or commits by another one, e.g. a snapshot reset) is
+    noticed through total_changes and PRAGMA data_version, and empties
+    the map before the next query. Neither counter sees a rollback or a
+    snapshot restored into this very connection: roll back with
+    rollback() rather than conn.rollback(), and call invalidate() after
+    restoring a snapshot.
+    
+    Args:
+        conn: Connection to a generated database
+        cache_size: Objects kept in the identity map
+    """
+    
+    def __init__(self, conn, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.conn = conn
+        self.cache_size = cache_size
+        self._objects = OrderedDict()
+        self._version = None
+        # The simulation's "now": overdue means due before the latest run's last day
+        try:
+            row = conn.execute("SELECT end_date FROM _simulation_runs "
+                               "ORDER BY epoch DESC LIMIT 1").fetchone()
+        except sqlite3.OperationalError:  # Built before runs were recorded
+            row = None
+        self.today = row[0] if row else None
+    
+    # Identity map
+    
+    def _check_version(self):
+        version = (self.conn.execute("PRAGMA data_version").fetchone()[0],
+                   self.conn.total_changes)
+        if version != self._version:
+            self._objects.clear()
+            self._version = version
+    
+    def _lookup(self, model, key):
+        obj = self._objects.get((model, key))
+        if obj is not None:
+            self._objects.move_to_end((model, key))
+        return obj
+    
+    def _object(self, model, row: tuple):
+        """The mapped object of a row, built and cached if it is not mapped yet"""
+        key = (model, row[0])
+        obj = self._objects.get(key)
+        if obj is None:
+            obj = self._objects[key] = model(*row)
+            if len(self._objects) > self.cache_size:
+                self._objects.popitem(last=False)
+        else:
+            self._objects.move_to_end(key)
+        return obj
+    
+    def _fetch(self, model, sql: str, parameters: tuple) -> list:
+        self._check_version()
+        return [self._object(model, row) for row in self.conn.execute(sql, parameters)]
+    
+    def _get(self, model, key):
+        self._check_version()
+        obj = self._lookup(model, key)
+        if obj is None:
+            row = self.conn.execute(GET[model], (key,)).fetchone()
+            obj = self._object(model, row) if row else None
+        return obj
+    
+    def invalidate(self, model=None, key=None):
+        """Forget one cached row, every row of a model, or (by default) everything"""
+        if model is None:
+            self._objects.clear()
+        elif key is not None:
+            self._objects.pop((model, key), None)
+        else:
+            for cached in [k for k in self._objects if k[0] is model]:
+                del self._objects[cached]
+    
+    # Lookups
+    
+    def get_user(self, user_id) -> Optional[User]:
+        return self._get(User, user_id)
+    
+    def get_project(self, project_id) -> Optional[Project]:
+        return self._get(Project, project_id)
+    
+    def get_task(self, task_id) -> Optional[Task]:
+        return self._get(Task, task_id)
+    
+    def get_tag(self, tag_id) -> Optional[Tag]:
+        return self._get(Tag, tag_id)
+    
+    def my_tasks(self, user_id, include_completed: bool = False) -> List[Task]:
+        """Tasks assigned to a user, open ones by due date (undated last)"""
+        return self._fetch(Task, MY_TASKS_ALL if include_completed else MY_TASKS, (user_id,))
+    
+    def project_board(self, project_id) -> List[Tuple[Section, List[Task]]]:
+        """A project's sections in board order, each with its top-level tasks"""
+        sections = self._fetch(Section, PROJECT_SECTIONS, (project_id,))
+        columns = {section.section_id: [] for section in sections}
+        for task in self._fetch(Task, PROJECT_BOARD, (project_id,)):
+            columns[task.section_id].append(task)
+        return [(section, columns[section.section_id]) for section in sections]
+    
+    def overdue_tasks(self, as_of: str = None, assignee_id=None) -> List[Task]:
+        """
+        Incomplete tasks due before `as_of`, most overdue first
+        
+        Args:
+            as_of: YYYY-MM-DD (default: the end_date of the latest run)
+            assignee_id: Only this user's tasks
+        """
+        as_of = as_of or self.today
+        if as_of is None:
+            raise ValueError("No as_of date given and the database records no run")
+        if assignee_id is None:
+            return self._fetch(Task, OVERDUE_TASKS, (as_of,))
+        return self._fetch(Task, OVERDUE_TASKS_OF, (assignee_id, as_of))
+    
+    def task_detail(self, task_id) -> Optional[TaskDetail]:
+        """A task with its comments, tags, custom field values and subtasks"""
+        task = self.get_task(task_id)
+        if task is None:
+            return None
+        custom_fields = [CustomFieldValue(*row)
+                         for row in self.conn.execute(TASK_CUSTOM_FIELDS, (task_id,))]
+        return TaskDetail(task,
+                          self._fetch(Comment, TASK_COMMENTS, (task_id,)),
+                          self._fetch(Tag, TASK_TAGS, (task_id,)),
+                          custom_fields,
+                          self._fetch(Task, SUBTASKS, (task_id,)))
+    
+    def tagged_tasks(self, tag_id) -> List[Task]:
+        return self._fetch(Task, TAGGED_TASKS, (tag_id,))
+    
+    def field_tasks(self, field_id, value: str = None) -> List[Task]:
+        """Tasks with a value for a custom field, or with exactly `value`"""
+        if value is None:
+            return self._fetch(Task, FIELD_TASKS, (field_id,))
+        return self._fetch(Task, FIELD_VALUE_TASKS, (field_id, value))
+    
+    def user_comments(self, user_id) -> List[Comment]:
+        return self._fetch(Comment, USER_COMMENTS, (user_id,))
+    
+    # Writes (committed with commit(), like any sqlite3 transaction)
+    
+    def _written(self, model, key):
+        self.invalidate(model, key)
+        # Keep the rest of the map: this write is accounted for
+        self._version = (self.conn.execute("PRAGMA data_version").fetchone()[0],
+                         self.conn.total_changes)
+    
+    def update_task(self, task_id, **values):
+        """Set task columns, e.g. update_task(id, completed=1, completed_at=...)"""
+        unknown = set(values) - set(TASK_UPDATABLE)
+        if unknown:
+            raise ValueError(f"Cannot update task columns {sorted(unknown)}")
+        if not values:
+            return
+        self._check_version()
+        assignments = ', '.join(f"{column} = ?" for column in values)
+        self.conn.execute(f"UPDATE tasks SET {assignments} WHERE task_id = ?",
+                          (*values.values(), task_id))
+        self._written(Task, task_id)
+    
+    def add_comment(self, comment_id, task_id, user_id, content: str, created_at: str):
+        self._check_version()
+        self.conn.execute("INSERT INTO comments (comment_id, task_id, user_id, content, created_at) "
+                          "VALUES (?, ?, ?, ?, ?)",
+                          (comment_id, task_id, user_id, content, created_at))
+        self._written(Comment, comment_id)
+    
+    def commit(self):
+        self.conn.commit()
+    
+    def rollback(self):
+        """Roll back uncommitted writes and forget the rows they left in the map"""
+        self.conn.rollback()
+        self.invalidate()
+    
+    def close(self):
+        self.conn.close()
+
+def open_workspace(db_path: Union[str, Path], cache_size: int = DEFAULT_CACHE_SIZE) -> Workspace:
+    """Workspace over a database file, with room for every statement above in the statement cache"""
+    conn = sqlite3.connect(db_path, cached_statements=256)
+    return Workspace(conn, cache_size)
@@ -0,0 +1,105 @@
+"""
+Random Number Generation
+Per-stage, reproducible RNG substreams derived from config['seed']
+"""
+
+import random
+import zlib
+from typing import List, Optional
+
+import numpy as np
+
+from ids import IdGenerator
+
+# Numeric-id namespace of each stage. Sharded stages number their shards
+# upwards from their base, so they must stay last.
+STAGE_NAMESPACES = {
+    'organizations': 1,
+    'teams': 2,
+    'users': 3,
+    'projects': 4,
+    'comments': 5,
+    'custom_fields': 6,
+    'tags': 7,
+    'tasks': 8,
+}
+
+# Spawn-key suffix of the id bit stream; large enough never to clash with
+# a shard index
+ID_STREAM_KEY = zlib.crc32(b'ids')
+
+# Spawn-key marker separating an incremental run's epoch from the stage key
+EPOCH_KEY = zlib.crc32(b'epoch')
+
+# Spawn-key marker of an organization's index in a multi-organization run
+ORG_KEY = zlib.crc32(b'organization')
+
+# Numeric-id namespaces reserved per organization: stages and task shards
+# (one per project) of organization i number their ids from i * ORG_NAMESPACES
+ORG_NAMESPACES = 4096
+
+class SimulationRNG(random.Random):
+    """
+    `random.Random` with a NumPy `Generator` attached as `.np`
+    
+    Both are seeded from the same SeedSequence, so generators keep the
+    familiar `rng.randint`/`rng.choice` API for scalar draws and use
+    `rng.np` for distributions only NumPy provides. Primary keys come from
+    `rng.ids()`, an IdGenerator on a sibling stream.
+    """
+    
+    def __init__(self, seed_seq: np.random.SeedSequence, id_format: str = 'uuid',
+                 namespace: int = 0, epoch: int = 0):
+        state = seed_seq.generate_state(4)
+        super().__init__(int.from_bytes(state.tobytes(), 'little'))
+        self.seed_seq = seed_seq
+        self.np = np.random.Generator(np.random.PCG64(seed_seq))
+        id_seed = np.random.SeedSequence(seed_seq.entropy,
+                                         spawn_key=seed_seq.spawn_key + (ID_STREAM_KEY,))
+        self.ids = IdGenerator(id_seed, id_format, namespace, epoch=epoch)
+
+def stage_seed(seed: Optional[int], stage: str, epoch: int = 0,
+               org_index: int = 0) -> np.random.SeedSequence:
+    """
+    Root seed sequence for a named pipeline stage
+    
+    The stage name is folded into the spawn key so stages never share a
+    substream; so is the epoch of an incremental run, so appended data
+    never repeats the ids or draws of earlier runs, and the organization
+    index of a multi-organization run. A seed of None draws fresh OS
+    entropy (non-reproducible run).
+    """
+    spawn_key = (zlib.crc32(stage.encode()),)
+    if org_index:
+        spawn_key += (ORG_KEY, org_index)
+    if epoch:
+        spawn_key += (EPOCH_KEY, epoch)
+    return np.random.SeedSequence(seed, spawn_key=spawn_key)
+
+def config_seed(config: dict, stage: str) -> np.random.SeedSequence:
+    """stage_seed for the seed, epoch and organization of a run's config"""
+    return stage_seed(config.get('seed'), stage, config.get('epoch', 0),
+                      config.get('org_index', 0))
+
+def stage_namespace(config: dict, stage: str) -> int:
+    """First numeric-id namespace of a stage in the config's organization"""
+    return config.get('org_index', 0) * ORG_NAMESPACES + STAGE_NAMESPACES[stage]
+
+def stage_rng(config: dict, stage: str) -> SimulationRNG:
+    """RNG for a single-stream stage (organizations, users, comments, ...)"""
+    return SimulationRNG(config_seed(config, stage), config.get('id_format', 'uuid'),
+                         stage_namespace(config, stage), config.get('epoch', 0))
+
+def spawn_seeds(config: dict, stage: str, count: int) -> List[np.random.SeedSequence]:
+    """Independent seed sequences for the shards of a stage (e.g. one per project)"""
+    if STAGE_NAMESPACES[stage] + count > ORG_NAMESPACES:
+        raise ValueError(f"{count} {stage} shards exceed the {ORG_NAMESPACES} id namespaces "
+                         f"of an organization")
+    return config_seed(config, stage).spawn(count)
+
+
+def shard_rng(config: dict, stage: str, seed_seq: np.random.SeedSequence) -> SimulationRNG:
+    """RNG for one shard of a stage, from a seed sequence returned by spawn_seeds"""
+    return SimulationRNG(seed_seq, config.get('id_format', 'uuid'),
+                         stage_namespace(config, stage) + seed_seq.spawn_key[-1],
+                         config.get('epoch', 0))
\ No newline at end of file
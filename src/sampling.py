@@ -0,0 +1,79 @@
+"""
+Weighted Sampling
+Alias-method samplers built once per distribution, O(1) per draw
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+class AliasSampler:
+    """
+    Draws outcomes with fixed relative weights (Vose's alias method)
+    
+    The tables are built once in O(n). A draw then takes one uniform
+    number: its integer part picks a column, its fraction decides between
+    the column's own outcome and its alias, so every draw is O(1) however
+    many outcomes there are. `sample` uses the stage's Python RNG;
+    `sample_many`/`indices` draw whole arrays from `rng.np`.
+    
+    Args:
+        outcomes: Values to draw
+        weights: Non-negative relative weights, one per outcome
+    """
+    
+    def __init__(self, outcomes: Sequence, weights: Sequence[float]):
+        self.outcomes = list(outcomes)
+        weights = np.asarray(weights, dtype=np.float64)
+        n = len(self.outcomes)
+        if n == 0 or len(weights) != n:
+            raise ValueError(f"Need one weight per outcome, got {len(weights)} for {n} outcomes")
+        if (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError("Weights must be non-negative with a positive sum")
+        
+        # Pair each under-full column with an over-full one until all are full
+        scaled = (weights * n / weights.sum()).tolist()
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s], alias[s] = scaled[s], l
+            scaled[l] += scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Whatever is left is full up to rounding error
+        
+        self._n = n
+        self._prob = prob
+        self._alias = alias
+        self._prob_array = np.array(prob)
+        self._alias_array = np.array(alias, dtype=np.int64)
+        self._outcome_array = np.empty(n, dtype=object)
+        for i, outcome in enumerate(self.outcomes):
+            self._outcome_array[i] = outcome
+    
+    def __len__(self) -> int:
+        return self._n
+    
+    def index(self, rng) -> int:
+        """Index of one weighted draw, using rng.random()"""
+        u = rng.random() * self._n
+        i = int(u)
+        if i == self._n:  # random() * n can round up to n
+            i -= 1
+        return i if u - i < self._prob[i] else self._alias[i]
+    
+    def sample(self, rng):
+        """One weighted draw, using rng.random()"""
+        return self.outcomes[self.index(rng)]
+    
+    def indices(self, rng, size: int) -> np.ndarray:
+        """Indices of `size` weighted draws, from rng.np"""
+        u = rng.np.random(size) * self._n
+        i = np.minimum(u.astype(np.int64), self._n - 1)
+        return np.where(u - i < self._prob_array[i], i, self._alias_array[i])
+    
+    def sample_many(self, rng, size: int) -> list:
+        """`size` weighted draws, from rng.np"""
+        return self._outcome_array[self.indices(rng, size)].tolist()
@@ -0,0 +1,158 @@
+"""
+Organization Shards
+Generates one SQLite database per organization in parallel and merges them
+"""
+
+import logging
+import multiprocessing
+import sqlite3
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from checkpoints import pending_epoch
+from database import initialize_database, finalize_database, last_run
+from ids import EPOCH_SHIFT, NAMESPACE_BITS
+from parallel import map_ordered
+from rng import ORG_NAMESPACES
+from snapshots import discard_template, save_template
+
+logger = logging.getLogger(__name__)
+
+# Organizations whose numeric-id namespaces fit below the epoch bits
+MAX_ORGANIZATIONS = (1 << (EPOCH_SHIFT - NAMESPACE_BITS)) // ORG_NAMESPACES
+
+def shard_dir(config: dict) -> Path:
+    """Directory of the per-organization databases, next to output_db"""
+    output_db = Path(config['output_db'])
+    return output_db.with_name(f"{output_db.stem}_shards")
+
+def shard_name(org_index: int) -> str:
+    return f"org_{org_index:04d}"
+
+def shard_config(config: dict, org_index: int) -> dict:
+    """
+    Config of one organization's shard
+    
+    Shards already run in parallel, so each generates its tasks serially.
+    """
+    return {**config, 'org_index': org_index, 'workers': 1,
+            'output_db': str(shard_dir(config) / f"{shard_name(org_index)}.sqlite")}
+
+def _per_shard(path: Optional[str], org_index: int) -> Optional[str]:
+    """Metrics file or profile directory of one shard"""
+    if not path:
+        return None
+    path = Path(path)
+    if path.suffix:
+        return str(path.with_name(f"{path.stem}.{shard_name(org_index)}{path.suffix}"))
+    return str(path / shard_name(org_index))
+
+def _build_shard(build: Callable, config: dict, org_index: int, resume: bool = False,
+                 metrics_path: str = None, profile_dir: str = None) -> tuple:
+    """
+    Build one shard in a worker process
+    
+    With `resume`, shards that already reached end_date are skipped and
+    interrupted ones continue from their checkpoints.
+    
+    Returns:
+        (org_index, table counts, or None if the shard was skipped)
+    """
+    if multiprocessing.parent_process() is not None:
+        # Hundreds of interleaved per-stage logs help no one; errors still show
+        logging.getLogger().setLevel(logging.WARNING)
+    
+    shard = shard_config(config, org_index)
+    resume_shard = False
+    if resume and Path(shard['output_db']).exists():
+        conn = sqlite3.connect(shard['output_db'])
+        try:
+            previous, pending = last_run(conn), pending_epoch(conn)
+        finally:
+            conn.close()
+        if pending is not None:
+            resume_shard = True
+        elif previous and previous['end_date'] == shard['end_date']:
+            return org_index, None
+    
+    return org_index, build(shard, resume=resume_shard,
+                            metrics_path=_per_shard(metrics_path, org_index),
+                            profile_dir=_per_shard(profile_dir, org_index))
+
+def generate_shards(config: dict, build: Callable, resume: bool = False, merge: bool = False,
+                    metrics_path: str = None, profile_dir: str = None) -> List[Path]:
+    """
+    Generate config['organizations'] organizations, one database each
+    
+    Shards are built by `build` (main.build_workspace) across
+    config['workers'] processes. Organization i draws from its own RNG
+    streams and numeric-id namespaces and gets a unique domain, so shards
+    can be used on their own or merged without key collisions.
+    
+    Returns:
+        Paths of the shard databases, in organization order
+    """
+    count = config['organizations']
+    if count > MAX_ORGANIZATIONS:
+        raise ValueError(f"At most {MAX_ORGANIZATIONS} organizations are supported, got {count}")
+    
+    directory = shard_dir(config)
+    directory.mkdir(parents=True, exist_ok=True)
+    workers = min(config.get('workers', 1), count)
+    logger.info(f"Generating {count} organizations into {directory} with {workers} processes")
+    start_time = datetime.now()
+    
+    build_shard = partial(_build_shard, build, config, resume=resume,
+                          metrics_path=metrics_path, profile_dir=profile_dir)
+    paths = []
+    for org_index, stats in map_ordered(build_shard, range(count), workers):
+        path = Path(shard_config(config, org_index)['output_db'])
+        paths.append(path)
+        if stats is None:
+            logger.info(f"  {shard_name(org_index)}: already complete, skipped")
+        else:
+            logger.info(f"  {shard_name(org_index)}: {stats['users']:,} users, {stats['tasks']:,} tasks, "
+                        f"{stats['comments']:,} comments")
+    
+    elapsed = (datetime.now() - start_time).total_seconds()
+    logger.info(f"Generated {count} organizations in {elapsed:.2f} seconds")
+    
+    if merge:
+        merge_shards(paths, config)
+    return paths
+
+def merge_shards(paths: List[Path], config: dict):
+    """
+    Combine shard databases into config['output_db']
+    
+    Each shard is attached in turn and copied table by table with
+    INSERT ... SELECT, in schema order so parents precede children. The
+    merged database is created with deferred indexes (when bulk_load is
+    set) which are built once at the end.
+    """
+    logger.info(f"Merging {len(paths)} shards into {config['output_db']}")
+    start_time = datetime.now()
+    discard_template(config['output_db'])
+    conn = initialize_database(config['output_db'], config['schema_file'],
+                               bulk_load=config['bulk_load'], id_format=config['id_format'])
+    tables = [name for (name,) in conn.execute("""
+        SELECT name FROM sqlite_master
+        WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY rowid
+    """)]
+    try:
+        for path in paths:
+            conn.execute("ATTACH DATABASE ? AS shard", (str(path),))
+            for table in tables:
+                conn.execute(f"INSERT INTO main.{table} SELECT * FROM shard.{table}")
+            conn.commit()
+            conn.execute("DETACH DATABASE shard")
+        finalize_database(conn, config['schema_file'], bulk_load=config['bulk_load'])
+        if config.get('snapshot'):
+            save_template(conn, config['output_db'])
+    finally:
+        conn.close()
+    
+    elapsed = (datetime.now() - start_time).total_seconds()
+    logger.info(f"Merged {len(paths)} shards in {elapsed:.2f} seconds")
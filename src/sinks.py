@@ -0,0 +1,358 @@
+"""
+Output Sinks
+Destinations generators write their rows through: SQLite, CSV or Parquet
+"""
+
+import csv
+import logging
+import queue
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from database import load_schema, table_columns
+from utils import chunked, DEFAULT_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Supported config['output_format'] values
+OUTPUT_FORMATS = ('sqlite', 'csv', 'parquet')
+
+# Rows buffered per Parquet row group (row groups are the unit readers skip/parallelize on)
+PARQUET_ROW_GROUP_SIZE = 128 * 1024
+
+# Chunks a ThreadedSink lets producers queue ahead of its writer thread
+WRITE_QUEUE_CHUNKS = 4
+
+class Sink:
+    """
+    Destination for generated rows
+    
+    Generators hand `write` a table name, its columns and an iterable of
+    row tuples (often a generator); the rows are consumed in chunks of
+    `chunk_size`, so memory stays bounded whatever the row count. Each
+    chunk is passed to `_write_chunk`, and the time spent there is kept
+    in `write_seconds` apart from the time spent producing the rows.
+    `commit` marks the end of a pipeline stage.
+    """
+    
+    def __init__(self):
+        self.rows: Dict[str, int] = {}
+        self.write_seconds = 0.0
+    
+    @property
+    def total_rows(self) -> int:
+        return sum(self.rows.values())
+    
+    def write(self, table: str, columns: List[str], rows: Iterable[tuple],
+              chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """
+        Write rows to a table
+        
+        Returns: number of rows written
+        """
+        count = 0
+        for chunk in chunked(rows, chunk_size):
+            start = time.perf_counter()
+            self._write_chunk(table, columns, chunk)
+            self.write_seconds += time.perf_counter() - start
+            count += len(chunk)
+        self.rows[table] = self.rows.get(table, 0) + count
+        return count
+    
+    def _write_chunk(self, table: str, columns: List[str], chunk: List[tuple]):
+        raise NotImplementedError
+    
+    def flush(self):
+        """Wait until every row passed to write() has reached the destination"""
+        pass
+    
+    def commit(self):
+        pass
+    
+    def close(self):
+        pass
+
+class SQLiteSink(Sink):
+    """
+    Rows inserted into a SQLite connection with executemany
+    
+    The caller owns the transaction; `commit` is the connection's.
+    """
+    
+    def __init__(self, conn):
+        super().__init__()
+        self.conn = conn
+        self._queries = {}
+    
+    def _write_chunk(self, table: str, columns: List[str], chunk: List[tuple]):
+        key = (table, tuple(columns))
+        query = self._queries.get(key)
+        if query is None:
+            placeholders = ','.join(['?' for _ in columns])
+            query = self._queries[key] = (f"INSERT INTO {table} ({','.join(columns)}) "
+                                          f"VALUES ({placeholders})")
+        self.conn.executemany(query, chunk)
+    
+    def commit(self):
+        self.conn.commit()
+    
+    def close(self):
+        self.conn.close()
+
+class FileSink(Sink):
+    """
+    One file per table in a directory
+    
+    The directory also gets the schema (`schema.sql`, with the run's key
+    types) so the files can be bulk-loaded into another engine.
+    """
+    
+    extension = ''
+    
+    def __init__(self, directory: str, schema_path: str, id_format: str = 'uuid'):
+        super().__init__()
+        self.directory = Path(directory)
+        if self.directory.exists():
+            shutil.rmtree(self.directory)
+            logger.info(f"Removed existing output directory {self.directory}")
+        self.directory.mkdir(parents=True)
+        schema = load_schema(schema_path, id_format)
+        (self.directory / 'schema.sql').write_text(schema)
+        self.types = table_columns(schema)
+        self._writers = {}
+    
+    def path(self, table: str) -> Path:
+        return self.directory / f"{table}{self.extension}"
+    
+    def _write_chunk(self, table: str, columns: List[str], chunk: List[tuple]):
+        writer = self._writers.get(table)
+        if writer is None:
+            writer = self._writers[table] = self._open(table, columns)
+        self._append(writer, table, columns, chunk)
+    
+    def commit(self):
+        # A finished stage's tables are complete: write out what is buffered
+        for writer in self._writers.values():
+            writer.flush()
+    
+    def close(self):
+        if not self._writers:
+            return
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+        logger.info(f"Wrote {len(self.rows)} tables to {self.directory}")
+
+class _CSVWriter:
+    def __init__(self, path: Path, columns: List[str], boolean_columns: List[int]):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+        self.boolean_columns = boolean_columns
+    
+    def flush(self):
+        self.file.flush()
+    
+    def close(self):
+        self.file.close()
+
+class CSVSink(FileSink):
+    """
+    RFC 4180 CSV with a header row; NULL is an empty field
+    
+    Values are written as SQLite would return them (booleans as 0/1), so
+    e.g. `COPY tasks FROM 'tasks.csv' (FORMAT csv, HEADER)` in PostgreSQL
+    or DuckDB's read_csv load them directly.
+    """
+    
+    extension = '.csv'
+    
+    def _open(self, table: str, columns: List[str]) -> _CSVWriter:
+        types = self.types.get(table, {})
+        return _CSVWriter(self.path(table), columns,
+                          [i for i, column in enumerate(columns) if types.get(column) == 'BOOLEAN'])
+    
+    def _append(self, writer: _CSVWriter, table: str, columns: List[str], chunk: List[tuple]):
+        if writer.boolean_columns:
+            chunk = [tuple(int(value) if i in writer.boolean_columns and value is not None
+                           else value for i, value in enumerate(row)) for row in chunk]
+        writer.writer.writerows(chunk)
+
+class _ParquetWriter:
+    def __init__(self, writer, schema, row_group_size: int):
+        self.writer = writer
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.batches = []
+        self.buffered = 0
+    
+    def flush(self):
+        if self.batches:
+            import pyarrow as pa
+            self.writer.write_table(pa.Table.from_batches(self.batches, self.schema),
+                                    row_group_size=self.row_group_size)
+            self.batches, self.buffered = [], 0
+    
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+class ParquetSink(FileSink):
+    """
+    One compressed Parquet file per table, written in row groups
+    
+    Column types come from the schema (TIMESTAMP -> timestamp[s], DATE ->
+    date32, BOOLEAN -> bool, INTEGER -> int64, otherwise string). Requires
+    pyarrow, which is imported only when this sink is used.
+    """
+    
+    extension = '.parquet'
+    
+    def __init__(self, directory: str, schema_path: str, id_format: str = 'uuid',
+                 compression: str = 'zstd', row_group_size: int = PARQUET_ROW_GROUP_SIZE):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(f"output_format='parquet' needs pyarrow ({e})") from e
+        self.pa, self.pq = pa, pq
+        self.compression = compression
+        self.row_group_size = row_group_size
+        super().__init__(directory, schema_path, id_format)
+    
+    def _arrow_type(self, declared: str):
+        pa = self.pa
+        return {
+            'INTEGER': pa.int64(),
+            'REAL': pa.float64(),
+            'BOOLEAN': pa.bool_(),
+            'TIMESTAMP': pa.timestamp('s'),
+            'DATE': pa.date32(),
+        }.get(declared, pa.string())
+    
+    def _open(self, table: str, columns: List[str]) -> _ParquetWriter:
+        types = self.types.get(table, {})
+        schema = self.pa.schema([(column, self._arrow_type(types.get(column, 'TEXT')))
+                                 for column in columns])
+        writer = self.pq.ParquetWriter(self.path(table), schema, compression=self.compression)
+        return _ParquetWriter(writer, schema, self.row_group_size)
+    
+    def _array(self, values: tuple, arrow_type):
+        pa = self.pa
+        try:
+            return pa.array(values, type=arrow_type)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # ISO strings for timestamps/dates (due dates may carry a time), 0/1 for booleans
+            array = pa.array(values)
+            if pa.types.is_date(arrow_type) and pa.types.is_string(array.type):
+                array = array.cast(pa.timestamp('s'))
+            return array.cast(arrow_type)
+    
+    def _append(self, writer: _ParquetWriter, table: str, columns: List[str],
+                chunk: List[tuple]):
+        arrays = [self._array(values, field.type)
+                  for values, field in zip(zip(*chunk), writer.schema)]
+        writer.batches.append(self.pa.RecordBatch.from_arrays(arrays, schema=writer.schema))
+        writer.buffered += len(chunk)
+        if writer.buffered >= self.row_group_size:
+            writer.flush()
+
+class ThreadedSink(Sink):
+    """
+    Hands chunks to another sink running on a background writer thread
+    
+    Producers queue each chunk and go back to generating while the writer
+    thread writes it through `sink`; SQLite and pyarrow release the GIL
+    while they work, so generation and I/O overlap. The queue holds at
+    most `max_chunks` chunks: a producer that gets ahead blocks until the
+    writer catches up, which bounds memory. `write_seconds` is the time
+    producers spent waiting on the writer (blocked on a full queue or in
+    `flush`), i.e. the write time that was not hidden.
+    
+    A write that fails in the writer thread is raised from the next
+    write(), flush() or commit(); later chunks are dropped. `flush` must
+    run before anything else uses the inner sink's connection.
+    
+    Args:
+        sink: Sink the writer thread writes through
+        max_chunks: Queue bound, in chunks
+    """
+    
+    def __init__(self, sink: Sink, max_chunks: int = WRITE_QUEUE_CHUNKS):
+        super().__init__()
+        self.sink = sink
+        self._queue = queue.Queue(max_chunks)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='sink-writer', daemon=True)
+        self._thread.start()
+    
+    def __getattr__(self, name):
+        # conn, directory, ... of the inner sink
+        return getattr(self.sink, name)
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._error is None:
+                    # write() keeps the inner sink's rows and write_seconds up to date
+                    table, columns, chunk = item
+                    self.sink.write(table, columns, chunk, len(chunk))
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+    
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+    
+    def _write_chunk(self, table: str, columns: List[str], chunk: List[tuple]):
+        self._raise_error()
+        self._queue.put((table, columns, chunk))
+    
+    def flush(self):
+        start = time.perf_counter()
+        self._queue.join()
+        self.write_seconds += time.perf_counter() - start
+        self._raise_error()
+    
+    def commit(self):
+        self.flush()
+        self.sink.commit()
+    
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self.sink.close()
+
+def open_sink(config: dict, conn=None) -> Sink:
+    """
+    Sink for config['output_format']
+    
+    SQLite output goes to `conn`; file formats write into a directory
+    named after output_db without its extension (output/asana_simulation/).
+    With config['write_thread'] the sink writes on a background thread
+    (see ThreadedSink).
+    """
+    output_format = config.get('output_format', 'sqlite')
+    if output_format == 'sqlite':
+        sink = SQLiteSink(conn)
+    else:
+        directory = Path(config['output_db']).with_suffix('')
+        if output_format == 'csv':
+            sink = CSVSink(directory, config['schema_file'], config['id_format'])
+        elif output_format == 'parquet':
+            sink = ParquetSink(directory, config['schema_file'], config['id_format'])
+        else:
+            raise ValueError(f"Unknown output_format {output_format!r}; "
+                             f"expected one of {OUTPUT_FORMATS}")
+    if config.get('write_thread'):
+        sink = ThreadedSink(sink)
+    return sink
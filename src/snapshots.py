@@ -0,0 +1,148 @@
+"""
+Database Snapshots
+Pristine templates of generated databases for fast RL episode resets
+"""
+
+import logging
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+from typing import List, Union
+
+logger = logging.getLogger(__name__)
+
+def template_path(db_path: Union[str, Path]) -> Path:
+    """Template kept next to a database: output/asana_simulation.template.sqlite"""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}.template{db_path.suffix}")
+
+def discard_template(db_path: Union[str, Path]):
+    """Remove the template of a database that is about to change"""
+    path = template_path(db_path)
+    if path.exists():
+        path.unlink()
+        logger.info(f"Removed outdated snapshot template {path}")
+
+def save_template(conn, db_path: Union[str, Path]) -> Path:
+    """
+    Store a pristine copy of a finished database next to it
+    
+    The copy is made with the sqlite3 backup API into a temporary file
+    that then replaces the previous template, so readers never see a
+    partial one.
+    
+    Args:
+        conn: Connection to the finished database (committed)
+        db_path: Path of that database
+    
+    Returns: path of the template
+    """
+    target = template_path(db_path)
+    partial = target.with_name(f"{target.name}.partial")
+    if partial.exists():
+        partial.unlink()
+    copy = sqlite3.connect(partial)
+    try:
+        conn.backup(copy)
+    finally:
+        copy.close()
+    os.replace(partial, target)
+    logger.info(f"Saved snapshot template {target}")
+    return target
+
+class Snapshot:
+    """
+    A generated database held in memory, handing out fresh copies of it
+    
+    The template (or the database itself when it has none) is read once
+    into an in-memory database. Every reset is then a page copy from
+    memory with the backup API, which takes milliseconds instead of a
+    regeneration, so each RL episode can start from the same pristine
+    state. File forks are plain copies of the template file, which the
+    kernel clones without going through SQLite. The snapshot needs as
+    much memory as the database file.
+    
+    Args:
+        db_path: Generated database (config['output_db'])
+    """
+    
+    def __init__(self, db_path: Union[str, Path]):
+        path = template_path(db_path)
+        # Only a template is known to still hold the pristine pages
+        self._template_file = path if path.exists() else None
+        if not path.exists():
+            path = Path(db_path)
+        if not path.exists():
+            raise FileNotFoundError(f"No database at {db_path}; run a full build first")
+        self.path = path
+        self._memory = sqlite3.connect(':memory:', check_same_thread=False)
+        source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            source.backup(self._memory)
+        finally:
+            source.close()
+        logger.info(f"Loaded snapshot of {path}")
+    
+    def reset(self, target=None):
+        """
+        Restore the pristine data into a database
+        
+        Args:
+            target: Open connection to restore in place (it stays usable),
+                    path of a database file to overwrite, or None for a
+                    new in-memory database
+        
+        Returns: the restored connection, or the path for a file target
+        """
+        if target is None:
+            target = sqlite3.connect(':memory:')
+        elif isinstance(target, (str, Path)):
+            conn = sqlite3.connect(target)
+            try:
+                self._memory.backup(conn)
+            finally:
+                conn.close()
+            return Path(target)
+        self._memory.backup(target)
+        return target
+    
+    def fork(self, n: int, directory: Union[str, Path] = None) -> list:
+        """
+        `n` independent copies for parallel episodes
+        
+        Args:
+            n: Number of copies
+            directory: Write them as episode_0000.sqlite, ... files in this
+                       directory (for episodes in other processes) instead
+                       of returning in-memory connections
+        
+        Returns: connections, or file paths with `directory`
+        """
+        if directory is None:
+            return [self.reset() for _ in range(n)]
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        paths: List[Path] = []
+        for i in range(n):
+            path = directory / f"episode_{i:04d}.sqlite"
+            # A leftover journal of an earlier episode would be replayed into the copy
+            for stale in (path, path.with_name(f"{path.name}-journal"),
+                          path.with_name(f"{path.name}-wal")):
+                if stale.exists():
+                    stale.unlink()
+            if self._template_file is not None:
+                shutil.copyfile(self._template_file, path)
+            else:
+                self.reset(path)
+            paths.append(path)
+        return paths
+    
+    def close(self):
+        self._memory.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,239 @@
+"""
+Stage Cache
+Content-addressed store of each pipeline stage's rows, reused across runs
+"""
+
+import gzip
+import hashlib
+import importlib
+import json
+import logging
+import os
+import pickle
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from checkpoints import STAGE_TABLES
+from database import load_schema
+from generators.users import FIRST_NAMES_FILE, LAST_NAMES_FILE
+from utils import chunked, DATA_DIR, DEFAULT_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = 'output/.cache'
+
+# Bump when the entry layout changes
+CACHE_FORMAT = 1
+
+# Pipeline stages in order: a stage's key folds in the key of the one before
+STAGES = tuple(STAGE_TABLES)
+
+# Config keys every stage's output depends on (seed and key layout)
+COMMON_CONFIG_KEYS = ('seed', 'id_format', 'epoch', 'org_index', 'organizations')
+
+# Further config keys each stage reads
+STAGE_CONFIG_KEYS = {
+    'organizations': ('employee_count', 'end_date'),
+    'teams': (),
+    'users': ('employee_count', 'chunk_size'),
+    'projects': ('start_date', 'end_date'),
+    'tasks': ('start_date', 'end_date', 'holidays', 'task_ranges', 'chunk_size', 'vectorized',
+              'use_llm', 'llm_model'),
+    'comments': ('end_date', 'chunk_size', 'vectorized'),
+    'custom_fields': ('chunk_size',),
+    'tags': ('chunk_size',),
+}
+
+# Modules whose source is part of every key, and each stage's own. The
+# loaders rebuild the state later stages generate from after a cache hit.
+SHARED_MODULES = ('rng', 'ids', 'utils', 'sampling', 'templates', 'business_calendar',
+                  'entity_store', 'config', 'loaders')
+STAGE_MODULES = {
+    'organizations': ('generators.organizations',),
+    'teams': ('generators.teams',),
+    'users': ('generators.users',),
+    'projects': ('generators.projects',),
+    'tasks': ('generators.tasks', 'llm', 'parallel'),
+    'comments': ('generators.comments',),
+    'custom_fields': ('generators.custom_fields',),
+    'tags': ('generators.tags',),
+}
+
+# Files under DATA_DIR each stage reads
+STAGE_DATA_FILES = {
+    'users': (FIRST_NAMES_FILE, LAST_NAMES_FILE),
+}
+
+@lru_cache(maxsize=None)
+def module_hash(name: str) -> str:
+    """sha256 of a module's source file"""
+    return hashlib.sha256(Path(importlib.import_module(name).__file__).read_bytes()).hexdigest()
+
+def data_hash(filename: str) -> Optional[str]:
+    """sha256 of a data file, None if it is missing (generators then use built-in data)"""
+    path = Path(DATA_DIR) / filename
+    return hashlib.sha256(path.read_bytes()).hexdigest() if path.exists() else None
+
+def stage_keys(config: dict) -> Dict[str, str]:
+    """
+    Cache key of every stage
+    
+    A key hashes the stage's config slice (seed included), the source of
+    the modules that generate it, the data files it reads, the schema and
+    the key of the previous stage, so changing anything a stage depends on also invalidates every
+    stage after it.
+    """
+    schema = load_schema(config['schema_file'], config.get('id_format', 'uuid'))
+    schema_hash = hashlib.sha256(schema.encode()).hexdigest()
+    keys = {}
+    upstream = None
+    for stage in STAGES:
+        inputs = {
+            'format': CACHE_FORMAT,
+            'stage': stage,
+            'config': {key: config.get(key)
+                       for key in COMMON_CONFIG_KEYS + STAGE_CONFIG_KEYS[stage]},
+            'modules': {name: module_hash(name)
+                        for name in SHARED_MODULES + STAGE_MODULES[stage]},
+            'data': {name: data_hash(name) for name in STAGE_DATA_FILES.get(stage, ())},
+            'schema': schema_hash,
+            'upstream': upstream,
+        }
+        encoded = json.dumps(inputs, sort_keys=True, default=str).encode()
+        upstream = keys[stage] = hashlib.sha256(encoded).hexdigest()
+    return keys
+
+class RecordingSink:
+    """
+    Passes rows on to a sink and records every chunk into a cache entry
+    
+    Entries are a gzip stream of pickled (table, columns, chunk) records,
+    in write order, so replaying one reproduces the same rows and rowids.
+    """
+    
+    def __init__(self, sink, file):
+        self.sink = sink
+        self._file = file
+    
+    def write(self, table: str, columns: List[str], rows: Iterable[tuple],
+              chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        count = 0
+        for chunk in chunked(rows, chunk_size):
+            pickle.dump((table, list(columns), chunk), self._file, pickle.HIGHEST_PROTOCOL)
+            count += self.sink.write(table, columns, chunk, chunk_size)
+        return count
+    
+    def __getattr__(self, name):
+        return getattr(self.sink, name)
+
+class StageCache:
+    """
+    Rows of pipeline stages stored under content-addressed keys
+    
+    Entries are files named <key>.stage in `directory`. Reading an entry
+    refreshes its modification time, and after every new entry the least
+    recently used ones are removed until the directory holds at most
+    `max_bytes` (entries of the current run are kept). Several processes
+    (e.g. organization shards) can share a directory: entries appear
+    atomically and an entry removed by another process is a miss.
+    
+    Args:
+        directory: Cache directory
+        keys: {stage: key} of the run (see stage_keys)
+        max_bytes: Size the cache is trimmed to
+    """
+    
+    def __init__(self, directory: str, keys: Dict[str, str], max_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.keys = keys
+        self.max_bytes = max_bytes
+    
+    def path(self, stage: str) -> Path:
+        return self.directory / f"{self.keys[stage]}.stage"
+    
+    def has(self, stage: str) -> bool:
+        return self.path(stage).exists()
+    
+    def restore(self, stage: str, sink) -> Optional[int]:
+        """
+        Write a stage's cached rows through `sink`
+        
+        Returns: rows written, or None if the stage is not cached
+        """
+        path = self.path(stage)
+        try:
+            file = gzip.open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        count = 0
+        with file:
+            while True:
+                try:
+                    table, columns, chunk = pickle.load(file)
+                except EOFError:
+                    break
+                count += sink.write(table, columns, chunk, len(chunk))
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return count
+    
+    @contextmanager
+    def recording(self, stage: str, sink):
+        """
+        Sink to generate a stage through, storing its rows as a cache entry
+        
+        The entry is only kept if the block completes.
+        """
+        path = self.path(stage)
+        partial = path.with_name(f"{path.name}.{os.getpid()}.partial")
+        file = gzip.open(partial, 'wb', compresslevel=1)
+        try:
+            yield RecordingSink(sink, file)
+            file.close()
+            os.replace(partial, path)
+        except BaseException:
+            file.close()
+            partial.unlink()
+            raise
+        self.evict()
+    
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for path in self.directory.glob('*.stage'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        current = {f"{key}.stage" for key in self.keys.values()}
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path.name in current:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            logger.info(f"Evicted stage cache entry {path.name}")
+
+def open_stage_cache(config: dict) -> Optional[StageCache]:
+    """
+    The run's StageCache, or None when stages cannot be reused
+    
+    Only seeded full builds into SQLite are cached: unseeded runs are not
+    reproducible, and incremental runs depend on the existing database.
+    """
+    if (not config.get('stage_cache') or config.get('seed') is None
+            or config.get('incremental') or config.get('output_format', 'sqlite') != 'sqlite'):
+        return None
+    return StageCache(config.get('stage_cache_dir', DEFAULT_CACHE_DIR), stage_keys(config),
+                      int(config.get('stage_cache_mb', 1024) * 1024 * 1024))
@@ -0,0 +1,81 @@
+"""
+Text Templates
+Placeholder templates parsed once into slot-indexed format strings
+"""
+
+from string import Formatter
+from typing import Dict, List, Mapping, Sequence
+
+class Template:
+    """
+    A text with `{slot}` placeholders, parsed once
+    
+    Placeholders are renumbered by the position of their slot in `slots`,
+    so filling the template is a single str.format call with the values
+    in that order, however the placeholders are arranged in the text.
+    
+    Args:
+        text: Template text, e.g. "Blocked by {blocker}. Need help from team."
+        slots: Every slot name the template may use, in fill/draw order
+        pools: Optional {slot: values} that `render` draws from
+    """
+    
+    def __init__(self, text: str, slots: Sequence[str], pools: Mapping[str, Sequence] = None):
+        self.text = text
+        parsed = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if field is not None and field not in slots:
+                raise ValueError(f"Template {text!r} uses unknown slot {{{field}}}")
+            if spec or conversion:
+                raise ValueError(f"Template {text!r}: format specs are not supported")
+            parsed.append((literal, field))
+        
+        # Slots this template uses, in the given order, and their indices
+        used = {field for _, field in parsed}
+        self.slots = tuple(slot for slot in slots if slot in used)
+        index = {slot: i for i, slot in enumerate(self.slots)}
+        self._format = ''.join(
+            literal.replace('{', '{{').replace('}', '}}')
+            + (f'{{{index[field]}}}' if field is not None else '')
+            for literal, field in parsed).format
+        self.pools = tuple(pools[slot] for slot in self.slots) if pools else ()
+        # Templates without slots always produce the same text
+        self._constant = None if self.slots else self._format()
+    
+    def fill(self, values: Mapping[str, object]) -> str:
+        """Text with every slot replaced by values[slot]"""
+        if not self.slots:
+            return self._constant
+        return self._format(*[values[slot] for slot in self.slots])
+    
+    def render(self, rng) -> str:
+        """Text with each slot filled by rng.choice from its pool, in slot order"""
+        if not self.slots:
+            return self._constant
+        choice = rng.choice
+        return self._format(*[choice(pool) for pool in self.pools])
+
+class TemplateSet:
+    """
+    Uniform choice among templates whose slots draw from shared pools
+    
+    Rendering draws the template with rng.choice, then one value per slot
+    the template uses, in the order of `pools`.
+    
+    Args:
+        texts: Template texts
+        pools: {slot: values}; its order is the draw order of the slots
+    """
+    
+    def __init__(self, texts: Sequence[str], pools: Dict[str, Sequence]):
+        slots = list(pools)
+        self.templates = [Template(text, slots, pools) for text in texts]
+    
+    def render(self, rng) -> str:
+        return rng.choice(self.templates).render(rng)
+    
+    def render_many(self, rng, count: int) -> List[str]:
+        """`count` renders, identical to calling render() `count` times"""
+        choice = rng.choice
+        templates = self.templates
+        return [choice(templates).render(rng) for _ in range(count)]
@@ -2,54 +2,76 @@
 Utility functions for data generation
 """
 
-import uuid
-import random
 import numpy as np
 from datetime import datetime, timedelta
-from typing import List, Optional
-import requests
-import os
+from itertools import islice
+from typing import Iterable, Iterator, Optional
 import json
 
-def generate_uuid() -> str:
-    """Generate UUIDv4 similar to Asana's GID format"""
-    return str(uuid.uuid4())
+from business_calendar import BusinessCalendar, WEEKENDS, parse_datetime
 
-def random_date_between(start_date: str, end_date: str, 
+# Rows buffered per sink write (executemany call for SQLite) when streaming output
+DEFAULT_CHUNK_SIZE = 10000
+
+# Task completion rate range by project type
+COMPLETION_RATES = {
+    'sprint': (0.70, 0.85),
+    'ongoing': (0.40, 0.50),
+    'campaign': (0.65, 0.75),
+    'operations': (0.55, 0.65)
+}
+DEFAULT_COMPLETION_RATE = (0.50, 0.60)
+
+ONE_DAY = np.timedelta64(1, 'D')
+
+def simulation_now(config: dict) -> datetime:
+    """
+    Reference "current time" of the simulation: the end of `end_date`
+    
+    Using a fixed instant instead of datetime.now() keeps every stage
+    consistent with each other and makes seeded runs reproducible.
+    """
+    end = parse_datetime(config['end_date'])
+    return end.replace(hour=23, minute=59, second=59, microsecond=0)
+
+def random_date_between(rng, start_date: str, end_date: str, 
                         avoid_weekends: bool = False,
-                        weight_to_start: bool = False) -> datetime:
+                        weight_to_start: bool = False,
+                        calendar: BusinessCalendar = WEEKENDS) -> datetime:
     """
     Generate random date between two dates
     
     Args:
+        rng: SimulationRNG for the calling stage
         start_date: Start date string (YYYY-MM-DD)
         end_date: End date string (YYYY-MM-DD)
-        avoid_weekends: If True, 85% chance to avoid weekends
+        avoid_weekends: If True, 85% chance to avoid weekends (and `calendar`'s holidays)
         weight_to_start: If True, weight dates toward start (for creation dates)
+        calendar: BusinessCalendar of the run (see business_calendar.calendar_for)
     """
-    start = datetime.fromisoformat(start_date)
-    end = datetime.fromisoformat(end_date)
+    start = parse_datetime(start_date)
+    end = parse_datetime(end_date)
     
     if weight_to_start:
         # Use exponential distribution weighted toward start
         days_diff = (end - start).days
-        random_days = int(np.random.exponential(days_diff / 3))
+        random_days = int(rng.np.exponential(days_diff / 3))
         random_days = min(random_days, days_diff)
     else:
-        random_days = random.randint(0, (end - start).days)
+        random_days = rng.randint(0, (end - start).days)
     
     result_date = start + timedelta(days=random_days)
     
     # Avoid weekends 85% of the time
-    if avoid_weekends and random.random() < 0.85:
-        while result_date.weekday() >= 5:  # 5=Saturday, 6=Sunday
-            result_date += timedelta(days=1)
-            if result_date > end:
-                result_date = start + timedelta(days=random.randint(0, (end - start).days))
+    if avoid_weekends and rng.random() < 0.85:
+        result_date = calendar.roll_forward(result_date)
+        while result_date > end:
+            result_date = start + timedelta(days=rng.randint(0, (end - start).days))
+            result_date = calendar.roll_forward(result_date)
     
     return result_date
 
-def random_datetime_between(start_date: str, end_date: str,
+def random_datetime_between(rng, start_date: str, end_date: str,
                            business_hours: bool = True) -> datetime:
     """
     Generate random datetime (with time component)
@@ -57,23 +79,20 @@ def random_datetime_between(start_date: str, end_date: str,
     Args:
         business_hours: If True, weight toward 9am-6pm on weekdays
     """
-    date = random_date_between(start_date, end_date)
+    date = random_date_between(rng, start_date, end_date)
     
-    if business_hours and random.random() < 0.8:
+    if business_hours and rng.random() < 0.8:
         # Business hours: 9am-6pm
-        hour = random.randint(9, 18)
-        minute = random.randint(0, 59)
+        hour = rng.randint(9, 18)
+        minute = rng.randint(0, 59)
     else:
-        hour = random.randint(0, 23)
-        minute = random.randint(0, 59)
+        hour = rng.randint(0, 23)
+        minute = rng.randint(0, 59)
     
-    return date.replace(hour=hour, minute=minute, second=random.randint(0, 59))
-
-def weighted_choice(choices: List, weights: List):
-    """Select item from choices based on weights"""
-    return random.choices(choices, weights=weights, k=1)[0]
+    return date.replace(hour=hour, minute=minute, second=rng.randint(0, 59))
 
-def generate_due_date(created_at: datetime, task_type: str = 'general') -> Optional[datetime]:
+def generate_due_date(rng, created_at: datetime, task_type: str = 'general',
+                      calendar: BusinessCalendar = WEEKENDS) -> Optional[datetime]:
     """
     Generate realistic due date based on task type and creation date
     
@@ -83,95 +102,33 @@ def generate_due_date(created_at: datetime, task_type: str = 'general') -> Optio
     - 20% 1-3 months out
     - 10% no due date
     - 5% overdue
+    
+    85% of due dates are moved off weekends and `calendar`'s holidays.
     """
     # 10% have no due date
-    if random.random() < 0.10:
+    if rng.random() < 0.10:
         return None
     
-    now = datetime.now()
-    
     # Determine timeframe
-    rand = random.random()
+    rand = rng.random()
     if rand < 0.25:  # Within 1 week
-        days = random.randint(1, 7)
+        days = rng.randint(1, 7)
     elif rand < 0.65:  # Within 1 month
-        days = random.randint(8, 30)
+        days = rng.randint(8, 30)
     elif rand < 0.85:  # 1-3 months
-        days = random.randint(31, 90)
+        days = rng.randint(31, 90)
     else:  # Overdue (5%)
-        days = -random.randint(1, 30)
+        days = -rng.randint(1, 30)
     
     due = created_at + timedelta(days=days)
     
     # Avoid weekends 85% of the time
-    if random.random() < 0.85:
-        while due.weekday() >= 5:
-            due += timedelta(days=1)
+    if rng.random() < 0.85:
+        due = calendar.roll_forward(due)
     
     return due
 
-def call_llm_api(prompt: str, temperature: float = 0.8) -> str:
-    """
-    Call Anthropic API to generate content
-    
-    Note: This is a placeholder. In production:
-    1. Set ANTHROPIC_API_KEY environment variable
-    2. Install anthropic package: pip install anthropic
-    """
-    api_key = os.getenv('ANTHROPIC_API_KEY')
-    
-    if not api_key:
-        # Fallback to deterministic generation if no API key
-        return generate_fallback_content(prompt)
-    
-    try:
-        # Using requests to call API directly
-        response = requests.post(
-            'https://api.anthropic.com/v1/messages',
-            headers={
-                'x-api-key': api_key,
-                'anthropic-version': '2023-06-01',
-                'content-type': 'application/json',
-            },
-            json={
-                'model': 'claude-sonnet-4-20250514',
-                'max_tokens': 500,
-                'temperature': temperature,
-                'messages': [
-                    {'role': 'user', 'content': prompt}
-                ]
-            },
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            return data['content'][0]['text'].strip()
-        else:
-            return generate_fallback_content(prompt)
-            
-    except Exception as e:
-        print(f"LLM API error: {e}, using fallback")
-        return generate_fallback_content(prompt)
-
-def generate_fallback_content(prompt: str) -> str:
-    """Generate content without LLM (deterministic fallback)"""
-    # This is a simple fallback - in practice you'd have template-based generation
-    if 'task name' in prompt.lower():
-        return random.choice([
-            'Implement feature',
-            'Fix bug in module',
-            'Review pull request',
-            'Update documentation',
-            'Design new component'
-        ])
-    elif 'description' in prompt.lower():
-        return "Task description with relevant details and context."
-    elif 'comment' in prompt.lower():
-        return "Status update on this task."
-    return "Generated content"
-
-def calculate_completion_status(created_at: datetime, 
+def calculate_completion_status(rng, created_at: datetime, 
                                 project_type: str,
                                 now: datetime) -> tuple:
     """
@@ -184,28 +141,21 @@ def calculate_completion_status(created_at: datetime,
     
     Returns: (is_completed: bool, completed_at: datetime or None)
     """
-    completion_rates = {
-        'sprint': (0.70, 0.85),
-        'ongoing': (0.40, 0.50),
-        'campaign': (0.65, 0.75),
-        'operations': (0.55, 0.65)
-    }
-    
-    rate_range = completion_rates.get(project_type, (0.50, 0.60))
-    completion_rate = random.uniform(*rate_range)
+    rate_range = COMPLETION_RATES.get(project_type, DEFAULT_COMPLETION_RATE)
+    completion_rate = rng.uniform(*rate_range)
     
     # Older tasks more likely to be completed
     days_old = (now - created_at).days
     age_factor = min(days_old / 90, 1.0)  # Cap at 90 days
     adjusted_rate = completion_rate + (age_factor * 0.2)
     
-    is_completed = random.random() < adjusted_rate
+    is_completed = rng.random() < adjusted_rate
     
     if not is_completed:
         return False, None
     
     # Generate completion timestamp (log-normal distribution, 1-14 days after creation)
-    days_to_complete = int(np.random.lognormal(1.5, 0.8))  # Mean ~6 days
+    days_to_complete = int(rng.np.lognormal(1.5, 0.8))  # Mean ~6 days
     days_to_complete = max(1, min(days_to_complete, 14))
     
     completed_at = created_at + timedelta(days=days_to_complete)
@@ -216,22 +166,104 @@ def calculate_completion_status(created_at: datetime,
         if time_range <= 0:
             completed_at = created_at
         else:
-            days_between = random.randint(1, max(1, time_range))
+            days_between = rng.randint(1, max(1, time_range))
             completed_at = created_at + timedelta(days=days_between)
     
     return True, completed_at
 
+# Vectorized counterparts of the helpers above. They draw whole arrays from
+# `rng.np` (one element per task) with the same distributions, using
+# datetime64[s] timestamps and datetime64[D] dates.
+
+def random_datetimes_between(rng, start_date: str, end_date: str, size: int,
+                             business_hours: bool = True) -> np.ndarray:
+    """Array version of random_datetime_between"""
+    start = np.datetime64(start_date, 'D')
+    span = int((np.datetime64(end_date, 'D') - start) / ONE_DAY)
+    days = start + rng.np.integers(0, span + 1, size)
+    
+    if business_hours:
+        # Business hours (9am-6pm) 80% of the time
+        in_hours = rng.np.random(size) < 0.8
+        hours = np.where(in_hours, rng.np.integers(9, 19, size), rng.np.integers(0, 24, size))
+    else:
+        hours = rng.np.integers(0, 24, size)
+    seconds = hours * 3600 + rng.np.integers(0, 60, size) * 60 + rng.np.integers(0, 60, size)
+    
+    return days.astype('datetime64[s]') + seconds.astype('timedelta64[s]')
+
+def generate_due_dates(rng, created_at: np.ndarray,
+                       calendar: BusinessCalendar = WEEKENDS) -> np.ndarray:
+    """Array version of generate_due_date; NaT where a task has no due date"""
+    size = len(created_at)
+    has_due = rng.np.random(size) >= 0.10
+    
+    # Within 1 week / within 1 month / 1-3 months / overdue
+    rand = rng.np.random(size)
+    days = np.select(
+        [rand < 0.25, rand < 0.65, rand < 0.85],
+        [rng.np.integers(1, 8, size), rng.np.integers(8, 31, size), rng.np.integers(31, 91, size)],
+        -rng.np.integers(1, 31, size)
+    )
+    due = created_at.astype('datetime64[D]') + days.astype('timedelta64[D]')
+    
+    # Avoid weekends 85% of the time
+    avoid = rng.np.random(size) < 0.85
+    due = np.where(avoid, calendar.roll_forward_array(due), due)
+    
+    return np.where(has_due, due, np.datetime64('NaT', 'D'))
+
+def calculate_completion_statuses(rng, created_at: np.ndarray, project_type: str,
+                                  now: datetime) -> tuple:
+    """
+    Array version of calculate_completion_status
+    
+    Returns: (is_completed: bool array, completed_at: datetime64 array, NaT if open)
+    """
+    size = len(created_at)
+    now = np.datetime64(now, 's')
+    
+    rate_range = COMPLETION_RATES.get(project_type, DEFAULT_COMPLETION_RATE)
+    completion_rate = rng.np.uniform(*rate_range, size)
+    
+    # Older tasks more likely to be completed
+    days_old = (now - created_at) // ONE_DAY
+    age_factor = np.minimum(days_old / 90, 1.0)
+    is_completed = rng.np.random(size) < completion_rate + age_factor * 0.2
+    
+    # Log-normal completion lag, 1-14 days after creation
+    days_to_complete = np.clip(rng.np.lognormal(1.5, 0.8, size).astype(np.int64), 1, 14)
+    completed_at = created_at + days_to_complete.astype('timedelta64[D]')
+    
+    # Completions past `now` move to a random day between creation and now
+    days_between = rng.np.integers(1, np.maximum(1, days_old) + 1)
+    capped = np.where(days_old <= 0, created_at,
+                      created_at + days_between.astype('timedelta64[D]'))
+    completed_at = np.where(completed_at > now, capped, completed_at)
+    
+    return is_completed, np.where(is_completed, completed_at, np.datetime64('NaT', 's'))
+
+def datetimes_to_iso(values: np.ndarray) -> list:
+    """Render datetime64 values as ISO strings (None for NaT) for insertion"""
+    strings = np.datetime_as_string(values).tolist()
+    return [None if s == 'NaT' else s for s in strings]
+
+# Directory of the reference data files (relative to the working directory)
+DATA_DIR = 'data'
+
 def load_json_data(filename: str) -> dict:
     """Load data from JSON file in data/ directory"""
     try:
-        with open(f'data/{filename}', 'r') as f:
+        with open(f'{DATA_DIR}/{filename}', 'r') as f:
             return json.load(f)
     except FileNotFoundError:
         return {}
 
-def batch_insert(conn, table: str, columns: List[str], data: List[tuple]):
-    """Efficiently insert multiple rows"""
-    placeholders = ','.join(['?' for _ in columns])
-    query = f"INSERT INTO {table} ({','.join(columns)}) VALUES ({placeholders})"
-    conn.executemany(query, data)
-    conn.commit()
\ No newline at end of file
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    """Yield successive lists of at most `size` items from any iterable"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""
+Shared fixtures: builds of small workspaces into a temporary directory
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+
+from config import resolve_config  # noqa: E402
+
+# Bookkeeping tables that legitimately differ between equivalent builds
+BOOKKEEPING_TABLES = ('_pipeline_manifest', '_simulation_runs')
+
+@pytest.fixture
+def smoke_config(tmp_path):
+    """Config factory for a smoke-preset build under tmp_path"""
+    def make(name: str = 'workspace', **overrides) -> dict:
+        return resolve_config('smoke', **{
+            'schema_file': str(ROOT / 'schema.sql'),
+            'output_db': str(tmp_path / f'{name}.sqlite'),
+            'stage_cache_dir': str(tmp_path / '.cache'),
+            'write_thread': False,
+            'snapshot': False,
+            **overrides,
+        })
+    return make
+
+def table_rows(db_path: str) -> dict:
+    """{table: rows in rowid order} for every data table of a database"""
+    conn = sqlite3.connect(db_path)
+    try:
+        tables = [name for (name,) in conn.execute("""
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name
+        """) if name not in BOOKKEEPING_TABLES]
+        return {table: conn.execute(f"SELECT * FROM {table} ORDER BY rowid").fetchall()
+                for table in tables}
+    finally:
+        conn.close()
+
+def assert_same_tables(expected_db: str, actual_db: str):
+    expected, actual = table_rows(expected_db), table_rows(actual_db)
+    assert list(actual) == list(expected)
+    for table in expected:
+        assert actual[table] == expected[table], f"{table} differs"
@@ -0,0 +1,23 @@
+"""
+A seeded build must write the same rows every time it runs, whatever its worker count
+"""
+
+import pytest
+
+import main
+from conftest import assert_same_tables, table_rows
+
+@pytest.mark.parametrize('workers', [1, 2, 3])
+def test_seeded_runs_are_identical(smoke_config, workers):
+    serial = smoke_config('serial', stage_cache=False)
+    parallel = smoke_config('parallel', stage_cache=False, workers=workers)
+    main.build_workspace(serial)
+    main.build_workspace(parallel)
+    assert_same_tables(serial['output_db'], parallel['output_db'])
+
+def test_seed_changes_the_output(smoke_config):
+    seeded = smoke_config('seeded', stage_cache=False)
+    reseeded = smoke_config('reseeded', stage_cache=False, seed=seeded['seed'] + 1)
+    main.build_workspace(seeded)
+    main.build_workspace(reseeded)
+    assert table_rows(seeded['output_db'])['tasks'] != table_rows(reseeded['output_db'])['tasks']
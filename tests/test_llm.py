@@ -0,0 +1,60 @@
+"""
+ContentService against a local stub of the Messages API
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm import ContentRequest, ContentService
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers 'malformed' prompts with a body lacking content, 'slow' ones after a delay"""
+    
+    def log_message(self, *args):
+        pass
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['content-length'])))
+        prompt = body['messages'][0]['content']
+        if prompt.startswith('slow'):
+            time.sleep(0.5)
+        if prompt.startswith('malformed'):
+            response = {'error': 'no content'}
+        else:
+            response = {'content': [{'text': f' LLM {prompt} '}]}
+        self.send_response(200)
+        self.send_header('content-type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(response).encode())
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv('ANTHROPIC_API_KEY', 'test')
+    service = ContentService({'llm_base_url': f'http://127.0.0.1:{server.server_port}',
+                              'llm_cache': str(tmp_path / 'llm_cache.sqlite'),
+                              'llm_backoff': 0, 'llm_max_retries': 1})
+    service.start()
+    yield service
+    server.shutdown()
+
+def request(prompt: str) -> ContentRequest:
+    return ContentRequest(prompt, 0.7, 0, f'template {prompt}')
+
+def test_malformed_response_falls_back(service):
+    good = service.submit(request('good'))
+    bad = service.submit(request('malformed'))
+    assert good.result(5) == 'LLM good'
+    assert bad.result(5) == 'template malformed'
+    service.close()
+    assert service.stats['fallbacks'] == 1
+
+def test_close_settles_in_flight_requests(service):
+    futures = [service.submit(request(f'slow {i}')) for i in range(4)]
+    service.close()
+    assert all(future.done() for future in futures)
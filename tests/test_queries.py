@@ -0,0 +1,207 @@
+"""
+The query API must return what plain SQL returns, and never a stale cached row
+"""
+
+import sqlite3
+
+import pytest
+
+import main
+import queries
+from queries import Task, open_workspace
+
+@pytest.fixture
+def db(smoke_config):
+    config = smoke_config(stage_cache=False)
+    main.build_workspace(config)
+    return config['output_db']
+
+@pytest.fixture
+def ws(db):
+    workspace = open_workspace(db)
+    yield workspace
+    workspace.close()
+
+@pytest.fixture
+def sql(db):
+    conn = sqlite3.connect(db)
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+def scalar(conn, query: str, *parameters):
+    return conn.execute(query, parameters).fetchone()[0]
+
+def ids(rows) -> set:
+    return {row[0] for row in rows}
+
+def assert_rows_match(conn, objects):
+    """Every object carries exactly its row's column values"""
+    for obj in objects:
+        key = obj.__slots__[0]
+        row = conn.execute(f"SELECT * FROM {obj.table} WHERE {key} = ?",
+                           (getattr(obj, key),)).fetchone()
+        assert obj.as_dict() == {name: row[name] for name in obj.__slots__}
+
+def assert_sorted(keys: list):
+    assert keys == sorted(keys)
+
+def test_my_tasks_matches_sql(ws, sql):
+    user_id = scalar(sql, "SELECT assignee_id FROM tasks WHERE completed = 0 "
+                          "AND assignee_id IS NOT NULL "
+                          "GROUP BY assignee_id ORDER BY count(*) DESC LIMIT 1")
+    tasks = ws.my_tasks(user_id)
+    assert tasks
+    assert {task.task_id for task in tasks} == ids(sql.execute(
+        "SELECT task_id FROM tasks WHERE assignee_id = ? AND NOT completed", (user_id,)))
+    assert_sorted([(task.due_date is None, task.due_date or '', task.created_at) for task in tasks])
+    assert_rows_match(sql, tasks)
+    
+    every = ws.my_tasks(user_id, include_completed=True)
+    assert len(every) == scalar(sql, "SELECT count(*) FROM tasks WHERE assignee_id = ?", user_id)
+    assert {task.task_id for task in every} == ids(sql.execute(
+        "SELECT task_id FROM tasks WHERE assignee_id = ?", (user_id,)))
+    assert_sorted([(task.completed, task.due_date is None, task.due_date or '', task.created_at)
+                   for task in every])
+
+def test_project_board_matches_sql(ws, sql):
+    project_id = scalar(sql, "SELECT project_id FROM tasks GROUP BY project_id "
+                             "ORDER BY count(*) DESC LIMIT 1")
+    board = ws.project_board(project_id)
+    assert [section.section_id for section, _ in board] == [row[0] for row in sql.execute(
+        "SELECT section_id FROM sections WHERE project_id = ? ORDER BY position", (project_id,))]
+    for section, tasks in board:
+        assert {task.task_id for task in tasks} == ids(sql.execute(
+            "SELECT task_id FROM tasks WHERE section_id = ? AND parent_task_id IS NULL",
+            (section.section_id,)))
+        assert_sorted([(task.completed, task.created_at) for task in tasks])
+        assert_rows_match(sql, [section, *tasks])
+    assert sum(len(tasks) for _, tasks in board) == scalar(
+        sql, "SELECT count(*) FROM tasks WHERE project_id = ? AND parent_task_id IS NULL",
+        project_id)
+
+def test_overdue_tasks_matches_sql(ws, sql):
+    today = scalar(sql, "SELECT max(end_date) FROM _simulation_runs")
+    assert ws.today == today
+    overdue = ws.overdue_tasks()
+    assert overdue
+    assert {task.task_id for task in overdue} == ids(sql.execute(
+        "SELECT task_id FROM tasks WHERE completed = 0 AND due_date IS NOT NULL "
+        "AND date(due_date) < date(?)", (today,)))
+    assert_sorted([(task.due_date, task.created_at) for task in overdue])
+    assert_rows_match(sql, overdue)
+    
+    user_id = overdue[0].assignee_id
+    assert ws.overdue_tasks(assignee_id=user_id) == [
+        task for task in overdue if task.assignee_id == user_id]
+    assert ws.overdue_tasks(as_of='2000-01-01') == []
+
+def test_task_detail_matches_sql(ws, sql):
+    task_id = scalar(sql, """
+        SELECT task_id FROM tasks t
+        WHERE EXISTS (SELECT 1 FROM comments c WHERE c.task_id = t.task_id)
+          AND EXISTS (SELECT 1 FROM task_tags g WHERE g.task_id = t.task_id)
+          AND EXISTS (SELECT 1 FROM custom_field_values v WHERE v.task_id = t.task_id)
+        ORDER BY task_id LIMIT 1
+    """)
+    detail = ws.task_detail(task_id)
+    assert detail.task is ws.get_task(task_id)
+    assert [comment.comment_id for comment in detail.comments] == [row[0] for row in sql.execute(
+        "SELECT comment_id FROM comments WHERE task_id = ? ORDER BY created_at, rowid",
+        (task_id,))]
+    assert [tag.tag_id for tag in detail.tags] == [row[0] for row in sql.execute(
+        "SELECT g.tag_id FROM tags g WHERE g.tag_id IN "
+        "(SELECT tag_id FROM task_tags WHERE task_id = ?) ORDER BY g.name", (task_id,))]
+    assert {(value.field_id, value.name, value.value) for value in detail.custom_fields} == {
+        tuple(row) for row in sql.execute(
+            "SELECT v.field_id, d.name, v.value FROM custom_field_values v, "
+            "custom_field_definitions d WHERE d.field_id = v.field_id AND v.task_id = ?",
+            (task_id,))}
+    assert_rows_match(sql, [detail.task, *detail.comments, *detail.tags])
+    
+    parent_id = scalar(sql, "SELECT parent_task_id FROM tasks "
+                            "WHERE parent_task_id IS NOT NULL ORDER BY task_id LIMIT 1")
+    assert {task.task_id for task in ws.task_detail(parent_id).subtasks} == ids(sql.execute(
+        "SELECT task_id FROM tasks WHERE parent_task_id = ?", (parent_id,)))
+    assert ws.task_detail('no-such-task') is None
+
+def test_repeated_lookups_return_the_same_object(ws, sql):
+    task_id, user_id = sql.execute("SELECT task_id, assignee_id FROM tasks "
+                                   "WHERE completed = 0 AND assignee_id IS NOT NULL "
+                                   "ORDER BY task_id LIMIT 1").fetchone()
+    task = ws.get_task(task_id)
+    statements = []
+    ws.conn.set_trace_callback(statements.append)
+    assert ws.get_task(task_id) is task
+    assert not [statement for statement in statements if 'FROM tasks' in statement]
+    ws.conn.set_trace_callback(None)
+    assert any(other is task for other in ws.my_tasks(user_id))
+    assert ws.get_user(user_id) is ws.get_user(user_id)
+
+def test_update_task_drops_only_the_written_row(ws, sql):
+    (task_id,), (other_id,) = sql.execute("SELECT task_id FROM tasks ORDER BY task_id LIMIT 2")
+    task, other = ws.get_task(task_id), ws.get_task(other_id)
+    ws.update_task(task_id, name='Renamed', priority='high')
+    updated = ws.get_task(task_id)
+    assert updated is not task
+    assert (updated.name, updated.priority) == ('Renamed', 'high')
+    assert ws.get_task(other_id) is other
+    with pytest.raises(ValueError):
+        ws.update_task(task_id, project_id='elsewhere')
+
+def test_add_comment_shows_in_task_detail(ws, sql):
+    task_id, user_id = sql.execute("SELECT task_id, user_id FROM comments "
+                                   "ORDER BY comment_id LIMIT 1").fetchone()
+    before = ws.task_detail(task_id).comments
+    ws.add_comment('new-comment', task_id, user_id, 'Done', '2099-01-01T00:00:00')
+    after = ws.task_detail(task_id).comments
+    assert after[:-1] == before
+    assert all(new is old for new, old in zip(after, before))
+    assert (after[-1].comment_id, after[-1].content) == ('new-comment', 'Done')
+
+def test_commit_from_another_connection_empties_the_map(ws, db):
+    task = ws.get_task(ws.conn.execute("SELECT min(task_id) FROM tasks").fetchone()[0])
+    other = sqlite3.connect(db)
+    other.execute("UPDATE tasks SET name = 'Elsewhere' WHERE task_id = ?", (task.task_id,))
+    other.commit()
+    other.close()
+    fresh = ws.get_task(task.task_id)
+    assert fresh is not task
+    assert fresh.name == 'Elsewhere'
+
+def test_rollback_empties_the_map(ws):
+    task_id, name, user_id = ws.conn.execute("SELECT task_id, name, created_by FROM tasks "
+                                             "ORDER BY task_id LIMIT 1").fetchone()
+    ws.get_task(task_id)
+    ws.update_task(task_id, name='TEMP')
+    assert ws.get_task(task_id).name == 'TEMP'
+    ws.add_comment('temp-comment', task_id, user_id, 'Draft', '2099-01-01T00:00:00')
+    ws.rollback()
+    assert ws.get_task(task_id).name == name
+    assert 'temp-comment' not in {comment.comment_id
+                                  for comment in ws.task_detail(task_id).comments}
+
+@pytest.mark.parametrize('statement, index', [
+    ('PROJECT_SECTIONS', 'idx_sections_project'),
+    ('PROJECT_BOARD', 'idx_tasks_section'),
+    ('OVERDUE_TASKS', 'idx_tasks_due_date'),
+    ('USER_COMMENTS', 'idx_comments_user'),
+    ('TAGGED_TASKS', 'idx_task_tags_tag'),
+    ('FIELD_TASKS', 'idx_custom_field_values_field'),
+])
+def test_queries_use_their_index(ws, statement, index):
+    query = getattr(queries, statement)
+    plan = [row[3] for row in ws.conn.execute(f"EXPLAIN QUERY PLAN {query}",
+                                              ('x',) * query.count('?'))]
+    assert any(f"INDEX {index} " in step for step in plan), plan
+
+def test_field_tasks_matches_sql(ws, sql):
+    field_id, value = sql.execute("SELECT field_id, value FROM custom_field_values "
+                                  "GROUP BY field_id, value ORDER BY count(*) DESC, field_id "
+                                  "LIMIT 1").fetchone()
+    assert {task.task_id for task in ws.field_tasks(field_id)} == ids(sql.execute(
+        "SELECT task_id FROM custom_field_values WHERE field_id = ?", (field_id,)))
+    matching = ws.field_tasks(field_id, value)
+    assert len(matching) == scalar(sql, "SELECT count(*) FROM custom_field_values "
+                                        "WHERE field_id = ? AND value = ?", field_id, value)
+    assert all(isinstance(task, Task) for task in matching)
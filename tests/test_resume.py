@@ -0,0 +1,27 @@
+"""
+A resumed run must write exactly the rows of an uninterrupted one
+"""
+
+import pytest
+
+import main
+from conftest import assert_same_tables
+
+class Crash(Exception):
+    pass
+
+@pytest.mark.parametrize('stage', ['generate_users', 'generate_tasks', 'generate_tags'])
+def test_resume_after_crash_matches_uninterrupted(smoke_config, monkeypatch, stage):
+    reference = smoke_config('reference', stage_cache=False)
+    main.build_workspace(reference)
+    
+    resumed = smoke_config('resumed', stage_cache=False)
+    with monkeypatch.context() as patch:
+        def crash(*args, **kwargs):
+            raise Crash(stage)
+        patch.setattr(main, stage, crash)
+        with pytest.raises(Crash):
+            main.build_workspace(resumed)
+    main.build_workspace(resumed, resume=True)
+    
+    assert_same_tables(reference['output_db'], resumed['output_db'])
@@ -0,0 +1,83 @@
+"""
+Alias samplers must draw every outcome with its weight, one or many at a time
+"""
+
+import numpy as np
+import pytest
+
+from generators import tasks, users
+from rng import SimulationRNG
+from sampling import AliasSampler
+
+DRAWS = 200_000
+
+# Far above sampling noise: no frequency's standard deviation reaches 0.12% at DRAWS
+TOLERANCE = 0.01
+
+def rng(seed: int = 7) -> SimulationRNG:
+    return SimulationRNG(np.random.SeedSequence(seed))
+
+def frequencies(indices, n: int) -> np.ndarray:
+    return np.bincount(indices, minlength=n) / len(indices)
+
+def expected(weights) -> np.ndarray:
+    weights = np.asarray(weights, dtype=np.float64)
+    return weights / weights.sum()
+
+WEIGHTS = [
+    [5, 0, 1, 3, 0, 1],
+    [1, 1],
+    [0.999, 0.001],
+    list(range(1, 41)),
+    [7],
+]
+
+@pytest.mark.parametrize('weights', WEIGHTS)
+def test_indices_follow_weights(weights):
+    sampler = AliasSampler(range(len(weights)), weights)
+    drawn = frequencies(sampler.indices(rng(), DRAWS), len(weights))
+    assert np.abs(drawn - expected(weights)).max() < TOLERANCE
+    assert not drawn[np.asarray(weights) == 0].any()
+
+@pytest.mark.parametrize('weights', WEIGHTS)
+def test_index_follows_weights(weights):
+    sampler = AliasSampler(range(len(weights)), weights)
+    stream = rng()
+    drawn = frequencies([sampler.index(stream) for _ in range(DRAWS)], len(weights))
+    assert np.abs(drawn - expected(weights)).max() < TOLERANCE
+    assert not drawn[np.asarray(weights) == 0].any()
+
+@pytest.mark.parametrize('sampler, weights', [
+    (tasks.PRIORITY_SAMPLER, tasks.PRIORITY_WEIGHTS),
+    (users.DEPARTMENTS, list(users.DEPARTMENT_DISTRIBUTION.values())),
+    (users.TEAMS_PER_USER, [0.75, 0.25]),
+])
+def test_shared_samplers_follow_their_tables(sampler, weights):
+    # One sampler per distribution, reused by every draw of every stage
+    assert len(sampler) == len(weights)
+    drawn = frequencies(sampler.indices(rng(), DRAWS), len(weights))
+    assert np.abs(drawn - expected(weights)).max() < TOLERANCE
+
+def test_sample_returns_outcomes():
+    sampler = AliasSampler(['never', 'a', 'b'], [0, 1, 1])
+    stream = rng()
+    assert {sampler.sample(stream) for _ in range(1000)} == {'a', 'b'}
+    many = sampler.sample_many(stream, 1000)
+    assert isinstance(many, list) and set(many) == {'a', 'b'}
+
+def test_draws_are_reproducible():
+    sampler = AliasSampler(range(6), WEIGHTS[0])
+    assert (sampler.indices(rng(3), 100) == sampler.indices(rng(3), 100)).all()
+    first, second = rng(3), rng(3)
+    assert [sampler.index(first) for _ in range(100)] == [sampler.index(second) for _ in range(100)]
+
+@pytest.mark.parametrize('outcomes, weights', [
+    ([], []),
+    (['a', 'b'], [1]),
+    (['a', 'b'], [1, 2, 3]),
+    (['a', 'b'], [1, -1]),
+    (['a', 'b'], [0, 0]),
+])
+def test_invalid_weights(outcomes, weights):
+    with pytest.raises(ValueError):
+        AliasSampler(outcomes, weights)
@@ -0,0 +1,51 @@
+"""
+Merging organization shards must keep every row and never collide on keys
+"""
+
+import sqlite3
+
+import pytest
+
+import main
+from shards import generate_shards
+
+def table_counts(conn) -> dict:
+    tables = [name for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    return {table: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+            for table in tables}
+
+def primary_keys(conn, table: str) -> list:
+    columns = sorted((pk, name) for _, name, _, _, _, pk
+                     in conn.execute(f"PRAGMA table_info({table})") if pk)
+    return [name for _, name in columns]
+
+@pytest.mark.parametrize('id_format', ['uuid', 'gid', 'int'])
+def test_merged_shards(smoke_config, id_format):
+    config = smoke_config(stage_cache=False, organizations=3, workers=2, id_format=id_format)
+    paths = generate_shards(config, main.build_workspace, merge=True)
+    assert len(paths) == 3
+    
+    conn = sqlite3.connect(config['output_db'])
+    try:
+        merged = table_counts(conn)
+        expected = dict.fromkeys(merged, 0)
+        for path in paths:
+            conn.execute("ATTACH DATABASE ? AS shard", (str(path),))
+            for table in expected:
+                expected[table] += conn.execute(f"SELECT count(*) FROM shard.{table}").fetchone()[0]
+            conn.execute("DETACH DATABASE shard")
+        assert merged == expected
+        assert merged['organizations'] == 3
+        
+        for table in merged:
+            key = ', '.join(primary_keys(conn, table))
+            if key:
+                assert conn.execute(f"SELECT count(*) FROM (SELECT DISTINCT {key} FROM {table})"
+                                    ).fetchone()[0] == merged[table], f"{table} keys collide"
+        
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+        domains = [domain for (domain,) in conn.execute("SELECT domain FROM organizations")]
+        assert len(set(domains)) == 3
+    finally:
+        conn.close()
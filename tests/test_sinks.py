@@ -0,0 +1,28 @@
+"""
+Sinks behind a background writer thread
+"""
+
+import logging
+
+import main
+from conftest import ROOT, assert_same_tables
+from sinks import CSVSink, ThreadedSink
+
+def test_threaded_sink_keeps_inner_counts(tmp_path, caplog):
+    inner = CSVSink(tmp_path / 'csv', str(ROOT / 'schema.sql'))
+    sink = ThreadedSink(inner, max_chunks=2)
+    rows = [(f'tag-{i}', 'org', f'Tag {i}', 'red') for i in range(25)]
+    sink.write('tags', ['tag_id', 'org_id', 'name', 'color'], rows, chunk_size=10)
+    sink.commit()
+    assert inner.rows == sink.rows == {'tags': 25}
+    with caplog.at_level(logging.INFO, logger='sinks'):
+        sink.close()
+    assert f"Wrote 1 tables to {inner.directory}" in caplog.text
+    assert len((inner.directory / 'tags.csv').read_text().splitlines()) == 26
+
+def test_threaded_build_matches_direct_writes(smoke_config):
+    direct = smoke_config('direct', stage_cache=False)
+    threaded = smoke_config('threaded', stage_cache=False, write_thread=True)
+    main.build_workspace(direct)
+    main.build_workspace(threaded)
+    assert_same_tables(direct['output_db'], threaded['output_db'])
@@ -0,0 +1,129 @@
+"""
+Snapshot resets and forks must hand out the pristine database, independent of each other
+"""
+
+import sqlite3
+
+import pytest
+
+import main
+from conftest import assert_same_tables, table_rows
+from snapshots import Snapshot, save_template, template_path
+
+class Crash(Exception):
+    pass
+
+@pytest.fixture(params=[True, False], ids=['template', 'no-template'])
+def built(request, smoke_config):
+    """A finished build, with or without a snapshot template next to it"""
+    config = smoke_config(stage_cache=False, snapshot=request.param)
+    main.build_workspace(config)
+    assert template_path(config['output_db']).exists() == request.param
+    return config
+
+def mutate(conn):
+    conn.execute("DELETE FROM comments")
+    conn.execute("UPDATE tasks SET name = 'Changed', priority = 'low'")
+    conn.execute("INSERT INTO tags (tag_id, org_id, name, color) "
+                 "SELECT 'extra-tag', org_id, 'Extra', 'red' FROM organizations")
+    conn.commit()
+
+def test_reset_restores_template(built, tmp_path):
+    db = built['output_db']
+    pristine = str(tmp_path / 'pristine.sqlite')
+    source, copy = sqlite3.connect(db), sqlite3.connect(pristine)
+    source.backup(copy)
+    source.close()
+    copy.close()
+    
+    with Snapshot(db) as snapshot:
+        conn = sqlite3.connect(db)
+        try:
+            mutate(conn)
+            assert table_rows(db) != table_rows(pristine)
+            assert snapshot.reset(conn) is conn
+            # The connection stays usable and sees the restored rows
+            assert conn.execute("SELECT count(*) FROM comments").fetchone()[0] > 0
+        finally:
+            conn.close()
+        assert_same_tables(pristine, db)
+        
+        memory = snapshot.reset()
+        try:
+            assert memory.execute("SELECT count(*) FROM tasks").fetchone()[0] == \
+                   len(table_rows(pristine)['tasks'])
+        finally:
+            memory.close()
+
+def test_fork_gives_independent_files(built, tmp_path):
+    db = built['output_db']
+    with Snapshot(db) as snapshot:
+        paths = snapshot.fork(3, tmp_path / 'episodes')
+    assert [path.name for path in paths] == [f"episode_{i:04d}.sqlite" for i in range(3)]
+    for path in paths:
+        assert_same_tables(db, str(path))
+    
+    conn = sqlite3.connect(paths[0])
+    try:
+        mutate(conn)
+    finally:
+        conn.close()
+    assert table_rows(str(paths[0])) != table_rows(db)
+    for path in paths[1:]:
+        assert_same_tables(db, str(path))
+
+def test_fork_removes_stale_journals(built, tmp_path):
+    db = built['output_db']
+    directory = tmp_path / 'episodes'
+    directory.mkdir()
+    episode = directory / 'episode_0000.sqlite'
+    conn = sqlite3.connect(episode)
+    conn.execute("CREATE TABLE leftover (x)")
+    conn.commit()
+    conn.close()
+    stale = [directory / f"{episode.name}-journal", directory / f"{episode.name}-wal"]
+    for path in stale:
+        path.write_bytes(b'not a journal of this database')
+    
+    with Snapshot(db) as snapshot:
+        assert snapshot.fork(1, directory) == [episode]
+    assert not any(path.exists() for path in stale)
+    assert_same_tables(db, str(episode))
+
+def test_incremental_run_discards_template(smoke_config, monkeypatch):
+    config = smoke_config(stage_cache=False, snapshot=True)
+    main.build_workspace(config)
+    assert template_path(config['output_db']).exists()
+    
+    extend = {**config, 'incremental': True, 'start_date': '2026-01-07',
+              'end_date': '2026-02-28'}
+    with monkeypatch.context() as patch:
+        def crash(*args, **kwargs):
+            raise Crash('generate_tasks')
+        patch.setattr(main, 'generate_tasks', crash)
+        with pytest.raises(Crash):
+            main.build_workspace(extend)
+    assert not template_path(config['output_db']).exists()
+
+def test_resume_discards_template(smoke_config, monkeypatch):
+    config = smoke_config(stage_cache=False, snapshot=True)
+    with monkeypatch.context() as patch:
+        def crash(*args, **kwargs):
+            raise Crash('generate_tasks')
+        patch.setattr(main, 'generate_tasks', crash)
+        with pytest.raises(Crash):
+            main.build_workspace(config)
+    # A template left by some earlier build of this database
+    conn = sqlite3.connect(config['output_db'])
+    try:
+        save_template(conn, config['output_db'])
+    finally:
+        conn.close()
+    
+    with monkeypatch.context() as patch:
+        def crash(*args, **kwargs):
+            raise Crash('generate_tags')
+        patch.setattr(main, 'generate_tags', crash)
+        with pytest.raises(Crash):
+            main.build_workspace(config, resume=True)
+    assert not template_path(config['output_db']).exists()
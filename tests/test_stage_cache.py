@@ -0,0 +1,35 @@
+"""
+Stages restored from the stage cache must never change the output
+"""
+
+import main
+import stage_cache
+from conftest import assert_same_tables
+
+def test_full_cache_hit_matches_uncached(smoke_config):
+    main.build_workspace(smoke_config('first'))
+    cached = smoke_config('cached')
+    main.build_workspace(cached)
+    uncached = smoke_config('uncached', stage_cache=False)
+    main.build_workspace(uncached)
+    assert_same_tables(uncached['output_db'], cached['output_db'])
+
+def test_partial_cache_hit_matches_uncached(smoke_config):
+    # Teams are restored from the first build; users and later are regenerated
+    main.build_workspace(smoke_config('first', chunk_size=2000))
+    cached = smoke_config('cached', chunk_size=1000)
+    keys = stage_cache.stage_keys(cached)
+    main.build_workspace(cached)
+    uncached = smoke_config('uncached', chunk_size=1000, stage_cache=False)
+    main.build_workspace(uncached)
+    assert keys == stage_cache.stage_keys(cached)
+    assert_same_tables(uncached['output_db'], cached['output_db'])
+
+def test_keys_follow_data_files(smoke_config, tmp_path, monkeypatch):
+    monkeypatch.setattr(stage_cache, 'DATA_DIR', str(tmp_path))
+    config = smoke_config()
+    before = stage_cache.stage_keys(config)
+    (tmp_path / stage_cache.FIRST_NAMES_FILE).write_text('{"Ada": 1.0}')
+    after = stage_cache.stage_keys(config)
+    assert [before[s] == after[s] for s in stage_cache.STAGES] == [
+        stage in ('organizations', 'teams') for stage in stage_cache.STAGES]